@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+
+"""
+Offline benchmarks for list_resources_arn.py, run against the local fake_aws.py stub.
+No AWS credentials or network access are needed.
+
+Usage:
+    ./bench_cmdb.py clients [--latency 0.01] [--workers 20]
+    ./bench_cmdb.py enrichment [--tables 200] [--latency 0.02]
+    ./bench_cmdb.py scan [--accounts 3] [--regions 8] [--resources 50] [--page-size 50]
+                         [--latency 0.02] [--throttle-rate 0.01] [--disabled-regions 2]
+                         [--modes json,ndjson,compact,sqlite,tagging,multi] [--json results.json]
+    ./bench_cmdb.py processes [--regions 8] [--resources 1000] [--page-size 1000] [--processes 1,2,4]
+
+The scan suite runs the real scanner scripts, one process per mode, against a
+synthetic estate served by fake_aws.py and reports wall time, API calls and peak
+RSS of each mode; save the results with --json to compare two commits.
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import boto3
+
+from fake_aws import FakeAWS, synthetic_regions
+import list_resources_arn as scanner
+
+
+def _run_tasks(tasks, task_fn, workers):
+    """Run task_fn over tasks in a thread pool and return the wall time."""
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(task_fn, *task) for task in tasks]:
+            future.result()
+    return time.perf_counter() - start
+
+
+def bench_clients(args):
+    """Per-task Session/client/STS (the old scanner) against the shared ClientCache."""
+    with FakeAWS(latency=args.latency) as fake:
+        fake.install_env()
+        tasks = scanner.build_task_list(scanner.SERVICES_TO_SCAN, fake.regions)
+
+        def legacy_task(service_name, region):
+            clients = scanner.ClientCache(boto3.Session())
+            account_id, _arn = scanner.get_account_id(clients)
+            scanner.collect_resource_arns(service_name, region, account_id, clients)
+
+        legacy_time = _run_tasks(tasks, legacy_task, args.workers)
+        legacy_calls, legacy_sts = fake.total_calls(), fake.total_calls('sts')
+
+        fake.reset()
+        start = time.perf_counter()
+        clients = scanner.ClientCache(boto3.Session())
+        account_id, _arn = scanner.get_account_id(clients)
+        cached_time = _run_tasks(
+            tasks, lambda service_name, region: scanner.collect_resource_arns(service_name, region, account_id, clients),
+            args.workers) + (time.perf_counter() - start)
+        cached_calls, cached_sts = fake.total_calls(), fake.total_calls('sts')
+
+    print(f"{len(tasks)} tasks, {args.workers} workers, {args.latency * 1000:.0f} ms per call")
+    print(f"  per-task session : {legacy_time:7.2f}s  {legacy_calls:5d} API calls ({legacy_sts} STS)")
+    print(f"  shared ClientCache: {cached_time:7.2f}s  {cached_calls:5d} API calls ({cached_sts} STS)")
+
+
+def _normalized(all_arns_data):
+    """Service-keyed output with records in a stable order, for comparing runs."""
+    return json.dumps({key: sorted(records, key=lambda r: r.get('arn', '')) for key, records in all_arns_data.items()},
+                      sort_keys=True, default=str)
+
+
+class _SlowDynamoDBClient:
+    """In-process DynamoDB stand-in: list_tables pages of 100 names, describe_table sleeping `latency`."""
+
+    def __init__(self, tables, latency):
+        self.names = [f"table-{number:05d}" for number in range(tables)]
+        self.latency = latency
+
+    def get_paginator(self, operation_name):
+        names = self.names
+
+        class Paginator:
+            def paginate(self):
+                return ({'TableNames': names[start:start + 100]} for start in range(0, len(names), 100))
+
+        return Paginator()
+
+    def describe_table(self, TableName):
+        time.sleep(self.latency)
+        return {'Table': {'TableName': TableName, 'CreationDateTime': 'Unknown'}}
+
+
+def bench_enrichment(args):
+    """describe_table one table at a time (cap 1) against the shared enrichment pool caps."""
+    client = _SlowDynamoDBClient(args.tables, args.latency)
+    for label, caps in (('one at a time', {'dynamodb': 1}), ('enrichment pool', None)):
+        scanner._ENRICHMENT = scanner.EnrichmentPool(caps=caps)
+        batch = {}
+        start = time.perf_counter()
+        scanner.collect_dynamodb_tables(client, 'us-east-1', '123456789012', batch)
+        elapsed = time.perf_counter() - start
+        cap = scanner._ENRICHMENT.caps.get('dynamodb')
+        print(f"  {label:16s} (cap {cap:2d}): {elapsed:7.2f}s for {len(batch['dynamodb'])} tables")
+
+
+def bench_processes(args):
+    """
+    Thread scheduler against ProcessScanEngine with 1, 2, 4... workers, on an account
+    with large pages and no latency, where parsing and record building dominate. The
+    fake runs in its own process so it does not compete for the scanner's GIL.
+    """
+    fake_process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_aws.py'),
+         '--regions', str(args.regions), '--resources', str(args.resources), '--page-size', str(args.page_size)],
+        stdout=subprocess.PIPE, text=True)
+    try:
+        os.environ['AWS_ENDPOINT_URL'] = fake_process.stdout.readline().strip().split('=', 1)[1]
+        os.environ.update(AWS_ACCESS_KEY_ID='AKIAFAKE', AWS_SECRET_ACCESS_KEY='fake', AWS_DEFAULT_REGION='us-east-1')
+        os.environ.pop('AWS_PROFILE', None)
+        session = boto3.Session()
+        account_id, _arn = scanner.get_account_id(scanner.ClientCache(session))
+        regions = scanner.get_all_regions(scanner.ClientCache(session), account_id, refresh=True)
+
+        def scan(engine, processes=None):
+            scanner.CACHE_DIR = tempfile.mkdtemp(prefix='bench-cmdb-')  # Cold ECR/S3 caches for every run
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                data = scanner.scan_resources(account_id, regions, scanner.ClientCache(session), engine=engine,
+                                              processes=processes)
+            return time.perf_counter() - start, _normalized(data)
+
+        scan('threads')  # Warm-up: the fake encodes every response once
+        baseline, expected = scan('threads')
+        records = sum(len(records) for records in json.loads(expected).values())
+        print(f"{len(regions)} regions, {args.resources} resources per service, {args.page_size} per page, "
+              f"{records} records; {os.cpu_count()} CPUs")
+        print(f"  threads        : {baseline:7.2f}s")
+        for processes in (int(number) for number in args.processes.split(',') if number):
+            elapsed, output = scan('processes', processes)
+            print(f"  {processes:2d} processes   : {elapsed:7.2f}s  x{baseline / elapsed:4.2f}  "
+                  f"identical output: {output == expected}")
+    finally:
+        fake_process.terminate()
+        fake_process.wait()
+
+
+SCAN_MODES = {
+    # mode: (script, arguments); every mode but 'multi' scans the first account only
+    'json': ('list_resources_arn.py', []),
+    'ndjson': ('list_resources_arn.py', ['--output-format', 'ndjson']),
+    'compact': ('list_resources_arn.py', ['--output-format', 'compact']),
+    'sqlite': ('list_resources_arn.py', ['--output-format', 'sqlite']),
+    'tagging': ('list_resources_arn.py', ['--collection-mode', 'tagging']),
+    'multi': ('list_resources_arn_multi.py', ['--api-rate', '100000']),
+}
+
+_FOUND_RE = re.compile(r'Found (\d+) resources|; (\d+) resources in total|New: (\d+)')
+
+
+def _run_scan(fake, mode, work_dir, profiles, profile_env):
+    """Run one scanner mode in its own process; returns (seconds, API calls, peak RSS in KiB, resources, exit code)."""
+    script, arguments = SCAN_MODES[mode]
+    env = dict(os.environ, CMDB_CACHE_DIR=os.path.join(work_dir, 'cache'), **profile_env)
+    if mode == 'multi':
+        arguments = arguments + ['--profiles', ','.join(profiles)]
+        for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN', 'AWS_PROFILE'):
+            env.pop(name, None)
+    else:
+        env.update(AWS_ACCESS_KEY_ID=fake.access_key(0), AWS_SECRET_ACCESS_KEY='fake', AWS_DEFAULT_REGION='us-east-1')
+        env.pop('AWS_PROFILE', None)
+    log_path = os.path.join(work_dir, 'output.log')
+    fake.reset()
+    start = time.perf_counter()
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), script),
+                                    *arguments], cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        # wait4 instead of wait: the peak RSS of this one child, not of all children so far
+        _pid, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    with open(log_path) as f:
+        found = [int(next(group for group in match.groups() if group)) for match in _FOUND_RE.finditer(f.read())]
+    return elapsed, fake.total_calls(), usage.ru_maxrss, found[-1] if found else None, process.returncode
+
+
+def bench_scan(args):
+    """Every scanner mode against the same synthetic multi-account estate."""
+    modes = [mode for mode in args.modes.split(',') if mode]
+    unknown = set(modes) - set(SCAN_MODES)
+    if unknown:
+        sys.exit(f"Unknown modes: {', '.join(sorted(unknown))} (choices: {', '.join(SCAN_MODES)})")
+    names = synthetic_regions(args.regions + args.disabled_regions)
+    results = {}
+    with FakeAWS(latency=args.latency, regions=names[:args.regions], disabled_regions=names[args.regions:],
+                 accounts=args.accounts, resources_per_service=args.resources, children_per_resource=args.children,
+                 page_size=args.page_size, throttle_rate=args.throttle_rate, seed=args.seed) as fake:
+        root = tempfile.mkdtemp(prefix='bench-cmdb-scan-')
+        profiles, profile_env = fake.write_profiles(os.path.join(root, 'aws'))
+        print(f"{args.accounts} accounts x {args.regions} regions ({args.disabled_regions} disabled), "
+              f"{args.resources} resources per service, {args.page_size} per page, "
+              f"{args.latency * 1000:.0f} ms per call, {args.throttle_rate:.1%} throttled")
+        print(f"  {'mode':8s} {'wall':>8s} {'API calls':>10s} {'peak RSS':>10s} {'resources':>10s}")
+        for mode in modes:
+            runs = []
+            for number in range(args.repeat):
+                work_dir = os.path.join(root, f"{mode}-{number}")
+                os.makedirs(work_dir)
+                runs.append(_run_scan(fake, mode, work_dir, profiles, profile_env))
+            elapsed, calls, peak_rss, found, exit_code = min(runs)  # Best wall time of the repeats
+            results[mode] = {'wall_time': round(elapsed, 3), 'api_calls': calls, 'peak_rss_kib': peak_rss,
+                             'resources': found, 'exit_code': exit_code}
+            failed = f"  exit code {exit_code}, see {os.path.join(root, mode + '-0', 'output.log')}" if exit_code else ''
+            print(f"  {mode:8s} {elapsed:7.2f}s {calls:10d} {peak_rss / 1024:8.1f}MiB {found if found is not None else '?':>10}"
+                  f"{failed}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'parameters': {key: value for key, value in vars(args).items() if key != 'func'},
+                       'results': results}, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+def main():
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    clients_parser = subparsers.add_parser('clients', help='shared session/client cache vs per-task sessions')
+    clients_parser.add_argument('--latency', type=float, default=0.01, help='seconds of delay per fake API call')
+    clients_parser.add_argument('--workers', type=int, default=20)
+    clients_parser.set_defaults(func=bench_clients)
+
+    enrichment_parser = subparsers.add_parser('enrichment', help='per-item detail calls: serial vs shared pool')
+    enrichment_parser.add_argument('--tables', type=int, default=200)
+    enrichment_parser.add_argument('--latency', type=float, default=0.02, help='seconds per describe_table call')
+    enrichment_parser.set_defaults(func=bench_enrichment)
+
+    scan_parser = subparsers.add_parser('scan', help='every scanner mode against a synthetic multi-account estate')
+    scan_parser.add_argument('--accounts', type=int, default=3, help="accounts (only the 'multi' mode scans them all)")
+    scan_parser.add_argument('--regions', type=int, default=8, help='enabled regions per account')
+    scan_parser.add_argument('--disabled-regions', type=int, default=2, help='opt-in regions not enabled')
+    scan_parser.add_argument('--resources', type=int, default=50, help='resources of every type per account and region')
+    scan_parser.add_argument('--children', type=int, default=2, help='ECS services per cluster and ECR images per repository')
+    scan_parser.add_argument('--page-size', type=int, default=50, help='items per page of every list call')
+    scan_parser.add_argument('--latency', type=float, default=0.02, help='seconds of delay per fake API call')
+    scan_parser.add_argument('--throttle-rate', type=float, default=0.0, help='fraction of calls throttled')
+    scan_parser.add_argument('--seed', type=int, default=0, help='seed of the throttling draws')
+    scan_parser.add_argument('--modes', default=','.join(SCAN_MODES), help='comma-separated modes (default: all)')
+    scan_parser.add_argument('--repeat', type=int, default=1, help='runs per mode; the fastest is reported')
+    scan_parser.add_argument('--json', metavar='FILE', help='also save the parameters and results as JSON')
+    scan_parser.set_defaults(func=bench_scan)
+
+    processes_parser = subparsers.add_parser('processes', help='thread scheduler vs process engine scaling')
+    processes_parser.add_argument('--regions', type=int, default=8)
+    processes_parser.add_argument('--resources', type=int, default=1000, help='resources of every type per region')
+    processes_parser.add_argument('--page-size', type=int, default=1000)
+    processes_parser.add_argument('--processes', default=','.join(str(number) for number in (1, 2, 4, 8)
+                                                                  if number <= max(os.cpu_count() or 1, 2)),
+                                  help='comma-separated worker counts (default: 1, 2, 4, 8 up to the CPU count)')
+    processes_parser.set_defaults(func=bench_processes)
+
+    args = parser.parse_args()
+    scanner.CACHE_DIR = tempfile.mkdtemp(prefix='bench-cmdb-')  # Keep the user's caches untouched
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python
+
+"""
+Record/replay cassettes of the botocore traffic of a scan.
+
+Recording (list_resources_arn.py --record-cassette FILE) stores every API call of
+the scan, with the response status, body and latency, in a gzip-compressed NDJSON
+file. Cassettes are sanitized as they are written: the scanned account id and
+the caller identity (GetCallerIdentity UserId and ARN, including the user or
+session name) are replaced by stable fake ones everywhere, request ids in JSON
+and XML bodies are zeroed, and only the response headers the parsers need are
+kept (no request ids, dates or credentials).
+
+Replaying (list_resources_arn.py --replay-cassette FILE) answers every call from
+the cassette instead of AWS, with no credentials or network needed. Responses go
+through the normal botocore parsers, so parsing and record building cost what they
+cost live; --replay-latency-scale sleeps the recorded latency times the scale
+before each response (1 = as recorded, 0 = no waiting).
+
+Calls are matched by service, region, operation and parameters; a call that is
+not in the cassette fails with CassetteMiss. Scan with the same caches (or
+--refresh-regions and an empty CMDB_CACHE_DIR) when recording and replaying.
+
+Usage:
+    ./list_resources_arn.py --record-cassette scan-322963330866.cassette.gz
+    CMDB_CACHE_DIR=$(mktemp -d) ./list_resources_arn.py --replay-cassette scan-322963330866.cassette.gz \
+        --replay-latency-scale 0
+    ./cmdb_cassette.py stats scan-322963330866.cassette.gz
+"""
+
+from collections import deque
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+
+
+CASSETTE_VERSION = 1
+KEPT_HEADERS = {'content-type', 'x-amzn-errortype', 'x-amz-bucket-region'}
+MASKED_REQUEST_ID = '00000000-0000-0000-0000-000000000000'
+# Request ids of response bodies: <RequestId>, <requestId>, <RequestID>, S3's <HostId> and their JSON forms
+XML_REQUEST_ID_RE = re.compile(r'<(RequestI[dD]|requestId|HostId)>[^<]*</\1>')
+JSON_REQUEST_ID_RE = re.compile(r'"(RequestI[dD]|requestId)"(\s*:\s*)"[^"]*"')
+
+
+class CassetteMiss(Exception):
+    """A replayed call has no recorded response."""
+
+
+def masked_account(account_id):
+    """Stable fake 12-digit account id standing for account_id in a cassette."""
+    return f"{int(hashlib.sha1(account_id.encode('utf-8')).hexdigest()[:12], 16) % 10 ** 12:012d}"
+
+
+def masked_identity(value):
+    """Stable fake stand-in for an identity string (user id, user or session name)."""
+    return f"masked-{hashlib.sha1(value.encode('utf-8')).hexdigest()[:12]}"
+
+
+def identity_masks(identity):
+    """{real: fake} for the account, UserId, ARN and user/session name of a GetCallerIdentity response."""
+    masks = {}
+    user_id, arn = identity.get('UserId') or '', identity.get('Arn') or ''
+    names = []
+    if user_id:
+        masks[user_id] = masked_identity(user_id)
+        if ':' in user_id:  # AROA...:<session name> of an assumed role
+            names.append(user_id.split(':', 1)[1])
+    resource = arn.split(':', 5)[-1]  # user/<name>, assumed-role/<role>/<session>...
+    if '/' in resource:
+        name = resource.rsplit('/', 1)[1]
+        masks[arn] = arn[:-len(name)] + masked_identity(name)  # Keeps the ARN shape; the account is masked after
+        names.append(name)
+    for name in names:
+        if len(name) >= 4:  # Shorter names would mangle unrelated text
+            masks[name] = masked_identity(name)
+    if identity.get('Account'):
+        masks[identity['Account']] = masked_account(identity['Account'])
+    return masks
+
+
+def strip_request_ids(text):
+    """Replace the request ids of a JSON or XML response body by a constant."""
+    text = XML_REQUEST_ID_RE.sub(lambda match: f"<{match.group(1)}>{MASKED_REQUEST_ID}</{match.group(1)}>", text)
+    return JSON_REQUEST_ID_RE.sub(lambda match: f'"{match.group(1)}"{match.group(2)}"{MASKED_REQUEST_ID}"', text)
+
+
+def call_key(service_name, region, operation_name, params):
+    return json.dumps([service_name, region, operation_name, params], sort_keys=True, default=str)
+
+
+def _encode_body(body):
+    try:
+        return {'body': body.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'body_base64': base64.b64encode(body).decode('ascii')}
+
+
+def _decode_body(entry):
+    if 'body_base64' in entry:
+        return base64.b64decode(entry['body_base64'])
+    return entry['body'].encode('utf-8')
+
+
+class CassetteRecorder:
+    """
+    ClientCache hook (attach) writing every call of the hooked clients to a cassette.
+    The identity of a GetCallerIdentity call (see identity_masks) is masked in that
+    call and in everything that follows it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+        self._masks = {}
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._file.write(json.dumps({'cassette': CASSETTE_VERSION, 'recorded_at': time.time()}) + '\n')
+
+    def _sanitize(self, text):
+        for real, replacement in self._masks.items():  # Longest first: a name may be part of an id
+            text = text.replace(real, replacement)
+        return text
+
+    def attach(self, client, service_name, region):
+        def on_parameter_build(params=None, model=None, context=None, **kwargs):
+            context['cassette_key'] = call_key(service_name, region, model.name, params)
+
+        def on_before_call(context=None, **kwargs):
+            context['cassette_started'] = time.perf_counter()
+
+        def on_after_call(http_response=None, parsed=None, model=None, context=None, **kwargs):
+            if http_response is None or 'cassette_key' not in context:
+                return
+            latency = time.perf_counter() - context.get('cassette_started', time.perf_counter())
+            if model.name == 'GetCallerIdentity' and parsed:
+                with self._lock:
+                    masks = {**self._masks, **identity_masks(parsed)}
+                    self._masks = dict(sorted(masks.items(), key=lambda item: -len(item[0])))
+            entry = {'key': context['cassette_key'], 'status': http_response.status_code,
+                     'headers': {name.lower(): value for name, value in http_response.headers.items()
+                                 if name.lower() in KEPT_HEADERS},
+                     'retries': (parsed or {}).get('ResponseMetadata', {}).get('RetryAttempts', 0),
+                     'latency': round(latency, 4), **_encode_body(http_response.content or b'')}
+            with self._lock:
+                entry['key'] = self._sanitize(entry['key'])
+                if 'body' in entry:
+                    entry['body'] = strip_request_ids(self._sanitize(entry['body']))
+                self._file.write(json.dumps(entry) + '\n')
+                self.calls += 1
+
+        client.meta.events.register('before-parameter-build', on_parameter_build)
+        client.meta.events.register('before-call', on_before_call)
+        client.meta.events.register('after-call', on_after_call)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def summary(self):
+        return f"Recorded {self.calls} API calls to {self.path}"
+
+
+def read_cassette(path):
+    """(header, [entries]) of a cassette file."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('cassette') != CASSETTE_VERSION:
+            raise ValueError(f"{path} is not a version {CASSETTE_VERSION} cassette")
+        return header, [json.loads(line) for line in f if line.strip()]
+
+
+class _RecordedBody:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class CassettePlayer:
+    """
+    ClientCache hook (attach) answering every call of the hooked clients from a
+    cassette. Identical calls get their recorded responses in order; the last one
+    is repeated if a call is made more often than recorded.
+    """
+
+    def __init__(self, path, latency_scale=1.0):
+        self.path = path
+        self.latency_scale = latency_scale
+        self.calls = 0
+        self.misses = 0
+        _header, entries = read_cassette(path)
+        self._responses = {}
+        for entry in entries:
+            self._responses.setdefault(entry['key'], deque()).append(entry)
+        self._lock = threading.Lock()
+
+    def _next(self, key):
+        with self._lock:
+            responses = self._responses.get(key)
+            if not responses:
+                self.misses += 1
+                return None
+            self.calls += 1
+            return responses.popleft() if len(responses) > 1 else responses[0]
+
+    def attach(self, client, service_name, region):
+        # Imported here so `cmdb_cassette.py stats` does not load botocore
+        import botocore.awsrequest
+        import botocore.parsers
+
+        protocol = client.meta.service_model.protocol
+
+        def on_parameter_build(params=None, model=None, context=None, **kwargs):
+            context['cassette_key'] = call_key(service_name, region, model.name, params)
+
+        def on_before_call(model=None, params=None, context=None, **kwargs):
+            entry = self._next(context['cassette_key'])
+            if entry is None:
+                raise CassetteMiss(f"No recorded response for {model.name} in {service_name}/{region}: "
+                                   f"{context['cassette_key']}")
+            if self.latency_scale:
+                time.sleep(entry['latency'] * self.latency_scale)
+            http = botocore.awsrequest.AWSResponse(params.get('url', ''), entry['status'], entry['headers'],
+                                                   _RecordedBody(_decode_body(entry)))
+            response = {'headers': http.headers, 'status_code': http.status_code, 'body': http.content,
+                        'context': {'operation_name': model.name}}
+            parsed = botocore.parsers.create_parser(protocol).parse(response, model.output_shape)
+            if 'ResponseMetadata' in parsed:
+                parsed['ResponseMetadata']['RetryAttempts'] = entry.get('retries', 0)
+            return http, parsed
+
+        client.meta.events.register('before-parameter-build', on_parameter_build)
+        client.meta.events.register('before-call', on_before_call)
+
+    def close(self):
+        pass
+
+    def summary(self):
+        missed = f", {self.misses} not in the cassette" if self.misses else ''
+        return f"Replayed {self.calls} API calls from {self.path}{missed}"
+
+
+def cassette_stats(path):
+    """Print calls, bytes and recorded latency per service and operation."""
+    header, entries = read_cassette(path)
+    totals = {}
+    for entry in entries:
+        service_name, region, operation_name, _params = json.loads(entry['key'])
+        total = totals.setdefault((service_name, operation_name), {'calls': 0, 'errors': 0, 'bytes': 0,
+                                                                   'latency': 0.0, 'regions': set()})
+        total['calls'] += 1
+        total['errors'] += entry['status'] >= 300
+        total['bytes'] += len(_decode_body(entry))
+        total['latency'] += entry['latency']
+        total['regions'].add(region)
+    print(f"{path}: {len(entries)} calls recorded at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(header['recorded_at']))}")
+    print(f"  {'service.operation':45s} {'calls':>6s} {'errors':>6s} {'regions':>7s} {'KiB':>9s} {'latency':>9s}")
+    for (service_name, operation_name), total in sorted(totals.items(), key=lambda item: -item[1]['latency']):
+        print(f"  {service_name + '.' + operation_name:45s} {total['calls']:6d} {total['errors']:6d} "
+              f"{len(total['regions']):7d} {total['bytes'] / 1024:9.1f} {total['latency']:8.2f}s")
+
+
+def main(argv=None):
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    stats_parser = subparsers.add_parser('stats', help='calls, bytes and latency per operation of a cassette')
+    stats_parser.add_argument('path')
+    args = parser.parse_args(argv)
+    cassette_stats(args.path)
+
+
+if __name__ == "__main__":
+    main()
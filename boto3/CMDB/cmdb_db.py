@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+
+"""
+SQLite CMDB: one row per resource ARN, upserted by every scan, with first/last
+seen dates and a history table of attribute changes.
+
+list_resources_arn.py --output-format sqlite and list_resources_arn_multi.py --db
+write into it; this script imports old JSON/NDJSON/.cmdb snapshots and queries it.
+
+Usage:
+    ./cmdb_db.py import previous-run/20250516 .        # seed from existing snapshots
+    ./cmdb_db.py query --service alb --region sa-east-1  # all ALBs in sa-east-1, every account
+    ./cmdb_db.py disappeared --days 7
+    ./cmdb_db.py new --days 7
+    ./cmdb_db.py history arn:aws:ec2:us-east-1:882591113908:instance/i-05b9d591b76027bb4
+"""
+
+from datetime import datetime, timedelta, timezone
+import argparse
+import json
+import os
+import sqlite3
+import threading
+
+import cmdb_diff
+
+
+DEFAULT_DB_PATH = 'cmdb.sqlite3'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    arn TEXT PRIMARY KEY,
+    account TEXT NOT NULL,
+    region TEXT NOT NULL,
+    service TEXT NOT NULL,
+    name TEXT,
+    record TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    deleted_at TEXT
+);
+CREATE INDEX IF NOT EXISTS resources_account ON resources (account);
+CREATE INDEX IF NOT EXISTS resources_region_service ON resources (region, service);
+CREATE INDEX IF NOT EXISTS resources_service ON resources (service);
+CREATE INDEX IF NOT EXISTS resources_first_seen ON resources (first_seen);
+CREATE INDEX IF NOT EXISTS resources_last_seen ON resources (last_seen);
+CREATE INDEX IF NOT EXISTS resources_deleted_at ON resources (deleted_at);
+
+CREATE TABLE IF NOT EXISTS history (
+    arn TEXT NOT NULL,
+    account TEXT NOT NULL,
+    changed_at TEXT NOT NULL,
+    change TEXT NOT NULL,      -- created, updated, deleted or restored
+    field TEXT,                -- updated only
+    old_value TEXT,
+    new_value TEXT
+);
+CREATE INDEX IF NOT EXISTS history_arn ON history (arn, changed_at);
+CREATE INDEX IF NOT EXISTS history_changed_at ON history (changed_at);
+"""
+
+SQLITE_MAX_VARIABLES = 500  # ARNs per "IN (...)" lookup
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def _normalized(record):
+    """Record as it reads back from the database (datetimes and the like as strings)."""
+    return json.loads(json.dumps(record, default=str))
+
+
+class CmdbDatabase:
+    """
+    Resource table keyed by ARN plus its change history. Safe to share between the
+    threads of list_resources_arn_multi.py: every write holds one lock.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.stats = {'created': 0, 'updated': 0, 'restored': 0, 'unchanged': 0, 'deleted': 0}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _existing(self, arns):
+        """{arn: row} for the ARNs already in the table."""
+        rows = {}
+        for start in range(0, len(arns), SQLITE_MAX_VARIABLES):
+            chunk = arns[start:start + SQLITE_MAX_VARIABLES]
+            query = f"SELECT arn, record, deleted_at FROM resources WHERE arn IN ({','.join('?' * len(chunk))})"
+            rows.update((row['arn'], row) for row in self.conn.execute(query, chunk))
+        return rows
+
+    def upsert_batch(self, account_id, batch, seen_at=None):
+        """Upsert one {service_key: [records]} batch of account_id, recording what changed."""
+        seen_at = seen_at or utc_now()
+        records = [(service_key, _normalized(record)) for service_key, records in batch.items()
+                   for record in records if record.get('arn')]
+        with self._lock, self.conn:
+            existing = self._existing([record['arn'] for _service_key, record in records])
+            upserts, history = [], []
+            for service_key, record in records:
+                arn = record['arn']
+                record_account = account_id or cmdb_diff.record_account(record)
+                row = existing.get(arn)
+                if row is None:
+                    change = 'created'
+                    history.append((arn, record_account, seen_at, change, None, None, None))
+                else:
+                    old_record = json.loads(row['record'])
+                    deltas = cmdb_diff.field_deltas(old_record, record)
+                    for field, (old_value, new_value) in deltas.items():
+                        history.append((arn, record_account, seen_at, 'updated', field,
+                                        json.dumps(old_value, default=str), json.dumps(new_value, default=str)))
+                    if row['deleted_at']:
+                        change = 'restored'
+                        history.append((arn, record_account, seen_at, change, None, None, None))
+                    else:
+                        change = 'updated' if deltas else 'unchanged'
+                self.stats[change] += 1
+                upserts.append((arn, record_account, record.get('region', 'global_or_unknown'), service_key,
+                                record.get('name'), json.dumps(record, sort_keys=True), seen_at, seen_at))
+            self.conn.executemany(
+                "INSERT INTO resources (arn, account, region, service, name, record, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (arn) DO UPDATE SET account = excluded.account, region = excluded.region, "
+                "service = excluded.service, name = excluded.name, record = excluded.record, "
+                "last_seen = excluded.last_seen, deleted_at = NULL", upserts)
+            self.conn.executemany("INSERT INTO history VALUES (?, ?, ?, ?, ?, ?, ?)", history)
+
+    def mark_missing(self, account_id, scan_started, deleted_at=None, scopes=None):
+        """
+        Flag the live resources of account_id that the scan started at scan_started did
+        not see as deleted. scopes limits this to the {(service_key, region)} groups the
+        scan covered in full (region None: any region), see ScanCoverage in
+        list_resources_arn.py; without it the scan must have covered everything.
+        """
+        deleted_at = deleted_at or utc_now()
+        with self._lock, self.conn:
+            arns = [row['arn'] for row in self.conn.execute(
+                "SELECT arn, service, region FROM resources WHERE account = ? AND deleted_at IS NULL AND last_seen < ?",
+                (account_id, scan_started))
+                if scopes is None or (row['service'], row['region']) in scopes or (row['service'], None) in scopes]
+            self.conn.executemany("UPDATE resources SET deleted_at = ? WHERE arn = ?",
+                                  [(deleted_at, arn) for arn in arns])
+            self.conn.executemany("INSERT INTO history VALUES (?, ?, ?, 'deleted', NULL, NULL, NULL)",
+                                  [(arn, account_id, deleted_at) for arn in arns])
+        self.stats['deleted'] += len(arns)
+        return arns
+
+    def select(self, service=None, region=None, account=None, include_deleted=False):
+        """Records matching every given criterion; each query is served by an index."""
+        clauses, params = [], []
+        for column, value in (('service', service), ('region', region), ('account', account)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if not include_deleted:
+            clauses.append("deleted_at IS NULL")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        return self.conn.execute(f"SELECT * FROM resources {where} ORDER BY account, region, service, arn", params).fetchall()
+
+    def disappeared(self, since):
+        """Resources flagged as deleted at or after since (ISO timestamp)."""
+        return self.conn.execute("SELECT * FROM resources WHERE deleted_at >= ? ORDER BY deleted_at, arn",
+                                 (since,)).fetchall()
+
+    def appeared(self, since):
+        """Resources first seen at or after since (ISO timestamp)."""
+        return self.conn.execute("SELECT * FROM resources WHERE first_seen >= ? ORDER BY first_seen, arn",
+                                 (since,)).fetchall()
+
+    def history(self, arn):
+        return self.conn.execute("SELECT * FROM history WHERE arn = ? ORDER BY changed_at, rowid", (arn,)).fetchall()
+
+
+def import_snapshots(db, paths):
+    """
+    Upsert existing snapshot files (all-services JSON, NDJSON streams, .cmdb), oldest
+    first, each with the date in its file name. Records keep the account stored with
+    them (NDJSON, .cmdb) or named by their file; ARNs without an account (API Gateway)
+    get that account as well. A scan file named after its account, or the merged
+    NDJSON of several, is a full scan of them, so what it lacks is flagged as deleted
+    at its date.
+    """
+    dated = []
+    for path in paths:
+        for file_path, merged_account_id in cmdb_diff.snapshot_files(path):
+            match = cmdb_diff.DIRECTORY_FILE_RE.search(os.path.basename(file_path))
+            if match:
+                seen_at = datetime.strptime(match.group(2), "%Y%m%d-%H%M%S").replace(tzinfo=timezone.utc)
+                file_account_id = merged_account_id or (match.group(1) if match.group(1) != 'merged' else None)
+            else:
+                seen_at = datetime.fromtimestamp(os.path.getmtime(file_path), timezone.utc)
+                file_account_id = merged_account_id
+            dated.append((seen_at.isoformat(timespec='seconds'), file_path, merged_account_id, file_account_id,
+                          match is not None))
+    for seen_at, file_path, merged_account_id, file_account_id, full_scan in sorted(dated, key=lambda entry: entry[:2]):
+        batches = {file_account_id: {}} if full_scan and file_account_id else {}
+        for account_id, service_key, record in cmdb_diff.iter_snapshot_entries(file_path, merged_account_id):
+            account_id = account_id or file_account_id or cmdb_diff.record_account(record)
+            batches.setdefault(account_id, {}).setdefault(service_key, []).append(record)
+        imported, deleted = 0, 0
+        for account_id, batch in batches.items():
+            db.upsert_batch(account_id, batch, seen_at)
+            imported += sum(len(records) for records in batch.values())
+            if full_scan and account_id != 'unknown':
+                deleted += len(db.mark_missing(account_id, seen_at, seen_at))
+        print(f"Imported {imported} resources from {file_path} ({seen_at})"
+              + (f", {deleted} gone since the previous snapshot" if deleted else ''))
+
+
+def print_rows(rows, date_column=None):
+    for row in rows:
+        date = f" {row[date_column]}" if date_column else ''
+        print(f"{row['account']:14s} {row['region']:16s} {row['service']:28s}{date} {row['arn']}")
+    print(f"{len(rows)} resources.")
+
+
+def main(argv=None):
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='SQLite file (default: %(default)s)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='upsert existing JSON/NDJSON/.cmdb snapshots')
+    import_parser.add_argument('paths', nargs='+', help='snapshot files or directories')
+
+    query_parser = subparsers.add_parser('query', help='list resources by service, region and/or account')
+    query_parser.add_argument('--service', help="service key, e.g. alb, ec2, iam")
+    query_parser.add_argument('--region')
+    query_parser.add_argument('--account')
+    query_parser.add_argument('--include-deleted', action='store_true')
+
+    for name, help_text in (('disappeared', 'resources flagged as deleted recently'),
+                            ('new', 'resources first seen recently')):
+        period_parser = subparsers.add_parser(name, help=help_text)
+        period_parser.add_argument('--days', type=float, default=7, help='look back this many days (default: %(default)s)')
+
+    history_parser = subparsers.add_parser('history', help='change history of one resource')
+    history_parser.add_argument('arn')
+
+    args = parser.parse_args(argv)
+    with CmdbDatabase(args.db) as db:
+        if args.command == 'import':
+            import_snapshots(db, args.paths)
+            print(f"Created {db.stats['created']}, updated {db.stats['updated']}, restored {db.stats['restored']}, "
+                  f"unchanged {db.stats['unchanged']}, deleted {db.stats['deleted']}.")
+        elif args.command == 'query':
+            print_rows(db.select(args.service, args.region, args.account, args.include_deleted))
+        elif args.command in ('disappeared', 'new'):
+            since = (datetime.now(timezone.utc) - timedelta(days=args.days)).isoformat(timespec='seconds')
+            if args.command == 'disappeared':
+                print_rows(db.disappeared(since), 'deleted_at')
+            else:
+                print_rows(db.appeared(since), 'first_seen')
+        elif args.command == 'history':
+            for row in db.history(args.arn):
+                detail = f" {row['field']}: {row['old_value']} -> {row['new_value']}" if row['field'] else ''
+                print(f"{row['changed_at']} {row['change']}{detail}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+
+"""
+Compare two CMDB snapshots and report added, removed and changed resources,
+with field-level deltas for the changed ones.
+
+A snapshot is a file or a directory:
+  - aws_resources_all_services_*.json (by service) or aws_resources_by_region_*.json,
+    including files that are several such documents concatenated;
+  - NDJSON streams written by list_resources_arn.py --output-format ndjson or the
+    merged file of list_resources_arn_multi.py;
+  - compact .cmdb snapshots (list_resources_arn.py --output-format compact);
+  - a directory: the files of the latest scan of every account in it, whatever
+    their format (all-services JSON, NDJSON stream, .cmdb). A merged NDJSON of
+    list_resources_arn_multi.py counts as a scan of every account it holds, and only
+    the records of the accounts it is the latest scan of are loaded from it. Older
+    scans are ignored, so resources deleted since then are reported as removed.
+
+Both snapshots are loaded into a hash index keyed by (service key, ARN), so the diff
+is linear in the snapshot size.
+
+Usage:
+    ./cmdb_diff.py previous-run/20250516 .
+    ./cmdb_diff.py old.json new.json --summary
+    ./cmdb_diff.py previous-run/20250516 . --ignore tags --json diff.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+
+import cmdb_snapshot
+
+
+SNAPSHOT_FILE_RE = re.compile(r'aws_resources_all_services_(\d{12})_(\d{8}-\d{6})\.json$')
+# Every snapshot file name of a directory: all-services JSON, NDJSON stream or .cmdb of one
+# account, or the merged NDJSON of several accounts
+DIRECTORY_FILE_RE = re.compile(r'aws_resources_(?:all_services_)?(\d{12}|merged)_(\d{8}-\d{6})\.(?:json|ndjson|cmdb)$')
+NDJSON_ACCOUNT_RE = re.compile(r'\{"account":"([^"]*)"')  # NdjsonWriter puts the account first
+
+
+def _iter_json_documents(path):
+    """Yield every JSON document of a file, which may hold several concatenated ones."""
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        text = f.read()
+    position = 0
+    while True:
+        while position < len(text) and text[position].isspace():
+            position += 1
+        if position >= len(text):
+            return
+        document, position = decoder.raw_decode(text, position)
+        yield document
+
+
+def iter_snapshot_entries(path, account_id=None):
+    """
+    Yield (account_id, service_key, record) for every record of one snapshot file. The
+    account is the one stored with the record in NDJSON and .cmdb files, and None in
+    JSON files (see the file name). With account_id, only the records of that account
+    of an NDJSON stream are read (merged multi-account files).
+    """
+    if path.endswith('.cmdb'):
+        yield from cmdb_snapshot.SnapshotReader(path).iter_records()
+        return
+    if path.endswith('.ndjson'):
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Truncated last line of an interrupted stream
+                if account_id is None or entry.get('account') == account_id:
+                    yield entry.get('account'), entry['service'], entry['record']
+        return
+
+    for document in _iter_json_documents(path):
+        for outer_key, value in document.items():
+            if isinstance(value, list):  # {service: [records]}
+                for record in value:
+                    yield None, outer_key, record
+            else:  # {region: {service: [records]}}
+                for service_key, records in value.items():
+                    for record in records:
+                        yield None, service_key, record
+
+
+def iter_snapshot_file(path, account_id=None):
+    """Yield (service_key, record) for every record of one snapshot file; see iter_snapshot_entries."""
+    for _account_id, service_key, record in iter_snapshot_entries(path, account_id):
+        yield service_key, record
+
+
+def ndjson_accounts(path):
+    """Accounts present in an NDJSON stream (only the start of every line is parsed)."""
+    accounts = set()
+    with open(path) as f:
+        for line in f:
+            match = NDJSON_ACCOUNT_RE.match(line)
+            if match:
+                accounts.add(match.group(1))
+    return accounts
+
+
+def snapshot_files(path):
+    """
+    Resolve a snapshot argument to the (file, account_id) pairs to load: for a directory,
+    the files of the newest timestamp of every account (one scan may have written several
+    formats). account_id is None for a whole file; a merged NDJSON is split by account,
+    and only loaded for the accounts it holds the newest scan of.
+    """
+    if not os.path.isdir(path):
+        return [(path, None)]
+    runs = {}
+    for file_path in glob.glob(os.path.join(path, 'aws_resources_*')):
+        match = DIRECTORY_FILE_RE.search(os.path.basename(file_path))
+        if not match:
+            continue
+        account_id, timestamp = match.groups()
+        if account_id == 'merged':
+            for merged_account_id in ndjson_accounts(file_path):
+                runs.setdefault(merged_account_id, {}).setdefault(timestamp, []).append((file_path, merged_account_id))
+        else:
+            runs.setdefault(account_id, {}).setdefault(timestamp, []).append((file_path, None))
+    return sorted(entry for by_timestamp in runs.values() for entry in by_timestamp[max(by_timestamp)])
+
+
+def load_snapshot(path):
+    """Return {(service_key, arn): record} for a snapshot file or directory."""
+    index = {}
+    for file_path, account_id in snapshot_files(path):
+        for service_key, record in iter_snapshot_file(file_path, account_id):
+            index[(service_key, record.get('arn'))] = record
+    return index
+
+
+def record_account(record, default='unknown'):
+    """
+    Account of a record: from its ARN, or the 'account' field for S3 buckets, else default
+    (pass the scanned account for ARNs without one, such as API Gateway's).
+    """
+    parts = (record.get('arn') or '').split(':')
+    return (parts[4] if len(parts) > 4 else '') or record.get('account') or default
+
+
+def field_deltas(old_record, new_record, ignore=()):
+    """Return {field: (old_value, new_value)} for every field that differs."""
+    deltas = {}
+    for field in old_record.keys() | new_record.keys():
+        if field in ignore:
+            continue
+        old_value, new_value = old_record.get(field), new_record.get(field)
+        if old_value != new_value:
+            deltas[field] = (old_value, new_value)
+    return deltas
+
+
+def diff_snapshots(old_index, new_index, ignore=()):
+    """Return (added keys, removed keys, {key: deltas}) between two snapshot indexes."""
+    added = [key for key in new_index if key not in old_index]
+    removed = [key for key in old_index if key not in new_index]
+    changed = {}
+    for key, new_record in new_index.items():
+        old_record = old_index.get(key)
+        if old_record is not None and old_record != new_record:
+            deltas = field_deltas(old_record, new_record, ignore)
+            if deltas:
+                changed[key] = deltas
+    return sorted(added, key=str), sorted(removed, key=str), dict(sorted(changed.items(), key=lambda item: str(item[0])))
+
+
+def print_report(old_index, new_index, added, removed, changed, summary=False):
+    """Print the diff, grouped by account and service key."""
+    print(f"Old snapshot: {len(old_index)} resources; new snapshot: {len(new_index)} resources.")
+    print(f"Added: {len(added)}, removed: {len(removed)}, changed: {len(changed)}")
+
+    counts = {}
+    for kind, keys, index in (('added', added, new_index), ('removed', removed, old_index), ('changed', changed, new_index)):
+        for key in keys:
+            group = (record_account(index[key]), key[0])
+            counts.setdefault(group, {'added': 0, 'removed': 0, 'changed': 0})[kind] += 1
+    if counts:
+        print("\nAccount        Service/Item                   added removed changed")
+        for (account_id, service_key), group_counts in sorted(counts.items()):
+            print(f"{account_id:14s} {service_key:30s} {group_counts['added']:5d} {group_counts['removed']:7d} "
+                  f"{group_counts['changed']:7d}")
+    if summary:
+        return
+
+    for sign, keys in (('+', added), ('-', removed)):
+        for service_key, arn in keys:
+            print(f"{sign} {service_key:28s} {arn}")
+    for (service_key, arn), deltas in changed.items():
+        print(f"~ {service_key:28s} {arn}")
+        for field, (old_value, new_value) in sorted(deltas.items()):
+            print(f"      {field}: {old_value!r} -> {new_value!r}")
+
+
+def main(argv=None):
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('old', help='previous snapshot (file or directory)')
+    parser.add_argument('new', help='current snapshot (file or directory)')
+    parser.add_argument('--ignore', default='', help='comma-separated fields left out of the comparison')
+    parser.add_argument('--summary', action='store_true', help='only print the per-account/service counts')
+    parser.add_argument('--json', metavar='FILE', help='also write the full diff as JSON to FILE')
+    args = parser.parse_args(argv)
+
+    old_index = load_snapshot(args.old)
+    new_index = load_snapshot(args.new)
+    if not old_index and not new_index:
+        print("No resources found in either snapshot.")
+        sys.exit(1)
+    ignore = {field for field in args.ignore.split(',') if field}
+    added, removed, changed = diff_snapshots(old_index, new_index, ignore)
+    print_report(old_index, new_index, added, removed, changed, summary=args.summary)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'added': [{'service': service_key, **new_index[(service_key, arn)]} for service_key, arn in added],
+                'removed': [{'service': service_key, **old_index[(service_key, arn)]} for service_key, arn in removed],
+                'changed': [{'service': service_key, 'arn': arn,
+                             'fields': {field: {'old': old_value, 'new': new_value}
+                                        for field, (old_value, new_value) in deltas.items()}}
+                            for (service_key, arn), deltas in changed.items()]
+            }, f, indent=2, default=str)
+        print(f"\nDiff saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+
+"""
+Compact columnar snapshot format for CMDB scans (.cmdb files).
+
+Records are grouped in one block per service key and record shape (the same fields
+in the same order), sorted by region inside the block. Every field of a block is a
+column, and every column is a separately zlib-compressed JSON list: a column holds
+values of one kind (ARNs sharing their prefix, a handful of regions or subclasses),
+which is what compresses well. Columns made of long runs of one value (account,
+region, subclass...) are stored as [[value, run length], ...] instead. The file
+header lists the blocks with the row range of each region and the offset of each
+column, so:
+  - one service or one region is read with a seek per block instead of parsing the
+    whole snapshot;
+  - only the columns asked for are decompressed (iter_columns, e.g. just the ARNs);
+  - records are rebuilt with dict(zip(fields, row)) over the decoded columns, since
+    every record of a block has the same fields.
+
+Layout:
+    b'CMDBSNP2' | header length (8 bytes, big endian) | zlib(JSON header) | columns...
+    header = {"blocks": [{"service", "fields": [...], "count", "regions": [[region, first row, rows]],
+                          "columns": [[offset, length, runs]]}]}   # the account column, then one per field
+    column = zlib(JSON [value per row]), or zlib(JSON [[value, run length], ...]) if runs
+
+Usage:
+    ./cmdb_snapshot.py convert aws_resources_all_services_<account>_<timestamp>.json out.cmdb
+    ./cmdb_snapshot.py show out.cmdb --service alb --region sa-east-1
+    ./cmdb_snapshot.py bench .                  # size and load time against the JSON files
+"""
+
+from itertools import chain, groupby, repeat, starmap
+import argparse
+import glob
+import json
+import os
+import struct
+import time
+import zlib
+
+import cmdb_diff
+
+
+MAGIC = b'CMDBSNP2'
+
+
+RUNS_MAX_RATIO = 4  # Run-length encode a column when it has at most 1 run per 4 rows
+
+
+def _encode_column(values):
+    """Return (compressed column, runs): runs is true for a run-length encoded column."""
+    runs = [[value, sum(1 for _ in group)] for value, group in groupby(values)]
+    encoded = runs if len(runs) * RUNS_MAX_RATIO <= len(values) else values
+    return zlib.compress(json.dumps(encoded, separators=(',', ':'), default=str).encode('utf-8'), 6), encoded is runs
+
+
+def _decode_column(payload, runs):
+    values = json.loads(zlib.decompress(payload).decode('utf-8'))
+    return list(chain.from_iterable(starmap(repeat, values))) if runs else values
+
+
+def write_snapshot(path, rows):
+    """
+    Write rows, an iterable of (account_id, service_key, record) such as
+    ResourceStore.records, to path; returns the number of records written.
+    """
+    groups = {}
+    for account_id, service_key, record in rows:
+        groups.setdefault((service_key, tuple(record)), []).append((account_id, record))
+
+    payloads, blocks, offset = [], [], 0
+    for (service_key, fields), group_rows in sorted(groups.items()):
+        group_rows.sort(key=lambda row: str(row[1].get('region', 'global_or_unknown')))
+        regions = []
+        for position, (_account_id, record) in enumerate(group_rows):
+            region = record.get('region', 'global_or_unknown')
+            if not regions or regions[-1][0] != region:
+                regions.append([region, position, 0])
+            regions[-1][2] += 1
+        columns = []
+        for values in [[account_id for account_id, _record in group_rows]] + \
+                [[record[field] for _account_id, record in group_rows] for field in fields]:
+            payload, runs = _encode_column(values)
+            columns.append([offset, len(payload), runs])
+            payloads.append(payload)
+            offset += len(payload)
+        blocks.append({'service': service_key, 'fields': list(fields), 'count': len(group_rows),
+                       'regions': regions, 'columns': columns})
+
+    header = zlib.compress(json.dumps({'blocks': blocks}, separators=(',', ':')).encode('utf-8'), 6)
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('>Q', len(header)) + header)
+        for payload in payloads:
+            f.write(payload)
+    return sum(block['count'] for block in blocks)
+
+
+class SnapshotReader:
+    """Reads the header of a .cmdb file on open; columns are only read and decompressed when asked for."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a CMDB snapshot" + (
+                    " of this version; convert its JSON/NDJSON source again" if magic.startswith(b'CMDBSNP') else ''))
+            header_length, = struct.unpack('>Q', f.read(8))
+            header = json.loads(zlib.decompress(f.read(header_length)))
+        self.data_offset = len(MAGIC) + 8 + header_length
+        self.blocks = header['blocks']
+
+    def services(self):
+        return sorted({block['service'] for block in self.blocks})
+
+    def regions(self):
+        return sorted({region for block in self.blocks for region, _first, _rows in block['regions']})
+
+    def count(self, service=None, region=None):
+        return sum(rows for _block, _first, rows in self._selection(service, region))
+
+    def _selection(self, service, region):
+        """(block, first row, rows) of every block of service holding rows of region."""
+        selection = []
+        for block in self.blocks:
+            if service is not None and block['service'] != service:
+                continue
+            if region is None:
+                selection.append((block, 0, block['count']))
+            else:
+                selection.extend((block, first, rows) for block_region, first, rows in block['regions']
+                                 if block_region == region)
+        return selection
+
+    def _read_columns(self, f, block, indexes, first, rows):
+        """Decompress the columns of block at indexes (0: account, i + 1: field i), rows first..first+rows."""
+        spans = [block['columns'][index] for index in indexes]
+        start = min(offset for offset, _length, _runs in spans)
+        f.seek(self.data_offset + start)
+        data = f.read(max(offset + length for offset, length, _runs in spans) - start)
+        columns = []
+        for offset, length, runs in spans:
+            values = _decode_column(data[offset - start:offset - start + length], runs)
+            columns.append(values if rows == block['count'] else values[first:first + rows])
+        return columns
+
+    def iter_columns(self, fields, service=None, region=None):
+        """
+        Yield (account_id, service_key, values), values being the tuple of fields of one
+        record (None where it has no such field); only those columns are decompressed.
+        """
+        with open(self.path, 'rb') as f:
+            for block, first, rows in self._selection(service, region):
+                positions = [block['fields'].index(field) + 1 if field in block['fields'] else None for field in fields]
+                accounts, *columns = self._read_columns(f, block, [0] + [position for position in positions if position],
+                                                        first, rows)
+                decoded = iter(columns)
+                columns = [next(decoded) if position else repeat(None) for position in positions]
+                yield from zip(accounts, repeat(block['service']), zip(*columns) if columns else repeat((), rows))
+
+    def iter_records(self, service=None, region=None):
+        """Yield (account_id, service_key, record), reading only the blocks of service/region."""
+        with open(self.path, 'rb') as f:
+            for block, first, rows in self._selection(service, region):
+                fields = block['fields']
+                accounts, *columns = self._read_columns(f, block, range(len(fields) + 1), first, rows)
+                records = map(dict, map(zip, repeat(fields), zip(*columns))) if fields else (dict() for _ in range(rows))
+                yield from zip(accounts, repeat(block['service']), records)
+
+    def load(self, service=None, region=None):
+        return list(self.iter_records(service, region))
+
+
+def rows_from_snapshot_file(path):
+    """(account_id, service_key, record) for every record of a JSON/NDJSON snapshot."""
+    match = cmdb_diff.SNAPSHOT_FILE_RE.search(os.path.basename(path))
+    for account_id, service_key, record in cmdb_diff.iter_snapshot_entries(path):
+        yield account_id or (match.group(1) if match else cmdb_diff.record_account(record)), service_key, record
+
+
+def bench(paths, rounds, region):
+    """Compare size and load time of the all-services JSON files against .cmdb conversions."""
+    files = sorted(file_path for path in paths for file_path in
+                   (glob.glob(os.path.join(path, 'aws_resources_all_services_*.json')) if os.path.isdir(path) else [path]))
+    if not files:
+        print("No snapshot files found.")
+        return
+    out_dir = os.path.join(os.environ.get('TMPDIR', '/tmp'), 'cmdb-snapshot-bench')
+    os.makedirs(out_dir, exist_ok=True)
+    totals = {'json_bytes': 0, 'cmdb_bytes': 0, 'json_load': 0.0, 'cmdb_load': 0.0, 'cmdb_one_service': 0.0,
+              'cmdb_one_region': 0.0, 'cmdb_arns': 0.0, 'records': 0}
+    for json_path in files:
+        rows = list(rows_from_snapshot_file(json_path))
+        cmdb_path = os.path.join(out_dir, os.path.basename(json_path)[:-len('.json')] + '.cmdb')
+        write_snapshot(cmdb_path, rows)
+        reader = SnapshotReader(cmdb_path)
+        expected = sorted(json.dumps(row, sort_keys=True) for row in rows)
+        assert sorted(json.dumps(row, sort_keys=True) for row in reader.load()) == expected, json_path
+
+        service = max(reader.services(), key=reader.count) if reader.services() else None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            list(cmdb_diff.iter_snapshot_file(json_path))
+            totals['json_load'] += time.perf_counter() - start
+            start = time.perf_counter()
+            SnapshotReader(cmdb_path).load()
+            totals['cmdb_load'] += time.perf_counter() - start
+            start = time.perf_counter()
+            SnapshotReader(cmdb_path).load(service=service)
+            totals['cmdb_one_service'] += time.perf_counter() - start
+            start = time.perf_counter()
+            SnapshotReader(cmdb_path).load(region=region)
+            totals['cmdb_one_region'] += time.perf_counter() - start
+            start = time.perf_counter()
+            list(SnapshotReader(cmdb_path).iter_columns(('arn',)))
+            totals['cmdb_arns'] += time.perf_counter() - start
+        totals['json_bytes'] += os.path.getsize(json_path)
+        totals['cmdb_bytes'] += os.path.getsize(cmdb_path)
+        totals['records'] += len(rows)
+
+    print(f"{len(files)} snapshot files, {totals['records']} records, mean of {rounds} loads, summed over the files")
+    print(f"  JSON (indent=2): {totals['json_bytes'] / 1024:9.1f} KiB  full load {totals['json_load'] / rounds * 1000:7.1f} ms")
+    print(f"  .cmdb          : {totals['cmdb_bytes'] / 1024:9.1f} KiB  full load {totals['cmdb_load'] / rounds * 1000:7.1f} ms"
+          f"  largest service only {totals['cmdb_one_service'] / rounds * 1000:7.1f} ms"
+          f"  {region} only {totals['cmdb_one_region'] / rounds * 1000:7.1f} ms"
+          f"  ARN column only {totals['cmdb_arns'] / rounds * 1000:7.1f} ms")
+    print("  (the JSON files are always parsed whole, whatever subset is needed)")
+    print(f"  size ratio: {totals['json_bytes'] / max(totals['cmdb_bytes'], 1):.1f}x smaller")
+
+
+def main(argv=None):
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = subparsers.add_parser('convert', help='convert a JSON/NDJSON snapshot to .cmdb')
+    convert_parser.add_argument('source')
+    convert_parser.add_argument('target')
+
+    show_parser = subparsers.add_parser('show', help='print the records of one service and/or region')
+    show_parser.add_argument('path')
+    show_parser.add_argument('--service')
+    show_parser.add_argument('--region')
+
+    bench_parser = subparsers.add_parser('bench', help='size and load time against the JSON files')
+    bench_parser.add_argument('paths', nargs='*', default=['.'])
+    bench_parser.add_argument('--repeat', type=int, default=5)
+    bench_parser.add_argument('--region', default='sa-east-1', help='region for the selective load timing')
+
+    args = parser.parse_args(argv)
+    if args.command == 'convert':
+        count = write_snapshot(args.target, rows_from_snapshot_file(args.source))
+        print(f"Wrote {count} records to {args.target} ({os.path.getsize(args.source)} -> "
+              f"{os.path.getsize(args.target)} bytes)")
+    elif args.command == 'show':
+        reader = SnapshotReader(args.path)
+        rows = list(reader.iter_columns(('region', 'arn'), args.service, args.region))
+        for account_id, service_key, (region, arn) in rows:
+            print(f"{account_id:14s} {service_key:28s} {region or ''} {arn or ''}")
+        print(f"{len(rows)} of {reader.count()} records.")
+    else:
+        bench(args.paths, args.repeat, args.region)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,663 @@
+#!/usr/bin/env python
+
+"""
+Local HTTP stand-in for the AWS APIs called by list_resources_arn.py, so scanner
+changes can be measured offline. Clients are pointed at it through AWS_ENDPOINT_URL.
+
+By default every request is answered with a well-formed, empty response. With
+resources_per_service > 0 it serves a synthetic estate instead: that many resources
+of every collected type in every account and region (global IAM and S3 included),
+paginated page_size items per page, with children_per_resource ECS services and
+ECR images under each cluster/repository and every regional resource tagged in the
+Resource Groups Tagging API. Responses are encoded from the botocore service
+models, so they parse exactly like the real ones.
+
+Injectable behaviour: per-call latency, a throttling rate, disabled (opt-in)
+regions, fixed error codes per (service, region, operation), and several accounts,
+told apart by the access key of the request (see access_key / write_profiles).
+Every request is counted per (signing service, operation).
+
+Usage:
+    with FakeAWS(latency=0.02) as fake:
+        fake.install_env()
+        ...  # run the scanner code
+        print(fake.total_calls())
+
+    with FakeAWS(accounts=3, regions=synthetic_regions(8), resources_per_service=50,
+                 page_size=20, throttle_rate=0.02, disabled_regions=['me-south-1']) as fake:
+        profiles = fake.write_profiles('/tmp/fake-aws')  # fake-0, fake-1, fake-2
+
+    ./fake_aws.py --regions 8 --resources 2000 --page-size 1000   # serve until Ctrl-C
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+import argparse
+import functools
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+
+import botocore.exceptions
+import botocore.session
+
+
+FAKE_ACCOUNT_ID = '123456789012'
+
+FAKE_REGIONS = [
+    'us-east-1', 'us-east-2', 'us-west-1', 'us-west-2',
+    'ca-central-1', 'eu-west-1', 'eu-west-2', 'eu-west-3',
+    'eu-central-1', 'eu-north-1', 'ap-northeast-1', 'ap-northeast-2',
+    'ap-northeast-3', 'ap-southeast-1', 'ap-southeast-2', 'ap-south-1',
+    'sa-east-1'
+]
+
+# Opt-in regions, used when more regions than FAKE_REGIONS are asked for
+EXTRA_REGIONS = [
+    'af-south-1', 'ap-east-1', 'ap-south-2', 'ap-southeast-3', 'ap-southeast-4',
+    'ca-west-1', 'eu-central-2', 'eu-south-1', 'eu-south-2', 'il-central-1',
+    'me-central-1', 'me-south-1', 'mx-central-1'
+]
+
+# Services whose models the fake can answer for, looked up by signing name
+MODELED_SERVICES = [
+    'sts', 'ec2', 'elbv2', 'elb', 's3', 'lambda', 'rds', 'dynamodb', 'sns', 'sqs', 'iam',
+    'cloudformation', 'apigateway', 'eks', 'ecs', 'ecr', 'elasticache', 'resourcegroupstaggingapi'
+]
+
+_CREDENTIAL_RE = re.compile(r'Credential=([^/]+)/[^/]+/([^/]+)/([^/]+)/aws4_request')
+_BOTOCORE = botocore.session.get_session()
+SYNTHETIC_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def synthetic_regions(count):
+    """The first count region names: FAKE_REGIONS, then EXTRA_REGIONS, then made-up ones."""
+    names = FAKE_REGIONS + EXTRA_REGIONS
+    names += [f"xx-synthetic-{number}" for number in range(1, count - len(names) + 1)]
+    return names[:count]
+
+
+def _error_response(service, protocol, code, message):
+    """Build (content_type, body) of an error in the protocol the client expects."""
+    if protocol == 'query' and service == 'ec2':
+        return 'text/xml', (f'<Response><Errors><Error><Code>{code}</Code><Message>{message}</Message>'
+                            f'</Error></Errors><RequestID>fake</RequestID></Response>')
+    if protocol == 'query':
+        return 'text/xml', (f'<ErrorResponse><Error><Type>Sender</Type><Code>{code}</Code>'
+                            f'<Message>{message}</Message></Error><RequestId>fake</RequestId></ErrorResponse>')
+    if service == 's3':
+        return 'application/xml', f'<Error><Code>{code}</Code><Message>{message}</Message></Error>'
+    return 'application/json', json.dumps({'__type': code, 'message': message})
+
+
+def _query_response(service, action, body=''):
+    """Build a query-protocol (XML) response body."""
+    if service == 'ec2':
+        return (f'<{action}Response xmlns="http://ec2.amazonaws.com/doc/2016-11-15/">'
+                f'<requestId>fake</requestId>{body}</{action}Response>')
+    return (f'<{action}Response><{action}Result>{body}</{action}Result>'
+            f'<ResponseMetadata><RequestId>fake</RequestId></ResponseMetadata></{action}Response>')
+
+
+# --- botocore models: request decoding and response encoding -----------------
+
+@functools.lru_cache(maxsize=None)
+def _service_model(service_name):
+    return _BOTOCORE.get_service_model(service_name)
+
+
+@functools.lru_cache(maxsize=None)
+def _paginator_config(service_name, operation):
+    try:
+        return dict(_BOTOCORE.get_paginator_model(service_name).get_paginator(operation))
+    except (ValueError, botocore.exceptions.UnknownServiceError, botocore.exceptions.DataNotFoundError):
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def _model_for(signing_name, target=None, version=None):
+    """Service model name behind a request, from its signing name and X-Amz-Target or Version."""
+    candidates = [name for name in MODELED_SERVICES if _service_model(name).signing_name == signing_name]
+    for name in candidates:
+        metadata = _service_model(name).metadata
+        if target and target.startswith(metadata.get('targetPrefix', '') + '.'):
+            return name
+        if version and metadata.get('apiVersion') == version:
+            return name
+    return candidates[0] if candidates else None
+
+
+@functools.lru_cache(maxsize=None)
+def _rest_routes(service_name):
+    """[(method, path regex, required query keys, operation)] of a REST service, most specific first."""
+    model = _service_model(service_name)
+    routes = []
+    for operation in model.operation_names:
+        http = model.operation_model(operation).http
+        path, _, query = http['requestUri'].partition('?')
+        pattern = ''
+        for literal, name, greedy in re.findall(r'([^{]*)(?:\{(\w+)(\+?)\})?', path.rstrip('/')):
+            pattern += re.escape(literal)
+            if name:
+                pattern += f"(?P<{name}>{'.+' if greedy else '[^/]+'})"
+        keys = [key.split('=')[0] for key in query.split('&') if key]
+        routes.append((http['method'], re.compile(pattern + '/?$'), keys, operation, len(path)))
+    routes.sort(key=lambda route: (-len(route[2]), -route[4]))
+    return [route[:4] for route in routes]
+
+
+def _match_route(service_name, method, path, query):
+    for route_method, pattern, keys, operation in _rest_routes(service_name):
+        match = pattern.match(path)
+        if route_method == method and match and all(key in query for key in keys):
+            return operation, {name: unquote(value) for name, value in match.groupdict().items()}
+    return None, {}
+
+
+def _input_params(operation_model, protocol, body, query, path_params):
+    """{member name: value} of the top-level input members present in a request."""
+    shape = operation_model.input_shape
+    if shape is None:
+        return {}
+    params = {}
+    for name, member in shape.members.items():
+        serialization = member.serialization
+        location = serialization.get('location')
+        if location == 'querystring':
+            value = query.get(serialization.get('name', name), [None])[0]
+        elif location == 'uri':
+            value = path_params.get(serialization.get('name', name))
+        elif location in ('header', 'headers'):
+            value = None
+        elif protocol == 'ec2':
+            wire_name = serialization.get('queryName') or serialization.get('name', name)
+            value = body.get(wire_name[:1].upper() + wire_name[1:])
+        elif protocol == 'query':
+            value = body.get(serialization.get('name', name))
+        else:
+            value = body.get(name)
+        if value is not None:
+            params[name] = value
+    return params
+
+
+def _json_value(value, shape):
+    if value is None:
+        return None
+    if shape.type_name == 'structure':
+        return {shape.members[name].serialization.get('name', name): _json_value(member_value, shape.members[name])
+                for name, member_value in value.items()
+                if name in shape.members and shape.members[name].serialization.get('location') is None}
+    if shape.type_name == 'list':
+        return [_json_value(item, shape.member) for item in value]
+    if shape.type_name == 'map':
+        return {key: _json_value(item, shape.value) for key, item in value.items()}
+    if shape.type_name == 'timestamp':
+        return value.timestamp()
+    return value
+
+
+def _xml_value(value, shape, tag):
+    if shape.type_name == 'structure':
+        inner = ''.join(_xml_value(member_value, shape.members[name],
+                                   shape.members[name].serialization.get('name', name))
+                        for name, member_value in value.items() if name in shape.members and member_value is not None)
+    elif shape.type_name == 'list':
+        member_tag = shape.member.serialization.get('name', 'member')
+        if shape.serialization.get('flattened'):
+            return ''.join(_xml_value(item, shape.member, tag) for item in value)
+        inner = ''.join(_xml_value(item, shape.member, member_tag) for item in value)
+    elif shape.type_name == 'map':
+        inner = ''.join(f"<entry>{_xml_value(key, shape.key, 'key')}{_xml_value(item, shape.value, 'value')}</entry>"
+                        for key, item in value.items())
+    elif shape.type_name == 'timestamp':
+        inner = value.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    elif shape.type_name == 'boolean':
+        inner = 'true' if value else 'false'
+    else:
+        inner = escape(str(value))
+    return f"<{tag}>{inner}</{tag}>"
+
+
+def encode_response(service_name, signing_name, operation, output):
+    """(content_type, body) of a successful response carrying output (in botocore's parsed form)."""
+    model = _service_model(service_name)
+    shape = model.operation_model(operation).output_shape
+    if model.protocol in ('json', 'rest-json'):
+        return 'application/json', json.dumps(_json_value(output, shape) if shape is not None else {})
+    body = ''
+    if shape is not None:
+        body = ''.join(_xml_value(value, shape.members[name], shape.members[name].serialization.get('name', name))
+                       for name, value in output.items() if name in shape.members and value is not None)
+    if model.protocol == 'rest-xml':
+        if operation == 'GetBucketLocation':
+            return 'application/xml', f"<LocationConstraint>{output.get('LocationConstraint') or ''}</LocationConstraint>"
+        return 'application/xml', f"<{operation}Result>{body}</{operation}Result>"
+    return 'text/xml', _query_response(signing_name, operation, body)
+
+
+# --- Synthetic estate --------------------------------------------------------
+
+def _hex(length, *parts):
+    return hashlib.sha1('/'.join(map(str, parts)).encode('utf-8')).hexdigest()[:length]
+
+
+def _created(index):
+    return SYNTHETIC_EPOCH + timedelta(hours=index)
+
+
+def _ec2_instance_id(a, r, i):
+    return f"i-{_hex(17, a, r, i)}"
+
+
+# ARN of the i-th resource of each regional type, shared by the collectors' list
+# operations and the tagging API so that both describe the same estate
+SYNTHETIC_ARNS = {
+    'ec2': lambda a, r, i: f"arn:aws:ec2:{r}:{a}:instance/{_ec2_instance_id(a, r, i)}",
+    'rds': lambda a, r, i: f"arn:aws:rds:{r}:{a}:db:db-{i:05d}",
+    'dynamodb': lambda a, r, i: f"arn:aws:dynamodb:{r}:{a}:table/table-{i:05d}",
+    'sns': lambda a, r, i: f"arn:aws:sns:{r}:{a}:topic-{i:05d}",
+    'sqs': lambda a, r, i: f"arn:aws:sqs:{r}:{a}:queue-{i:05d}",
+    'lambda': lambda a, r, i: f"arn:aws:lambda:{r}:{a}:function:fn-{i:05d}",
+    'cloudformation': lambda a, r, i: f"arn:aws:cloudformation:{r}:{a}:stack/stack-{i:05d}/{_hex(8, a, r, i)}",
+    'apigateway': lambda a, r, i: f"arn:aws:apigateway:{r}::/restapis/{_hex(10, a, r, i)}",
+    'eks': lambda a, r, i: f"arn:aws:eks:{r}:{a}:cluster/eks-{i:05d}",
+    'ecs': lambda a, r, i: f"arn:aws:ecs:{r}:{a}:cluster/cluster-{i:05d}",
+    'ecr': lambda a, r, i: f"arn:aws:ecr:{r}:{a}:repository/repo-{i:05d}",
+}
+
+
+def _load_balancer(a, r, i):
+    kind = ('app', 'application') if i % 2 == 0 else ('net', 'network')
+    return {'LoadBalancerArn': f"arn:aws:elasticloadbalancing:{r}:{a}:loadbalancer/{kind[0]}/lb-{i:05d}/{_hex(16, a, r, i)}",
+            'LoadBalancerName': f"lb-{i:05d}", 'DNSName': f"lb-{i:05d}-{_hex(8, a, r, i)}.{r}.elb.amazonaws.com",
+            'Type': kind[1], 'Scheme': 'internal', 'CreatedTime': _created(i)}
+
+
+# (service model, list operation): (count, item builder(account, region, index, params, fake)).
+# count is 'resources' (resources_per_service), 'children' (children_per_resource)
+# or 'tagged' (every regional resource type).
+SYNTHETIC_LISTS = {
+    ('elbv2', 'DescribeLoadBalancers'): ('resources', lambda a, r, i, p, f: _load_balancer(a, r, i)),
+    ('elb', 'DescribeLoadBalancers'): ('resources', lambda a, r, i, p, f: {
+        'LoadBalancerName': f"classic-{i:05d}", 'DNSName': f"classic-{i:05d}.{r}.elb.amazonaws.com",
+        'Scheme': 'internet-facing', 'CreatedTime': _created(i)}),
+    ('s3', 'ListBuckets'): ('resources', lambda a, r, i, p, f: {
+        'Name': f"bucket-{a}-{i:05d}", 'CreationDate': _created(i), 'BucketRegion': f.regions[i % len(f.regions)]}),
+    ('ec2', 'DescribeInstances'): ('resources', lambda a, r, i, p, f: {
+        'ReservationId': f"r-{_hex(17, 'r', a, r, i)}", 'OwnerId': a,
+        'Instances': [{'InstanceId': _ec2_instance_id(a, r, i), 'PrivateIpAddress': f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}",
+                       'LaunchTime': _created(i)}]}),
+    ('ec2', 'DescribeVpcs'): ('resources', lambda a, r, i, p, f: {
+        'VpcId': f"vpc-{_hex(17, a, r, i)}", 'CidrBlock': f"10.{i % 256}.0.0/16"}),
+    ('lambda', 'ListFunctions'): ('resources', lambda a, r, i, p, f: {
+        'FunctionName': f"fn-{i:05d}", 'FunctionArn': SYNTHETIC_ARNS['lambda'](a, r, i),
+        'LastModified': _created(i).strftime('%Y-%m-%dT%H:%M:%S.000+0000')}),
+    ('rds', 'DescribeDBInstances'): ('resources', lambda a, r, i, p, f: {
+        'DBInstanceIdentifier': f"db-{i:05d}", 'DBInstanceArn': SYNTHETIC_ARNS['rds'](a, r, i),
+        'InstanceCreateTime': _created(i)}),
+    ('dynamodb', 'ListTables'): ('resources', lambda a, r, i, p, f: f"table-{i:05d}"),
+    ('sns', 'ListTopics'): ('resources', lambda a, r, i, p, f: {'TopicArn': SYNTHETIC_ARNS['sns'](a, r, i)}),
+    ('sqs', 'ListQueues'): ('resources', lambda a, r, i, p, f: f"https://sqs.{r}.amazonaws.com/{a}/queue-{i:05d}"),
+    ('iam', 'ListRoles'): ('resources', lambda a, r, i, p, f: {
+        'RoleName': f"role-{i:05d}", 'RoleId': f"AROA{_hex(16, a, 'role', i).upper()}", 'Path': '/',
+        'Arn': f"arn:aws:iam::{a}:role/role-{i:05d}", 'CreateDate': _created(i)}),
+    ('iam', 'ListUsers'): ('resources', lambda a, r, i, p, f: {
+        'UserName': f"user-{i:05d}", 'UserId': f"AIDA{_hex(16, a, 'user', i).upper()}", 'Path': '/',
+        'Arn': f"arn:aws:iam::{a}:user/user-{i:05d}", 'CreateDate': _created(i)}),
+    ('iam', 'ListPolicies'): ('resources', lambda a, r, i, p, f: {
+        'PolicyName': f"policy-{i:05d}", 'PolicyId': f"ANPA{_hex(16, a, 'policy', i).upper()}", 'Path': '/',
+        'Arn': f"arn:aws:iam::{a}:policy/policy-{i:05d}", 'CreateDate': _created(i)}),
+    ('cloudformation', 'ListStacks'): ('resources', lambda a, r, i, p, f: {
+        'StackId': SYNTHETIC_ARNS['cloudformation'](a, r, i), 'StackName': f"stack-{i:05d}",
+        'StackStatus': 'CREATE_COMPLETE', 'CreationTime': _created(i)}),
+    ('apigateway', 'GetRestApis'): ('resources', lambda a, r, i, p, f: {
+        'id': _hex(10, a, r, i), 'name': f"api-{i:05d}", 'createdDate': _created(i)}),
+    ('eks', 'ListClusters'): ('resources', lambda a, r, i, p, f: f"eks-{i:05d}"),
+    ('ecs', 'ListClusters'): ('resources', lambda a, r, i, p, f: SYNTHETIC_ARNS['ecs'](a, r, i)),
+    ('ecs', 'ListServices'): ('children', lambda a, r, i, p, f: (
+        f"arn:aws:ecs:{r}:{a}:service/{p.get('cluster', 'default').rsplit('/', 1)[-1]}/svc-{i:03d}")),
+    ('ecr', 'DescribeRepositories'): ('resources', lambda a, r, i, p, f: {
+        'repositoryArn': SYNTHETIC_ARNS['ecr'](a, r, i), 'repositoryName': f"repo-{i:05d}",
+        'repositoryUri': f"{a}.dkr.ecr.{r}.amazonaws.com/repo-{i:05d}", 'createdAt': _created(i)}),
+    ('ecr', 'ListImages'): ('children', lambda a, r, i, p, f: {
+        'imageDigest': f"sha256:{_hex(40, a, r, p.get('repositoryName'), i)}", 'imageTag': f"v{i}"}),
+    ('ecr', 'DescribeImages'): ('children', lambda a, r, i, p, f: {
+        'imageDigest': f"sha256:{_hex(40, a, r, p.get('repositoryName'), i)}", 'imageTags': [f"v{i}"],
+        'imageSizeInBytes': 50_000_000 + i, 'imagePushedAt': _created(i)}),
+    ('elasticache', 'DescribeCacheClusters'): ('resources', lambda a, r, i, p, f: {
+        'CacheClusterId': f"cache-{i:05d}", 'Engine': 'redis', 'CacheClusterStatus': 'available',
+        'CacheClusterCreateTime': _created(i),
+        'CacheNodes': [{'CacheNodeId': '0001', 'Endpoint': {'Address': f"cache-{i:05d}.{r}.cache.amazonaws.com",
+                                                            'Port': 6379}}]}),
+    ('elasticache', 'DescribeReplicationGroups'): ('resources', lambda a, r, i, p, f: {
+        'ReplicationGroupId': f"rg-{i:05d}", 'Description': 'synthetic', 'Status': 'available',
+        'ConfigurationEndpoint': {'Address': f"rg-{i:05d}.{r}.cache.amazonaws.com", 'Port': 6379}}),
+    ('resourcegroupstaggingapi', 'GetResources'): ('tagged', lambda a, r, i, p, f: {
+        'ResourceARN': SYNTHETIC_ARNS[sorted(SYNTHETIC_ARNS)[i % len(SYNTHETIC_ARNS)]](a, r, i // len(SYNTHETIC_ARNS)),
+        'Tags': [{'Key': 'Name', 'Value': f"synthetic-{i // len(SYNTHETIC_ARNS):05d}"},
+                 {'Key': 'env', 'Value': ('prod', 'staging', 'dev')[i % 3]}]}),
+}
+
+
+def _describe_table(a, r, p, f):
+    name = p['TableName']
+    return {'Table': {'TableName': name, 'TableArn': f"arn:aws:dynamodb:{r}:{a}:table/{name}",
+                      'CreationDateTime': SYNTHETIC_EPOCH}}
+
+
+def _queue_attributes(a, r, p, f):
+    name = p['QueueUrl'].rsplit('/', 1)[-1]
+    return {'Attributes': {'QueueArn': f"arn:aws:sqs:{r}:{a}:{name}",
+                           'CreatedTimestamp': str(int(SYNTHETIC_EPOCH.timestamp()))}}
+
+
+def _describe_eks_cluster(a, r, p, f):
+    name = p['name']
+    return {'cluster': {'name': name, 'arn': f"arn:aws:eks:{r}:{a}:cluster/{name}", 'version': '1.29',
+                        'endpoint': f"https://{_hex(32, a, r, name).upper()}.gr7.{r}.eks.amazonaws.com",
+                        'createdAt': SYNTHETIC_EPOCH}}
+
+
+def _describe_ecs_services(a, r, p, f):
+    cluster_name = p.get('cluster', 'default').rsplit('/', 1)[-1]
+    services = []
+    for service in p.get('services', []):
+        name = service.rsplit('/', 1)[-1]
+        services.append({'serviceArn': f"arn:aws:ecs:{r}:{a}:service/{cluster_name}/{name}", 'serviceName': name,
+                         'status': 'ACTIVE', 'taskDefinition': f"arn:aws:ecs:{r}:{a}:task-definition/{name}:1",
+                         'launchType': 'FARGATE', 'desiredCount': 2, 'runningCount': 2, 'createdAt': SYNTHETIC_EPOCH})
+    return {'services': services}
+
+
+# (service model, operation): builder(account, region, params, fake) of non-list calls
+SYNTHETIC_DETAILS = {
+    ('dynamodb', 'DescribeTable'): _describe_table,
+    ('sqs', 'GetQueueAttributes'): _queue_attributes,
+    ('eks', 'DescribeCluster'): _describe_eks_cluster,
+    ('ecs', 'DescribeClusters'): lambda a, r, p, f: {'clusters': [
+        {'clusterArn': arn, 'clusterName': arn.rsplit('/', 1)[-1], 'status': 'ACTIVE'} for arn in p.get('clusters', [])]},
+    ('ecs', 'DescribeServices'): _describe_ecs_services,
+    ('s3', 'GetBucketLocation'): lambda a, r, p, f: {'LocationConstraint': f.regions[int(p['Bucket'].rsplit('-', 1)[-1]) % len(f.regions)]},
+}
+
+
+class FakeAWS:
+    """Threaded HTTP server answering AWS API calls with empty or synthetic results."""
+
+    def __init__(self, latency=0.0, regions=None, account_id=FAKE_ACCOUNT_ID, disabled_regions=(), errors=None,
+                 accounts=1, resources_per_service=0, children_per_resource=2, page_size=100, throttle_rate=0.0,
+                 seed=0, port=0):
+        """
+        errors maps (service, region, operation) to an error code returned with HTTP 400; '*' matches any.
+        accounts is the number of accounts, account_id being the first one; throttle_rate is the
+        fraction of calls answered with a throttling error (seeded, so runs are repeatable).
+        """
+        self.latency = latency
+        self.errors = dict(errors or {})
+        self.regions = regions or FAKE_REGIONS
+        self.disabled_regions = list(disabled_regions)
+        self.account_id = account_id
+        self.account_ids = [account_id] + [f"{100000000000 + number:012d}" for number in range(1, accounts)]
+        self.resources_per_service = resources_per_service
+        self.children_per_resource = children_per_resource
+        self.page_size = page_size
+        self.throttle_rate = throttle_rate
+        self.throttled = 0
+        self._random = random.Random(seed)
+        self._synthetic = {}  # Encoded synthetic responses, so serving them costs no more CPU than the first time
+        self.calls = Counter()
+        self._calls_lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def access_key(self, account_index=0):
+        """Access key whose requests are answered as account self.account_ids[account_index]."""
+        return 'AKIAFAKE' if account_index == 0 else f"AKIAFAKE{account_index:08d}"
+
+    def install_env(self, account_index=0):
+        """Point every boto3 client created afterwards at this server."""
+        os.environ['AWS_ENDPOINT_URL'] = self.url
+        os.environ['AWS_ACCESS_KEY_ID'] = self.access_key(account_index)
+        os.environ['AWS_SECRET_ACCESS_KEY'] = 'fake'
+        os.environ['AWS_DEFAULT_REGION'] = 'us-east-1'
+        os.environ.pop('AWS_PROFILE', None)
+        os.environ.pop('AWS_SESSION_TOKEN', None)
+
+    def write_profiles(self, directory):
+        """
+        Write AWS config and credentials files with one profile per account (fake-0,
+        fake-1, ...) into directory; returns (profile names, environment variables
+        pointing boto3 at them and at this server).
+        """
+        os.makedirs(directory, exist_ok=True)
+        profiles = [f"fake-{number}" for number in range(len(self.account_ids))]
+        with open(os.path.join(directory, 'credentials'), 'w') as f:
+            for number, profile in enumerate(profiles):
+                f.write(f"[{profile}]\naws_access_key_id = {self.access_key(number)}\naws_secret_access_key = fake\n\n")
+        with open(os.path.join(directory, 'config'), 'w') as f:
+            for profile in profiles:
+                f.write(f"[profile {profile}]\nregion = us-east-1\n\n")
+        return profiles, {'AWS_ENDPOINT_URL': self.url,
+                          'AWS_SHARED_CREDENTIALS_FILE': os.path.join(directory, 'credentials'),
+                          'AWS_CONFIG_FILE': os.path.join(directory, 'config')}
+
+    def total_calls(self, service=None):
+        """Number of requests served, optionally for one signing service only."""
+        with self._calls_lock:
+            return sum(n for (svc, _op), n in self.calls.items() if service is None or svc == service)
+
+    def reset(self):
+        with self._calls_lock:
+            self.calls.clear()
+            self.throttled = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _record(self, service, operation):
+        with self._calls_lock:
+            self.calls[(service, operation)] += 1
+
+    def error_for(self, service, region, operation):
+        """Return the error code configured for this call, if any."""
+        for (err_service, err_region, err_operation), code in self.errors.items():
+            if err_service in ('*', service) and err_region in ('*', region) and err_operation in ('*', operation):
+                return code
+        return None
+
+    def _throttle_code(self, service, protocol):
+        """Throttling error code for this call, drawn at throttle_rate, or None."""
+        if not self.throttle_rate:
+            return None
+        with self._calls_lock:
+            if self._random.random() >= self.throttle_rate:
+                return None
+            self.throttled += 1
+        if service == 'ec2':
+            return 'RequestLimitExceeded'
+        return 'Throttling' if protocol == 'query' else 'ThrottlingException'
+
+    def _account(self, access_key):
+        for number, account_id in enumerate(self.account_ids):
+            if access_key == self.access_key(number):
+                return account_id
+        return self.account_id
+
+    def _paginate(self, model_name, operation, account_id, region, params, count_kind, build):
+        """One page of a synthetic list operation; the page token is the offset of the next item."""
+        count = {'resources': self.resources_per_service, 'children': self.children_per_resource,
+                 'tagged': self.resources_per_service * len(SYNTHETIC_ARNS)}[count_kind]
+        config = _paginator_config(model_name, operation) or {}
+        result_key = config.get('result_key')
+        result_key = result_key[0] if isinstance(result_key, list) else result_key
+        start = int(params.get(config.get('input_token')) or 0) if config.get('input_token') else 0
+        page_size = self.page_size if config else count
+        if config.get('limit_key') and params.get(config['limit_key']):
+            page_size = min(page_size, int(params[config['limit_key']]))
+        end = min(count, start + max(page_size, 1))
+        output = {result_key: [build(account_id, region, index, params, self) for index in range(start, end)]}
+        if end < count:
+            output[config['output_token']] = f"{end:08d}"  # Some tokens have a minimum length
+            if config.get('more_results'):
+                output[config['more_results']] = True
+        return output
+
+    def respond(self, service, region, operation, params, access_key=None, model_name=None):
+        """Return (content_type, body) for one API call."""
+        account_id = self._account(access_key)
+        if operation == 'GetCallerIdentity':
+            return 'text/xml', _query_response(service, operation, (
+                f'<Arn>arn:aws:iam::{account_id}:user/fake</Arn>'
+                f'<UserId>AIDAFAKE</UserId><Account>{account_id}</Account>'))
+        if operation == 'DescribeRegions':
+            statuses = [(name, 'opt-in-not-required') for name in self.regions]
+            if params.get('AllRegions') == 'true':
+                statuses += [(name, 'not-opted-in') for name in self.disabled_regions]
+            items = ''.join(
+                f'<item><regionName>{name}</regionName>'
+                f'<regionEndpoint>ec2.{name}.amazonaws.com</regionEndpoint>'
+                f'<optInStatus>{status}</optInStatus></item>'
+                for name, status in statuses)
+            return 'text/xml', _query_response(service, operation, f'<regionInfo>{items}</regionInfo>')
+        if model_name and ((model_name, operation) in SYNTHETIC_LISTS or (model_name, operation) in SYNTHETIC_DETAILS):
+            key = (model_name, operation, account_id, region, json.dumps(params, sort_keys=True))
+            if key not in self._synthetic:
+                if (model_name, operation) in SYNTHETIC_LISTS:
+                    count_kind, build = SYNTHETIC_LISTS[(model_name, operation)]
+                    output = self._paginate(model_name, operation, account_id, region, params, count_kind, build)
+                else:
+                    output = SYNTHETIC_DETAILS[(model_name, operation)](account_id, region, params, self)
+                self._synthetic[key] = encode_response(model_name, service, operation, output)
+            return self._synthetic[key]
+        if params.get('_protocol') == 'query':
+            return 'text/xml', _query_response(service, operation)
+        return 'application/json', '{}'
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8') if length else ''
+                match = _CREDENTIAL_RE.search(self.headers.get('Authorization', ''))
+                access_key, region, service = match.groups() if match else (None, 'us-east-1', 'unknown')
+                target = self.headers.get('X-Amz-Target')
+                split = urlsplit(self.path)
+                query = parse_qs(split.query, keep_blank_values=True)
+                params, path_params, raw = {}, {}, {}
+                if target:
+                    operation = target.rsplit('.', 1)[-1]
+                    raw = json.loads(body or '{}')
+                    protocol = 'json'
+                    model_name = _model_for(service, target=target)
+                elif 'Action=' in body:
+                    raw = {k: v[0] for k, v in parse_qs(body).items()}
+                    operation = raw.get('Action', 'Unknown')
+                    protocol = 'query'
+                    model_name = _model_for(service, version=raw.get('Version'))
+                else:
+                    protocol = 'rest'
+                    model_name = _model_for(service)
+                    operation, path_params = _match_route(model_name, self.command, split.path, query) \
+                        if model_name else (None, {})
+                    if operation is None:
+                        operation = f"{self.command} {split.path}"
+                        model_name = None
+                    elif body and _service_model(model_name).protocol == 'rest-json':
+                        raw = json.loads(body)
+                if model_name and operation in _service_model(model_name).operation_names:
+                    operation_model = _service_model(model_name).operation_model(operation)
+                    params = _input_params(operation_model, _service_model(model_name).protocol, raw, query, path_params)
+                if protocol == 'query':
+                    params.update(raw)  # Raw form fields too (AllRegions, Action...)
+                params['_protocol'] = protocol
+                fake._record(service, operation)
+                if fake.latency:
+                    time.sleep(fake.latency)
+                error_code = fake.error_for(service, region, operation)
+                if not error_code and region in fake.disabled_regions:
+                    error_code = 'OptInRequired'
+                if not error_code:
+                    error_code = fake._throttle_code(service, protocol)
+                if error_code:
+                    status = 400
+                    content_type, payload = _error_response(service, protocol, error_code, 'Injected by fake_aws')
+                else:
+                    status = 200
+                    content_type, payload = fake.respond(service, region, operation, params, access_key, model_name)
+                data = payload.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                if error_code and content_type == 'application/json':
+                    self.send_header('x-amzn-ErrorType', error_code)
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('x-amzn-RequestId', 'fake')
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_HEAD = do_DELETE = _handle
+
+        return Handler
+
+
+def main():
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=0, help='port on 127.0.0.1 (default: any free port)')
+    parser.add_argument('--accounts', type=int, default=1)
+    parser.add_argument('--regions', type=int, default=len(FAKE_REGIONS))
+    parser.add_argument('--disabled-regions', type=int, default=0)
+    parser.add_argument('--resources', type=int, default=0, help='resources of every type per account and region')
+    parser.add_argument('--children', type=int, default=2)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    names = synthetic_regions(args.regions + args.disabled_regions)
+    fake = FakeAWS(latency=args.latency, regions=names[:args.regions], disabled_regions=names[args.regions:],
+                   accounts=args.accounts, resources_per_service=args.resources, children_per_resource=args.children,
+                   page_size=args.page_size, throttle_rate=args.throttle_rate, port=args.port)
+    print(f"AWS_ENDPOINT_URL={fake.url}", flush=True)
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,36 +5,531 @@ Script to list all AWS resource ARNs in an AWS account across all available regi
 Credentials are sourced from environment variables.
 """
 
+from collections import Counter, deque
 from datetime import datetime
+import argparse
 import concurrent.futures
+import contextvars
+import hashlib
+import multiprocessing
+import os
+import queue
+import textwrap
+import threading
+import time
 import sys
 import json
 import botocore
+import botocore.config
+from botocore import xform_name
 import boto3
 
+import cmdb_cassette
+import cmdb_db
+import cmdb_snapshot
+
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
 
 def get_session():
-    """Create a boto3 session using environment variables for credentials."""
-    return boto3.Session()
+    """Return the boto3 session shared by the whole run (credentials from the environment)."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = boto3.Session()
+        return _SESSION
 
 
-def get_all_regions():
-    """Get a list of all available AWS regions."""
-    try:
+# Adaptive retries add a client-side rate limiter that backs off on throttling
+CLIENT_CONFIG = botocore.config.Config(
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+    max_pool_connections=50
+)
+
+
+class ClientCache:
+    """
+    Thread-safe cache of boto3 clients keyed by (service, region).
+    Creating a client is expensive (endpoint resolution, service model loading),
+    so every task of a run reuses the clients built from one session.
+    Hooks registered with add_hook are invoked as hook(client, service_name, region) for every client.
+    breaker is the CircuitBreaker of the endpoints these clients call, checked before every call.
+    """
+
+    def __init__(self, session=None, config=CLIENT_CONFIG):
+        self.session = session or get_session()
+        self.config = config
+        self.breaker = CircuitBreaker()
+        self.hooks = [self._check_breaker]
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _check_breaker(self, client, service_name, region):
+        """Client hook: fail every call of a task once an open circuit covers it (see CircuitBreaker)."""
+        def on_before_call(**kwargs):
+            stats = _CURRENT_TASK.get()
+            skip = self.breaker.check(*stats.scope) if stats is not None and stats.scope else None
+            if skip:
+                raise CircuitOpenError(*skip)
+
+        client.meta.events.register('before-call', on_before_call)
+
+    def add_hook(self, hook):
+        """Register a client hook (once) and apply it to the clients created so far."""
+        with self._lock:
+            if hook in self.hooks:
+                return
+            self.hooks.append(hook)
+            for (service_name, region), client in self._clients.items():
+                hook(client, service_name, region)
+
+    def get(self, service_name, region):
+        """Return the cached client for service_name in region, creating it on first use."""
+        key = (service_name, region)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    # boto3.Session.client is not thread-safe, so creation stays under the lock
+                    client = self.session.client(service_name, region_name=region, config=self.config)
+                    for hook in self.hooks:
+                        hook(client, service_name, region)
+                    self._clients[key] = client
+        return client
+
+
+THROTTLE_ERROR_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled',
+    'RequestThrottledException', 'RequestLimitExceeded', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'SlowDown', 'BandwidthLimitExceeded'
+}
+
+
+class AdaptiveLimit:
+    """
+    AIMD concurrency limit: grows by one after `limit` successful calls in a row
+    and is halved (at most once per cooldown period) when a call is throttled.
+    """
+
+    def __init__(self, initial, maximum, minimum=1, cooldown=1.0):
+        self.limit = initial
+        self.maximum = maximum
+        self.minimum = minimum
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.throttles = 0
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def has_capacity(self):
+        return self.in_flight < self.limit
+
+    def on_success(self):
+        with self._lock:
+            self._successes += 1
+            if self._successes >= self.limit:
+                self._successes = 0
+                self.limit = min(self.maximum, self.limit + 1)
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttles += 1
+            self._successes = 0
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self._last_decrease = now
+                self.limit = max(self.minimum, self.limit // 2)
+
+
+class AdaptiveScheduler:
+    """
+    Dispatches (collector, region) tasks to a thread pool while honouring one
+    AdaptiveLimit per service (the boto3 service behind the collector) and one per region. Limits are driven by the API
+    calls themselves through botocore events on every client it is attached to.
+    """
+
+    def __init__(self, max_workers=64, service_limit=(4, 32), region_limit=(8, 48)):
+        self.max_workers = max_workers
+        self.service_limit = service_limit
+        self.region_limit = region_limit
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def _limit(self, scope, name):
+        key = (scope, name)
+        with self._lock:
+            if key not in self._limits:
+                initial, maximum = self.service_limit if scope == 'service' else self.region_limit
+                self._limits[key] = AdaptiveLimit(initial, maximum)
+            return self._limits[key]
+
+    def limits_for(self, service_name, region):
+        return self._limit('service', service_name), self._limit('region', region)
+
+    def attach(self, client, service_name, region):
+        """ClientCache hook: feed successes and throttles of this client back to its limits."""
+        limits = self.limits_for(service_name, region)
+
+        def on_after_call(http_response=None, **kwargs):
+            if http_response is not None and http_response.status_code < 300:
+                for limit in limits:
+                    limit.on_success()
+
+        def on_needs_retry(response=None, **kwargs):
+            if response is not None:
+                error_code = response[1].get('Error', {}).get('Code')
+                if error_code in THROTTLE_ERROR_CODES:
+                    for limit in limits:
+                        limit.on_throttle()
+
+        client.meta.events.register('after-call', on_after_call)
+        client.meta.events.register('needs-retry', on_needs_retry)
+
+    def _try_acquire(self, task):
+        limits = self.limits_for(service_of(task[0]), task[1])
+        with self._lock:
+            if all(limit.has_capacity() for limit in limits):
+                for limit in limits:
+                    limit.in_flight += 1
+                return True
+            return False
+
+    def _release(self, task):
+        limits = self.limits_for(service_of(task[0]), task[1])
+        with self._lock:
+            for limit in limits:
+                limit.in_flight -= 1
+
+    def run(self, tasks, task_fn):
+        """
+        Run task_fn(*task) for every (service, region, ...) task and yield
+        (task, future) pairs as they complete.
+        """
+        pending = deque(tasks)
+        running = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for _ in range(len(pending)):
+                    task = pending.popleft()
+                    if len(running) < self.max_workers and self._try_acquire(task):
+                        running[executor.submit(task_fn, *task)] = task
+                    else:
+                        pending.append(task)
+                # Limits only move when calls complete, so a short timeout is enough to pick up growth
+                done, _ = concurrent.futures.wait(running, timeout=0.5, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    self._release(task)
+                    yield task, future
+
+    def summary(self):
+        """Return {(scope, name): (final_limit, throttles)} for reporting."""
+        with self._lock:
+            return {key: (limit.limit, limit.throttles) for key, limit in sorted(self._limits.items())}
+
+
+def _init_shard_worker(results, session_config, cache_dir, max_workers):
+    """ProcessScanEngine worker initializer: one warm ClientCache and scheduler for the life of the process."""
+    global _CLIENTS, _SHARD_WORKER, CACHE_DIR
+    CACHE_DIR = cache_dir
+    _CLIENTS = ClientCache(boto3.Session(**(session_config or {})))
+    scheduler = AdaptiveScheduler(max_workers=max_workers)
+    _CLIENTS.add_hook(track_task_stats)
+    _CLIENTS.add_hook(scheduler.attach)
+    _SHARD_WORKER = (results, scheduler)
+
+
+def _run_shard(run_id, task_fn, shard):
+    """Run the tasks of one region in a worker process, sending each result to the parent as it completes."""
+    results, scheduler = _SHARD_WORKER
+    tasks = {}
+    for index, service_name, region, account_id in shard:
+        tasks[index] = (service_name, region, account_id, _CLIENTS)
+    indexes = {id(task): index for index, task in tasks.items()}
+    for task, future in scheduler.run(list(tasks.values()), _tracked(task_fn)):
+        try:
+            batch, stats = future.result()
+            results.put((run_id, indexes[id(task)], batch, stats, None))
+        except Exception as e:
+            results.put((run_id, indexes[id(task)], None, None, f"{type(e).__name__}: {e}"))
+
+
+_SHARD_WORKER = None
+
+
+class ProcessScanEngine:
+    """
+    Multi-process execution mode: tasks are sharded by region over worker processes,
+    each with its own warm ClientCache and AdaptiveScheduler, so botocore response
+    parsing and record building use several cores instead of one under the GIL.
+    Results stream back through a queue to the calling process, the single writer.
+    Yields (task, future) pairs as tasks complete, like AdaptiveScheduler.run; the
+    worker pool is kept between runs until shutdown(). The speedup across cores is
+    unverified: bench_cmdb.py processes has only run on a single-CPU host, where
+    the engine is pure overhead.
+    """
+
+    def __init__(self, processes=None, threads_per_process=16, session_config=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.threads_per_process = threads_per_process
+        self.session_config = session_config
+        # spawn, not fork: the parent already has threads and open connections
+        self._context = multiprocessing.get_context('spawn')
+        self._results = None
+        self._executor = None
+        self._runs = 0
+
+    @staticmethod
+    def session_config(session):
+        """
+        boto3.Session arguments rebuilding session in a worker: its profile and region, not
+        its resolved credentials, so every worker resolves and refreshes its own SSO or
+        assume-role credentials. Environment credentials reach the workers with os.environ.
+        """
+        profile_name = session.profile_name
+        return {'profile_name': profile_name if profile_name in session.available_profiles else None,
+                'region_name': session.region_name}
+
+    def run(self, tasks, task_fn):
+        """task_fn is the _tracked() wrapper of a module-level task function."""
+        tasks = list(tasks)
+        if not tasks:
+            return
+        if self._executor is None:
+            self._results = self._context.Queue()
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=self._context, initializer=_init_shard_worker,
+                initargs=(self._results, self.session_config, CACHE_DIR, self.threads_per_process))
+        self._runs += 1
+        shards = {}
+        for index, (service_name, region, account_id, _clients) in enumerate(tasks):
+            shards.setdefault(region, []).append((index, service_name, region, account_id))
+        # Largest shards first, so the one with the global services does not start last
+        shard_futures = [self._executor.submit(_run_shard, self._runs, task_fn.task_fn, shard)
+                         for shard in sorted(shards.values(), key=len, reverse=True)]
+
+        remaining = len(tasks)
+        while remaining:
+            try:
+                run_id, index, batch, stats, error = self._results.get(timeout=1)
+            except queue.Empty:
+                for shard_future in shard_futures:
+                    if shard_future.done() and shard_future.exception():
+                        raise shard_future.exception()  # A worker died, e.g. BrokenProcessPool
+                continue
+            if run_id != self._runs:
+                continue
+            future = concurrent.futures.Future()
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result((batch, stats))
+                if task_fn.collected is not None:
+                    task_fn.collected.append(stats)
+            remaining -= 1
+            yield tasks[index], future
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._results.close()
+            self._executor = None
+
+
+# Per-item detail calls made by the collectors (describe_table, get_queue_attributes,
+# describe_cluster, get_bucket_location, ECR image summaries, ECS service batches) run on one shared pool, at most this many at a
+# time per service across all collectors and regions.
+ENRICHMENT_WORKERS = 32
+ENRICHMENT_CAPS = {'dynamodb': 8, 'sqs': 8, 'eks': 4, 's3': 16, 'ecr': 8, 'ecs': 8}
+DEFAULT_ENRICHMENT_CAP = 4
+
+
+class EnrichmentPool:
+    """
+    Bounded worker pool shared by every collector for per-item enrichment calls.
+    The collector keeps listing while details are fetched, and gets results back in
+    listing order as soon as they are ready.
+    """
+
+    def __init__(self, max_workers=ENRICHMENT_WORKERS, caps=None, default_cap=DEFAULT_ENRICHMENT_CAP):
+        self.max_workers = max_workers
+        self.caps = dict(ENRICHMENT_CAPS if caps is None else caps)
+        self.default_cap = default_cap
+        self._semaphores = {}
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                               thread_name_prefix='enrichment')
+
+    def _semaphore(self, service_name):
+        with self._lock:
+            if service_name not in self._semaphores:
+                self._semaphores[service_name] = threading.BoundedSemaphore(
+                    self.caps.get(service_name, self.default_cap))
+            return self._semaphores[service_name]
+
+    @staticmethod
+    def _call(semaphore, fn, item):
+        try:
+            return fn(item)
+        finally:
+            semaphore.release()
+
+    def map(self, service_name, fn, items):
+        """
+        Run fn(item) for every item and yield (item, future) in item order, each
+        future already completed. Waits for a free slot of the service cap before
+        submitting, so one busy service cannot take the whole pool. Calls run in the
+        caller's context, so per-task error tracking still sees them.
+        """
+        semaphore = self._semaphore(service_name)
+        submitted = deque()
+        for item in items:
+            semaphore.acquire()
+            context = contextvars.copy_context()
+            submitted.append((item, self._executor.submit(context.run, self._call, semaphore, fn, item)))
+            while submitted and submitted[0][1].done():
+                yield submitted.popleft()
+        while submitted:
+            item, future = submitted.popleft()
+            concurrent.futures.wait([future])
+            yield item, future
+
+
+_CLIENTS = None
+_ENRICHMENT = None
+
+
+def get_default_clients():
+    """Return the run-wide ClientCache built on the shared session."""
+    global _CLIENTS
+    if _CLIENTS is None:
         session = get_session()
-        ec2_client = session.client('ec2', region_name='us-east-1')
-        regions = [region['RegionName'] for region in ec2_client.describe_regions()['Regions']]
-        return regions
-    except Exception as e:
-        print(f"Error getting AWS regions: {e}")
-        print("Falling back to a default list of major AWS regions")
-        return [
-            'us-east-1', 'us-east-2', 'us-west-1', 'us-west-2',
-            'ca-central-1', 'eu-west-1', 'eu-west-2', 'eu-west-3',
-            'eu-central-1', 'eu-north-1', 'ap-northeast-1',
-            'ap-northeast-2', 'ap-southeast-1', 'ap-southeast-2',
-            'ap-south-1', 'sa-east-1'
-        ]
+        with _SESSION_LOCK:
+            if _CLIENTS is None:
+                _CLIENTS = ClientCache(session)
+    return _CLIENTS
+
+
+def get_enrichment_pool():
+    """Return the run-wide EnrichmentPool, created on first use."""
+    global _ENRICHMENT
+    if _ENRICHMENT is None:
+        with _SESSION_LOCK:
+            if _ENRICHMENT is None:
+                _ENRICHMENT = EnrichmentPool()
+    return _ENRICHMENT
+
+
+def get_account_id(clients=None):
+    """Resolve the caller identity once per run; returns (account_id, caller_arn)."""
+    clients = clients or get_default_clients()
+    identity = clients.get('sts', 'us-east-1').get_caller_identity()
+    return identity['Account'], identity['Arn']
+
+
+CACHE_DIR = os.environ.get('CMDB_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'aws-cmdb'))
+REGION_CACHE_TTL = 24 * 3600  # seconds
+
+# Regions with any other opt-in status ('not-opted-in') reject every call, so they are never scanned
+ENABLED_REGION_STATUSES = ('opt-in-not-required', 'opted-in')
+
+FALLBACK_REGIONS = [
+    'us-east-1', 'us-east-2', 'us-west-1', 'us-west-2',
+    'ca-central-1', 'eu-west-1', 'eu-west-2', 'eu-west-3',
+    'eu-central-1', 'eu-north-1', 'ap-northeast-1',
+    'ap-northeast-2', 'ap-southeast-1', 'ap-southeast-2',
+    'ap-south-1', 'sa-east-1'
+]
+
+
+def _region_cache_path(account_id):
+    return os.path.join(CACHE_DIR, f"regions_{account_id or 'default'}.json")
+
+
+def load_region_cache(account_id, ttl=REGION_CACHE_TTL):
+    """Return ({region: opt_in_status}, is_fresh) from the on-disk cache, or (None, False)."""
+    try:
+        with open(_region_cache_path(account_id)) as f:
+            cached = json.load(f)
+        return cached['regions'], time.time() - cached['fetched_at'] < ttl
+    except (OSError, ValueError, KeyError):
+        return None, False
+
+
+def save_region_cache(account_id, region_statuses):
+    """Write the discovered regions and their opt-in status to the cache directory."""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = _region_cache_path(account_id) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'fetched_at': time.time(), 'regions': region_statuses}, f, indent=2)
+        os.replace(tmp_path, _region_cache_path(account_id))
+    except OSError as e:
+        print(f"Warning: could not write region cache: {e}")
+
+
+def get_all_regions(clients=None, account_id=None, ttl=REGION_CACHE_TTL, refresh=False):
+    """
+    Get the list of AWS regions enabled for the account.
+    Regions and their opt-in status come from describe_regions(AllRegions=True) and are
+    cached on disk for `ttl` seconds; regions the account has not opted into are dropped.
+    """
+    region_statuses, fresh = (None, False) if refresh else load_region_cache(account_id, ttl)
+    if not fresh:
+        clients = clients or get_default_clients()
+        try:
+            ec2_client = clients.get('ec2', 'us-east-1')
+            region_statuses = {region['RegionName']: region.get('OptInStatus', 'opt-in-not-required')
+                               for region in ec2_client.describe_regions(AllRegions=True)['Regions']}
+            save_region_cache(account_id, region_statuses)
+        except Exception as e:
+            print(f"Error getting AWS regions: {e}")
+            if region_statuses is None:
+                region_statuses, _fresh = load_region_cache(account_id, ttl=float('inf'))
+            if region_statuses:
+                print("Falling back to the cached (stale) region list")
+            else:
+                print("Falling back to a default list of major AWS regions")
+                return list(FALLBACK_REGIONS)
+
+    regions = [name for name, status in region_statuses.items() if status in ENABLED_REGION_STATUSES]
+    skipped = len(region_statuses) - len(regions)
+    if skipped:
+        print(f"Skipping {skipped} region(s) not enabled for this account.")
+    return regions
+
+
+SERVICES_TO_SCAN = [
+    's3', 'ec2', 'rds', 'dynamodb', 'sns', 'iam',
+    'apigateway', 'elbv2', 'elb', 'eks', 'ecs', 'ecr'
+]
+
+# remover lambda, sqs, cloudformation, elasticache
+
+# Originais
+# 's3', 'ec2', 'lambda', 'rds', 'dynamodb', 'sns', 'sqs', 'iam', 'cloudformation', 'apigateway', 'elbv2', 'elb', 'eks', 'ecs', 'ecr', 'elasticache'
+
+def build_task_list(services, regions):
+    """
+    Return the (collector, region) pairs to scan. A service expands to its default
+    collectors in COLLECTORS (e.g. 'iam' to iam:roles, iam:users and iam:policies),
+    each scheduled on its own; a collector name such as 'ec2:vpcs' selects just that
+    one. Global collectors (S3 list_buckets, IAM) run once, in us-east-1.
+    """
+    tasks = []
+    for service_item in services:
+        names = [name for name, registered in COLLECTORS.items()
+                 if registered.service == service_item and registered.default]
+        for name in names or [service_item]:
+            if COLLECTORS[name].global_service:
+                tasks.append((name, 'us-east-1'))
+            else:  # Regional collectors
+                tasks.extend((name, region_item) for region_item in regions)
+    return tasks
 
 
 def extract_resource_identifier_from_arn(arn_string):
@@ -77,701 +572,1766 @@ def extract_resource_identifier_from_arn(arn_string):
         return "Unknown_Error_Parsing_ARN"
 
 
-def collect_resource_arns(service_name, region, arns_dict):
-    """Collect ARNs for a specific service in the specified region."""
+def extract_service_from_arn(arn):
+    """Extracts the service name from an ARN."""
+    parts = arn.split(':')
+    if len(parts) >= 3:
+        return parts[2]
+    return 'Unknown_Service_In_ARN'
+
+
+def _isoformat(value):
+    """ISO 8601 string of an API datetime; anything else (e.g. 'Unknown') as str()."""
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+class Collector:
+    """
+    One schedulable unit of collection: a single API family of one boto3 service.
+    collect(client, region, account_id, batch) appends records to batch, keyed like
+    the all-services output; whatever it added before failing is kept. keys are the
+    service keys it writes (default: the service name).
+    """
+
+    def __init__(self, name, service, label, collect, global_service=False, default=True, keys=None):
+        self.name = name
+        self.service = service
+        self.label = label
+        self.collect = collect
+        self.global_service = global_service
+        self.default = default  # False: only run when named explicitly in the services list
+        self.keys = keys or (service,)
+
+
+COLLECTORS = {}
+
+
+def collector(name, service, label, global_service=False, default=True, keys=None):
+    """Register the decorated function as the collector `name` of `service`."""
+    def register(collect):
+        COLLECTORS[name] = Collector(name, service, label, collect, global_service, default, keys)
+        return collect
+    return register
+
+
+def service_of(task_name):
+    """boto3 service behind a task name: a collector name, or a service name for other tasks."""
+    registered = COLLECTORS.get(task_name)
+    return registered.service if registered else task_name
+
+
+@collector('elbv2', 'elbv2', 'ELBv2 load balancers', keys=('alb', 'nlb'))
+def collect_elbv2_load_balancers(client, region, account_id, batch):
+    paginator = client.get_paginator('describe_load_balancers')
+    for page in paginator.paginate():
+        for lb in page.get('LoadBalancers', []):
+            lb_type = lb.get('Type', 'unknown').lower()
+            arn = lb['LoadBalancerArn']
+            common_data = {
+                'arn': arn,
+                'name': extract_resource_identifier_from_arn(arn),
+                'subclass': extract_service_from_arn(arn),
+                'region': region,
+                'endpoint': lb.get('DNSName', 'Unknown'),
+                'scheme': lb.get('Scheme', 'Unknown'),
+                'creation_date': _isoformat(lb.get('CreatedTime', 'Unknown'))
+            }
+            if lb_type == 'application':
+                batch.setdefault('alb', []).append(common_data)
+            elif lb_type == 'network':
+                batch.setdefault('nlb', []).append(common_data)
+
+
+@collector('elb', 'elb', 'Classic ELB load balancers', keys=('classic_elb',))
+def collect_classic_load_balancers(client, region, account_id, batch):
+    paginator = client.get_paginator('describe_load_balancers')
+    for page in paginator.paginate():
+        for lb in page.get('LoadBalancerDescriptions', []):
+            arn = f"arn:aws:elasticloadbalancing:{region}:{account_id}:loadbalancer/{lb['LoadBalancerName']}"
+            batch.setdefault('classic_elb', []).append({
+                'arn': arn,
+                'name': extract_resource_identifier_from_arn(arn),
+                'subclass': extract_service_from_arn(arn),
+                'region': region,
+                'endpoint': lb.get('DNSName', 'Unknown'),
+                'scheme': lb.get('Scheme', 'Unknown'),
+                'creation_date': _isoformat(lb.get('CreatedTime', 'Unknown'))
+            })
+
+
+def _bucket_location(client, bucket_name_val):
+    """Return the region of one bucket from get_bucket_location, or None if the call fails."""
     try:
-        session = get_session()
-        client = session.client(service_name, region_name=region)
-        account_id = session.client('sts').get_caller_identity()['Account']  # Get account_id once
-
-        def extract_service_from_arn(arn):
-            """Extracts the service name from an ARN."""
-            parts = arn.split(':')
-            if len(parts) >= 3:
-                return parts[2]
-            return 'Unknown_Service_In_ARN'
-
-        # Collection strategies by service
-        if service_name == 'elbv2':
-            try:
-                paginator = client.get_paginator('describe_load_balancers')
-                for page in paginator.paginate():
-                    for lb in page.get('LoadBalancers', []):
-                        lb_type = lb.get('Type', 'unknown').lower()
-                        endpoint = lb.get('DNSName', 'Unknown')
-                        arn = lb['LoadBalancerArn']
-                        service = extract_service_from_arn(arn)
-                        resource_id_name = extract_resource_identifier_from_arn(arn)
-                        common_data = {
-                            'arn': arn,
-                            'name': resource_id_name,
-                            'subclass': service,
-                            'region': region,
-                            'endpoint': endpoint,
-                            'scheme': lb.get('Scheme', 'Unknown'),
-                            'creation_date': lb.get('CreatedTime', 'Unknown').isoformat() if hasattr(lb.get('CreatedTime', 'Unknown'), 'isoformat') else str(lb.get('CreatedTime', 'Unknown'))
-                        }
-                        if lb_type == 'application':
-                            arns_dict.setdefault('alb', []).append(common_data)
-                        elif lb_type == 'network':
-                            arns_dict.setdefault('nlb', []).append(common_data)
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing ELBv2 load balancers in {region}: {e}")
-
-        elif service_name == 'elb':
-            try:
-                paginator = client.get_paginator('describe_load_balancers')
-                for page in paginator.paginate():
-                    for lb in page.get('LoadBalancerDescriptions', []):
-                        lb_name_val = lb['LoadBalancerName']
-                        endpoint = lb.get('DNSName', 'Unknown')
-                        arn = f"arn:aws:elasticloadbalancing:{region}:{account_id}:loadbalancer/{lb_name_val}"
-                        service = extract_service_from_arn(arn)
-                        resource_id_name = extract_resource_identifier_from_arn(arn)
-                        arns_dict.setdefault('classic_elb', []).append({
-                            'arn': arn,
-                            'name': resource_id_name,
-                            'subclass': service,
-                            'region': region,
-                            'endpoint': endpoint,
-                            'scheme': lb.get('Scheme', 'Unknown'),
-                            'creation_date': lb.get('CreatedTime', 'Unknown').isoformat() if hasattr(lb.get('CreatedTime', 'Unknown'), 'isoformat') else str(lb.get('CreatedTime', 'Unknown'))
-                        })
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing Classic ELB load balancers in {region}: {e}")
-
-        elif service_name == 's3':
-            if region == 'us-east-1':  # S3 list_buckets is global
-                try:
-                    response = client.list_buckets()  # No paginator for list_buckets
-                    for bucket in response.get('Buckets', []):
-                        bucket_name_val = bucket['Name']
-                        bucket_region = region  # Default to current region, then try to get specific
-                        endpoint = f"https://{bucket_name_val}.s3.amazonaws.com"  # Default endpoint
-                        try:
-                            bucket_location = client.get_bucket_location(Bucket=bucket_name_val)
-                            loc_constraint = bucket_location.get('LocationConstraint')
-                            if loc_constraint:  # Can be None for us-east-1
-                                bucket_region = loc_constraint
-                            # For us-east-1, LocationConstraint is None or 'us-east-1'.
-                            # Other regions return their name, e.g., 'eu-west-1'.
-                            if bucket_region == 'US':
-                                bucket_region = 'us-east-1'  # Some legacy buckets might return 'US'
-
-                            if bucket_region and bucket_region != 'us-east-1':
-                                endpoint = f"https://{bucket_name_val}.s3.{bucket_region}.amazonaws.com"
-                            else:  # us-east-1 or None
-                                bucket_region = 'us-east-1'  # Standardize
-                                endpoint = f"https://{bucket_name_val}.s3.{bucket_region}.amazonaws.com"
-
-                        except Exception as loc_e:
-                            print(f"Warning: Could not get location for bucket {bucket_name_val}, defaulting to us-east-1 endpoint. Error: {loc_e}")
-                            bucket_region = 'us-east-1'  # Fallback
-
-                        arn = f"arn:aws:s3:::{bucket_name_val}"
-                        service = extract_service_from_arn(arn)
-                        resource_id_name = extract_resource_identifier_from_arn(arn)
-                        arns_dict.setdefault(service_name, []).append({
-                            'arn': arn,
-                            'name': resource_id_name,
-                            'subclass': service,
-                            'region': bucket_region,  # Store actual bucket region
-                            'endpoint': endpoint,
-                            'account': account_id,
-                            'creation_date': bucket.get('CreationDate', 'Unknown').isoformat() if hasattr(bucket.get('CreationDate', 'Unknown'), 'isoformat') else str(bucket.get('CreationDate', 'Unknown'))
-                        })
-                except Exception as e:
-                    print(f"Error listing S3 buckets: {e}")
-
-        elif service_name == 'ec2':
-            try:  # EC2 Instances
-                paginator = client.get_paginator('describe_instances')
-                for page in paginator.paginate():
-                    for reservation in page.get('Reservations', []):
-                        for instance in reservation.get('Instances', []):
-                            instance_id = instance['InstanceId']
-                            arn = f"arn:aws:ec2:{region}:{account_id}:instance/{instance_id}"
-                            service = extract_service_from_arn(arn)
-                            resource_id_name = extract_resource_identifier_from_arn(arn)
-                            arns_dict.setdefault(service_name, []).append({  # service_name is 'ec2'
-                                'arn': arn,
-                                'name': resource_id_name,
-                                'subclass': service,
-                                'region': region,
-                                'private_ip': instance.get('PrivateIpAddress', 'None'),
-                                'public_ip': instance.get('PublicIpAddress', 'None'),
-                                'creation_date': instance.get('LaunchTime', 'Unknown').isoformat() if hasattr(instance.get('LaunchTime', 'Unknown'), 'isoformat') else str(instance.get('LaunchTime', 'Unknown'))
-                            })
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing EC2 instances in {region}: {e}")
-
-            # try:  # VPCs
-            #     paginator = client.get_paginator('describe_vpcs')
-            #     for page in paginator.paginate():
-            #         for vpc in page.get('Vpcs', []):
-            #             vpc_id = vpc['VpcId']
-            #             arn = f"arn:aws:ec2:{region}:{account_id}:vpc/{vpc_id}"
-            #             service = extract_service_from_arn(arn)
-            #             resource_id_name = extract_resource_identifier_from_arn(arn)
-            #             arns_dict.setdefault('vpc', []).append({
-            #                 'arn': arn,
-            #                 'name': resource_id_name,
-            #                 'subclass': service,
-            #                 'region': region,
-            #                 'cidr': vpc.get('CidrBlock', 'Unknown'),
-            #                 'creation_date': 'Unknown'  # VPCs don't have a direct creation date via this API
-            #             })
-            # except Exception as e:
-            #     if "OptInRequired" not in str(e):
-            #         print(f"Error listing VPCs in {region}: {e}")
-
-        elif service_name == 'lambda':
-            try:
-                paginator = client.get_paginator('list_functions')
-                for page in paginator.paginate():
-                    for function in page.get('Functions', []):
-                        arn = function['FunctionArn']
-                        service = extract_service_from_arn(arn)
-                        resource_id_name = extract_resource_identifier_from_arn(arn)
-                        arns_dict.setdefault(service_name, []).append({
-                            'arn': arn,
-                            'name': resource_id_name,
-                            'subclass': service,
-                            'region': region,
-                            'creation_date': function.get('LastModified', 'Unknown')  # LastModified is a string
-                        })
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing Lambda functions in {region}: {e}")
-
-        elif service_name == 'rds':
-            try:
-                paginator = client.get_paginator('describe_db_instances')
-                for page in paginator.paginate():
-                    for instance in page.get('DBInstances', []):
-                        arn = instance['DBInstanceArn']
-                        service = extract_service_from_arn(arn)
-                        resource_id_name = extract_resource_identifier_from_arn(arn)
-                        arns_dict.setdefault(service_name, []).append({
-                            'arn': arn,
-                            'name': resource_id_name,
-                            'subclass': service,
-                            'region': region,
-                            'creation_date': instance.get('InstanceCreateTime', 'Unknown').isoformat() if hasattr(instance.get('InstanceCreateTime', 'Unknown'), 'isoformat') else str(instance.get('InstanceCreateTime', 'Unknown'))
-                        })
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing RDS instances in {region}: {e}")
-
-        elif service_name == 'dynamodb':
-            try:
-                paginator = client.get_paginator('list_tables')
-                for page in paginator.paginate():
-                    for table_name_val in page.get('TableNames', []):
-                        arn = f"arn:aws:dynamodb:{region}:{account_id}:table/{table_name_val}"
-                        creation_date = 'Unknown'
-                        try:
-                            table_details = client.describe_table(TableName=table_name_val)
-                            creation_date_dt = table_details.get('Table', {}).get('CreationDateTime', 'Unknown')
-                            creation_date = creation_date_dt.isoformat() if hasattr(creation_date_dt, 'isoformat') else str(creation_date_dt)
-                        except Exception as desc_e:
-                            print(f"Warning: Could not describe DynamoDB table {table_name_val} for creation date: {desc_e}")
-                        service = extract_service_from_arn(arn)
-                        resource_id_name = extract_resource_identifier_from_arn(arn)
-                        arns_dict.setdefault(service_name, []).append({
-                            'arn': arn,
-                            'name': resource_id_name,
-                            'subclass': service,
-                            'region': region,
-                            'creation_date': creation_date
-                        })
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing DynamoDB tables in {region}: {e}")
-
-        elif service_name == 'sns':
-            try:
-                paginator = client.get_paginator('list_topics')
-                for page in paginator.paginate():
-                    for topic in page.get('Topics', []):
-                        arn = topic['TopicArn']
-                        service = extract_service_from_arn(arn)
-                        resource_id_name = extract_resource_identifier_from_arn(arn)
-                        arns_dict.setdefault(service_name, []).append({
-                            'arn': arn,
-                            'name': resource_id_name,
-                            'subclass': service,
-                            'region': region,
-                            'creation_date': 'Unknown'  # SNS Topics don't have a direct creation date via this API
-                        })
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing SNS topics in {region}: {e}")
-
-        elif service_name == 'sqs':
-            try:
-                paginator = client.get_paginator('list_queues')
-                for page in paginator.paginate():
-                    for queue_url in page.get('QueueUrls', []):
-                        try:
-                            queue_attrs = client.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['QueueArn', 'CreatedTimestamp'])
-                            arn = queue_attrs.get('Attributes', {}).get('QueueArn')
-                            if not arn:
-                                continue  # Skip if ARN not found
-                            
-                            created_timestamp_str = queue_attrs.get('Attributes', {}).get('CreatedTimestamp', 'Unknown')
-                            creation_date = 'Unknown'
-                            if created_timestamp_str.isdigit():
-                                creation_date = datetime.fromtimestamp(int(created_timestamp_str)).isoformat()
-                            
-                            service = extract_service_from_arn(arn)
-                            resource_id_name = extract_resource_identifier_from_arn(arn)
-                            arns_dict.setdefault(service_name, []).append({
-                                'arn': arn,
-                                'name': resource_id_name,
-                                'subclass': service,
-                                'region': region,
-                                'creation_date': creation_date
-                            })
-                        except Exception as attr_e:
-                            print(f"Error getting attributes for SQS queue {queue_url}: {attr_e}")
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing SQS queues in {region}: {e}")
-
-        elif service_name == 'iam':
-            if region == 'us-east-1':  # IAM is global, process only once
-                iam_item_configs = [
-                    # item_type, operation_name, items_key, date_key, paginate_params
-                    ('role', 'list_roles', 'Roles', 'CreateDate', {}),
-                    ('user', 'list_users', 'Users', 'CreateDate', {}),
-                    ('policy', 'list_policies', 'Policies', 'CreateDate', {'Scope': 'Local'})  # Customer managed policies
-                ]
-
-                for item_type, op_name, items_key_str, date_key_str, params_paginate in iam_item_configs:
-                    try:
-                        paginator = client.get_paginator(op_name)
-                        for page in paginator.paginate(**params_paginate):
-                            for item in page.get(items_key_str, []):
-                                arn = item.get('Arn')
-                                if not isinstance(arn, str):
-                                    print(f"Warning: IAM {item_type} item found with invalid ARN '{arn}'. Item data: {item}")
-                                    continue
-
-                                service = extract_service_from_arn(arn)
-                                resource_id_name = extract_resource_identifier_from_arn(arn)
-                                creation_date_val = item.get(date_key_str, 'Unknown')
-                                creation_date_iso = creation_date_val.isoformat() if hasattr(creation_date_val, 'isoformat') else str(creation_date_val)
-
-                                arns_dict.setdefault(service_name, []).append({
-                                    'arn': arn,
-                                    'name': resource_id_name,
-                                    'subclass': service,
-                                    'item_type': item_type,
-                                    'region': 'global',
-                                    'creation_date': creation_date_iso
-                                })
-                    except botocore.exceptions.ClientError as ce:
-                        print(f"AWS ClientError listing IAM {item_type}s in {region}: {ce}. This could be a permissions issue or the service is not available in the region for this account.")
-                    except Exception as item_e:
-                        print(f"Unexpected error listing IAM {item_type}s in {region}: {item_e}")
-            # No else needed, IAM is global and processed in us-east-1 only.
-
-        elif service_name == 'cloudformation':
-            try:
-                paginator = client.get_paginator('list_stacks')
-                for page in paginator.paginate():
-                    for stack in page.get('StackSummaries', []):
-                        if stack.get('StackStatus') != 'DELETE_COMPLETE':
-                            arn = stack['StackId']  # This is the ARN for CloudFormation stacks
-                            service = extract_service_from_arn(arn)
-                            resource_id_name = extract_resource_identifier_from_arn(arn)
-                            arns_dict.setdefault(service_name, []).append({
-                                'arn': arn,
-                                'name': resource_id_name,
-                                'subclass': service,
-                                'region': region,
-                                'creation_date': stack.get('CreationTime', 'Unknown').isoformat() if hasattr(stack.get('CreationTime', 'Unknown'), 'isoformat') else str(stack.get('CreationTime', 'Unknown'))
-                            })
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing CloudFormation stacks in {region}: {e}")
-
-        elif service_name == 'apigateway':  # This is for API Gateway v1 (REST APIs)
+        bucket_location = client.get_bucket_location(Bucket=bucket_name_val)
+    except Exception as loc_e:
+        print(f"Warning: Could not get location for bucket {bucket_name_val}, defaulting to us-east-1 endpoint. Error: {loc_e}")
+        return None
+    # For us-east-1, LocationConstraint is None or 'us-east-1'; some legacy buckets return 'US'.
+    # Other regions return their name, e.g., 'eu-west-1'.
+    loc_constraint = bucket_location.get('LocationConstraint')
+    return 'us-east-1' if loc_constraint in (None, '', 'US') else loc_constraint
+
+
+def _bucket_region_cache_path(account_id):
+    return os.path.join(CACHE_DIR, 's3-bucket-regions', f"{account_id}.json")
+
+
+def load_json_cache(path):
+    """Return the dict stored at path, or {} if it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_json_cache(path, data, label):
+    """Atomically replace the cache file at path with data."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True, default=str)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        print(f"Warning: could not write {label} cache: {e}")
+
+
+@collector('s3', 's3', 'S3 buckets', global_service=True)
+def collect_s3_buckets(client, region, account_id, batch):
+    """
+    A bucket's region never changes, so it comes, in order of preference, from the
+    BucketRegion field of list_buckets (returned whenever the request has a parameter,
+    hence MaxBuckets), from the bucket region cache keyed by name and creation date, or,
+    for new buckets only, from get_bucket_location on the enrichment pool.
+    """
+    buckets = []
+    for page in client.get_paginator('list_buckets').paginate(PaginationConfig={'PageSize': 10000}):
+        buckets.extend(page.get('Buckets', []))
+
+    cached_regions = load_json_cache(_bucket_region_cache_path(account_id))
+    bucket_regions = {}
+    unresolved = []
+    for bucket in buckets:
+        cache_key = f"{bucket['Name']}|{_isoformat(bucket.get('CreationDate', 'Unknown'))}"
+        bucket_region = bucket.get('BucketRegion') or cached_regions.get(cache_key)
+        if bucket_region:
+            bucket_regions[cache_key] = bucket_region
+        else:
+            unresolved.append((cache_key, bucket['Name']))
+    for (cache_key, _name), future in get_enrichment_pool().map(
+            's3', lambda key_and_name: _bucket_location(client, key_and_name[1]), unresolved):
+        if future.result():
+            bucket_regions[cache_key] = future.result()
+    if bucket_regions != cached_regions:  # Buckets deleted since the last run drop out
+        save_json_cache(_bucket_region_cache_path(account_id), bucket_regions, 'S3 bucket region')
+
+    for bucket in buckets:
+        bucket_name_val = bucket['Name']
+        creation_date = _isoformat(bucket.get('CreationDate', 'Unknown'))
+        bucket_region = bucket_regions.get(f"{bucket_name_val}|{creation_date}")
+        if bucket_region:
+            endpoint = f"https://{bucket_name_val}.s3.{bucket_region}.amazonaws.com"
+        else:
+            bucket_region, endpoint = 'us-east-1', f"https://{bucket_name_val}.s3.amazonaws.com"  # Fallback
+        arn = f"arn:aws:s3:::{bucket_name_val}"
+        batch.setdefault('s3', []).append({
+            'arn': arn,
+            'name': extract_resource_identifier_from_arn(arn),
+            'subclass': extract_service_from_arn(arn),
+            'region': bucket_region,  # Store actual bucket region
+            'endpoint': endpoint,
+            'account': account_id,
+            'creation_date': creation_date
+        })
+
+
+@collector('ec2:instances', 'ec2', 'EC2 instances')
+def collect_ec2_instances(client, region, account_id, batch):
+    paginator = client.get_paginator('describe_instances')
+    for page in paginator.paginate():
+        for reservation in page.get('Reservations', []):
+            for instance in reservation.get('Instances', []):
+                arn = f"arn:aws:ec2:{region}:{account_id}:instance/{instance['InstanceId']}"
+                batch.setdefault('ec2', []).append({
+                    'arn': arn,
+                    'name': extract_resource_identifier_from_arn(arn),
+                    'subclass': extract_service_from_arn(arn),
+                    'region': region,
+                    'private_ip': instance.get('PrivateIpAddress', 'None'),
+                    'public_ip': instance.get('PublicIpAddress', 'None'),
+                    'creation_date': _isoformat(instance.get('LaunchTime', 'Unknown'))
+                })
+
+
+# VPCs are not part of the default 'ec2' scan; add 'ec2:vpcs' to SERVICES_TO_SCAN to record them
+@collector('ec2:vpcs', 'ec2', 'VPCs', default=False, keys=('vpc',))
+def collect_vpcs(client, region, account_id, batch):
+    paginator = client.get_paginator('describe_vpcs')
+    for page in paginator.paginate():
+        for vpc in page.get('Vpcs', []):
+            arn = f"arn:aws:ec2:{region}:{account_id}:vpc/{vpc['VpcId']}"
+            batch.setdefault('vpc', []).append({
+                'arn': arn,
+                'name': extract_resource_identifier_from_arn(arn),
+                'subclass': extract_service_from_arn(arn),
+                'region': region,
+                'cidr': vpc.get('CidrBlock', 'Unknown'),
+                'creation_date': 'Unknown'  # VPCs don't have a direct creation date via this API
+            })
+
+
+@collector('lambda', 'lambda', 'Lambda functions')
+def collect_lambda_functions(client, region, account_id, batch):
+    paginator = client.get_paginator('list_functions')
+    for page in paginator.paginate():
+        for function in page.get('Functions', []):
+            arn = function['FunctionArn']
+            batch.setdefault('lambda', []).append({
+                'arn': arn,
+                'name': extract_resource_identifier_from_arn(arn),
+                'subclass': extract_service_from_arn(arn),
+                'region': region,
+                'creation_date': function.get('LastModified', 'Unknown')  # LastModified is a string
+            })
+
+
+@collector('rds', 'rds', 'RDS instances')
+def collect_rds_instances(client, region, account_id, batch):
+    paginator = client.get_paginator('describe_db_instances')
+    for page in paginator.paginate():
+        for instance in page.get('DBInstances', []):
+            arn = instance['DBInstanceArn']
+            batch.setdefault('rds', []).append({
+                'arn': arn,
+                'name': extract_resource_identifier_from_arn(arn),
+                'subclass': extract_service_from_arn(arn),
+                'region': region,
+                'creation_date': _isoformat(instance.get('InstanceCreateTime', 'Unknown'))
+            })
+
+
+@collector('dynamodb', 'dynamodb', 'DynamoDB tables')
+def collect_dynamodb_tables(client, region, account_id, batch):
+    paginator = client.get_paginator('list_tables')
+    for page in paginator.paginate():
+        described = get_enrichment_pool().map('dynamodb', lambda name: client.describe_table(TableName=name),
+                                              page.get('TableNames', []))
+        for table_name_val, future in described:
+            arn = f"arn:aws:dynamodb:{region}:{account_id}:table/{table_name_val}"
+            creation_date = 'Unknown'
             try:
-                paginator = client.get_paginator('get_rest_apis')
-                for page in paginator.paginate():
-                    for api in page.get('items', []):
-                        api_id = api['id']
-                        # Construct ARN for API Gateway v1 REST API
-                        arn = f"arn:aws:apigateway:{region}:{account_id}:/restapis/{api_id}"
-                        service = extract_service_from_arn(arn)
-                        resource_id_name = extract_resource_identifier_from_arn(arn)
-                        arns_dict.setdefault(service_name, []).append({
-                            'arn': arn,
-                            'name': resource_id_name,
-                            'subclass': service,
-                            'region': region,
-                            'creation_date': api.get('createdDate', 'Unknown').isoformat() if hasattr(api.get('createdDate', 'Unknown'), 'isoformat') else str(api.get('createdDate', 'Unknown'))
-                        })
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing API Gateway (v1) REST APIs in {region}: {e}")
-        
-        # Placeholder for apigatewayv2 (HTTP and WebSocket APIs) if needed in the future
-        # elif service_name == 'apigatewayv2':
-        #     pass
-
-        elif service_name == 'eks':
+                creation_date = _isoformat(future.result().get('Table', {}).get('CreationDateTime', 'Unknown'))
+            except Exception as desc_e:
+                print(f"Warning: Could not describe DynamoDB table {table_name_val} for creation date: {desc_e}")
+            batch.setdefault('dynamodb', []).append({
+                'arn': arn,
+                'name': extract_resource_identifier_from_arn(arn),
+                'subclass': extract_service_from_arn(arn),
+                'region': region,
+                'creation_date': creation_date
+            })
+
+
+@collector('sns', 'sns', 'SNS topics')
+def collect_sns_topics(client, region, account_id, batch):
+    paginator = client.get_paginator('list_topics')
+    for page in paginator.paginate():
+        for topic in page.get('Topics', []):
+            arn = topic['TopicArn']
+            batch.setdefault('sns', []).append({
+                'arn': arn,
+                'name': extract_resource_identifier_from_arn(arn),
+                'subclass': extract_service_from_arn(arn),
+                'region': region,
+                'creation_date': 'Unknown'  # SNS Topics don't have a direct creation date via this API
+            })
+
+
+@collector('sqs', 'sqs', 'SQS queues')
+def collect_sqs_queues(client, region, account_id, batch):
+    paginator = client.get_paginator('list_queues')
+    for page in paginator.paginate():
+        attributes = get_enrichment_pool().map(
+            'sqs', lambda queue_url: client.get_queue_attributes(QueueUrl=queue_url,
+                                                                 AttributeNames=['QueueArn', 'CreatedTimestamp']),
+            page.get('QueueUrls', []))
+        for queue_url, future in attributes:
             try:
-                paginator = client.get_paginator('list_clusters')
-                for page in paginator.paginate():
-                    for cluster_name_iter in page.get('clusters', []):
-                        try:
-                            cluster_details = client.describe_cluster(name=cluster_name_iter)
-                            cluster_data = cluster_details.get('cluster', {})
-                            arn = cluster_data.get('arn')
-                            if not arn:
-                                continue   # Should always have ARN
-
-                            service = extract_service_from_arn(arn)
-                            resource_id_name = extract_resource_identifier_from_arn(arn)
-                            arns_dict.setdefault(service_name, []).append({
-                                'arn': arn,
-                                'name': resource_id_name,
-                                'subclass': service,
-                                'cluster_name': cluster_data.get('name', cluster_name_iter),
-                                'region': region,
-                                'endpoint': cluster_data.get('endpoint', 'Unknown'),
-                                'version': cluster_data.get('version', 'Unknown'),
-                                'creation_date': cluster_data.get('createdAt', 'Unknown').isoformat() if hasattr(cluster_data.get('createdAt', 'Unknown'), 'isoformat') else str(cluster_data.get('createdAt', 'Unknown'))
-                            })
-                        except Exception as e_detail:
-                            print(f"Error getting details for EKS cluster {cluster_name_iter} in {region}: {e_detail}")
-                            # Fallback with basic info if describe_cluster fails
-                            arn_fallback = f"arn:aws:eks:{region}:{account_id}:cluster/{cluster_name_iter}"
-                            service_fallback = extract_service_from_arn(arn_fallback)
-                            resource_id_name_fallback = extract_resource_identifier_from_arn(arn_fallback)
-                            arns_dict.setdefault(service_name, []).append({
-                                'arn': arn_fallback,
-                                'name': resource_id_name_fallback,
-                                'subclass': service_fallback,
-                                'cluster_name': cluster_name_iter,
-                                'region': region,
-                                'creation_date': 'Unknown'
-                            })
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing EKS clusters in {region}: {e}")
-
-        elif service_name == 'ecs':
-            try:  # ECS Clusters
-                paginator_clusters = client.get_paginator('list_clusters')
-                for page_cluster in paginator_clusters.paginate():
-                    cluster_arns_list = page_cluster.get('clusterArns', [])
-                    if not cluster_arns_list:
-                        continue
-
-                    described_clusters = client.describe_clusters(clusters=cluster_arns_list).get('clusters', [])
-                    for cluster_data in described_clusters:
-                        cluster_arn = cluster_data.get('clusterArn')
-                        if not cluster_arn:
-                            continue
-
-                        actual_cluster_name = cluster_data.get('clusterName', 'Unknown')
-                        service = extract_service_from_arn(cluster_arn)
-                        resource_id_name = extract_resource_identifier_from_arn(cluster_arn)
-                        
-                        # Optionally, list services and task definitions (can be slow and many API calls)
-                        # For this script, we'll keep it simpler and just list cluster info.
-                        # Add service_count if desired:
-                        # running_tasks_count = cluster_data.get('runningTasksCount', 0)
-                        # pending_tasks_count = cluster_data.get('pendingTasksCount', 0)
-                        # active_services_count = cluster_data.get('activeServicesCount', 0)
-
-                        arns_dict.setdefault(service_name, []).append({
-                            'arn': cluster_arn,
-                            'name': resource_id_name,
-                            'subclass': service,
-                            'region': region,
-                            'cluster_name': actual_cluster_name,
-                            'status': cluster_data.get('status', 'Unknown'),
-                            'creation_date': 'Unknown'  # ECS Clusters don't have a direct creation date via this API
-                        })
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing ECS clusters in {region}: {e}")
-
-        elif service_name == 'ecr':
+                queue_attrs = future.result()
+                arn = queue_attrs.get('Attributes', {}).get('QueueArn')
+                if not arn:
+                    continue  # Skip if ARN not found
+
+                created_timestamp_str = queue_attrs.get('Attributes', {}).get('CreatedTimestamp', 'Unknown')
+                creation_date = 'Unknown'
+                if created_timestamp_str.isdigit():
+                    creation_date = datetime.fromtimestamp(int(created_timestamp_str)).isoformat()
+
+                batch.setdefault('sqs', []).append({
+                    'arn': arn,
+                    'name': extract_resource_identifier_from_arn(arn),
+                    'subclass': extract_service_from_arn(arn),
+                    'region': region,
+                    'creation_date': creation_date
+                })
+            except Exception as attr_e:
+                print(f"Error getting attributes for SQS queue {queue_url}: {attr_e}")
+
+
+def _iam_collector(item_type, op_name, items_key_str, date_key_str, params_paginate):
+    """Collector for one IAM entity type; IAM is global and scanned once, from us-east-1."""
+
+    def collect(client, region, account_id, batch):
+        paginator = client.get_paginator(op_name)
+        for page in paginator.paginate(**params_paginate):
+            for item in page.get(items_key_str, []):
+                arn = item.get('Arn')
+                if not isinstance(arn, str):
+                    print(f"Warning: IAM {item_type} item found with invalid ARN '{arn}'. Item data: {item}")
+                    continue
+                batch.setdefault('iam', []).append({
+                    'arn': arn,
+                    'name': extract_resource_identifier_from_arn(arn),
+                    'subclass': extract_service_from_arn(arn),
+                    'item_type': item_type,
+                    'region': 'global',
+                    'creation_date': _isoformat(item.get(date_key_str, 'Unknown'))
+                })
+
+    return collect
+
+
+for _name, _item_type, _op_name, _items_key, _date_key, _params in [
+    # collector, item_type, operation_name, items_key, date_key, paginate_params
+    ('iam:roles', 'role', 'list_roles', 'Roles', 'CreateDate', {}),
+    ('iam:users', 'user', 'list_users', 'Users', 'CreateDate', {}),
+    ('iam:policies', 'policy', 'list_policies', 'Policies', 'CreateDate', {'Scope': 'Local'})  # Customer managed policies
+]:
+    collector(_name, 'iam', f"IAM {_name.split(':')[1]}", global_service=True)(
+        _iam_collector(_item_type, _op_name, _items_key, _date_key, _params))
+
+
+@collector('cloudformation', 'cloudformation', 'CloudFormation stacks')
+def collect_cloudformation_stacks(client, region, account_id, batch):
+    paginator = client.get_paginator('list_stacks')
+    for page in paginator.paginate():
+        for stack in page.get('StackSummaries', []):
+            if stack.get('StackStatus') != 'DELETE_COMPLETE':
+                arn = stack['StackId']  # This is the ARN for CloudFormation stacks
+                batch.setdefault('cloudformation', []).append({
+                    'arn': arn,
+                    'name': extract_resource_identifier_from_arn(arn),
+                    'subclass': extract_service_from_arn(arn),
+                    'region': region,
+                    'creation_date': _isoformat(stack.get('CreationTime', 'Unknown'))
+                })
+
+
+@collector('apigateway', 'apigateway', 'API Gateway (v1) REST APIs')
+def collect_rest_apis(client, region, account_id, batch):
+    paginator = client.get_paginator('get_rest_apis')
+    for page in paginator.paginate():
+        for api in page.get('items', []):
+            # Canonical API Gateway v1 REST API ARN: no account field, as returned by the tagging API
+            arn = f"arn:aws:apigateway:{region}::/restapis/{api['id']}"
+            batch.setdefault('apigateway', []).append({
+                'arn': arn,
+                'name': extract_resource_identifier_from_arn(arn),
+                'subclass': extract_service_from_arn(arn),
+                'region': region,
+                'creation_date': _isoformat(api.get('createdDate', 'Unknown'))
+            })
+
+
+@collector('eks', 'eks', 'EKS clusters')
+def collect_eks_clusters(client, region, account_id, batch):
+    paginator = client.get_paginator('list_clusters')
+    for page in paginator.paginate():
+        described = get_enrichment_pool().map('eks', lambda name: client.describe_cluster(name=name),
+                                              page.get('clusters', []))
+        for cluster_name_iter, future in described:
             try:
-                paginator = client.get_paginator('describe_repositories')
-                for page in paginator.paginate():
-                    for repo in page.get('repositories', []):
-                        repo_arn = repo['repositoryArn']
-                        service = extract_service_from_arn(repo_arn)
-                        resource_id_name = extract_resource_identifier_from_arn(repo_arn)
-                        image_count = 0  # Default
-                        try:
-                            # Count images (can be slow for many images)
-                            # For simplicity, we can get the count from list_images if needed,
-                            # or just indicate it's not fetched for speed.
-                            # list_images_paginator = client.get_paginator('list_images')
-                            # for list_page in list_images_paginator.paginate(repositoryName=repo['repositoryName']):
-                            #    image_count += len(list_page.get('imageIds', []))
-                            # For now, let's skip detailed image count for speed.
-                            pass
-                        except Exception as img_e:
-                            print(f"Warning: Could not count images for ECR repo {repo['repositoryName']}: {img_e}")
-
-                        arns_dict.setdefault(service_name, []).append({
-                            'arn': repo_arn,
-                            'name': resource_id_name,
-                            'subclass': service,
-                            'region': region,
-                            'repo_name': repo.get('repositoryName', 'Unknown'),
-                            'uri': repo.get('repositoryUri', 'Unknown'),
-                            'image_count': 'Not_Fetched',  # Or implement counting if needed
-                            'creation_date': repo.get('createdAt', 'Unknown').isoformat() if hasattr(repo.get('createdAt', 'Unknown'), 'isoformat') else str(repo.get('createdAt', 'Unknown'))
-                        })
-            except Exception as e:
-                if "OptInRequired" not in str(e):
-                    print(f"Error listing ECR repositories in {region}: {e}")
-
-        elif service_name == 'elasticache':
-            try:  # ElastiCache Cache Clusters (Memcached or single-node Redis)
-                paginator_cc = client.get_paginator('describe_cache_clusters')
-                for page_cc in paginator_cc.paginate(ShowCacheNodeInfo=True):  # ShowCacheNodeInfo for endpoint
-                    for cluster_node_data in page_cc.get('CacheClusters', []):
-                        cluster_id = cluster_node_data['CacheClusterId']
-                        # ElastiCache ARNs are constructed
-                        arn = f"arn:aws:elasticache:{region}:{account_id}:cluster:{cluster_id}"
-                        service = extract_service_from_arn(arn)
-                        resource_id_name = extract_resource_identifier_from_arn(arn)
-                        
-                        endpoint_address = "Unknown"
-                        endpoint_port = "Unknown"
-                        if cluster_node_data.get('CacheNodes'):
-                            # For Memcached, node endpoints are listed. For Redis (non-clustered), it's also here.
-                            # Taking the first node's endpoint.
-                            first_node = cluster_node_data['CacheNodes'][0]
-                            endpoint_address = first_node.get('Endpoint', {}).get('Address', 'Unknown')
-                            endpoint_port = first_node.get('Endpoint', {}).get('Port', 'Unknown')
-                        
-                        full_endpoint = f"{endpoint_address}:{endpoint_port}" if endpoint_address != 'Unknown' and endpoint_port != 'Unknown' else 'Unknown'
-
-                        arns_dict.setdefault('elasticache_cluster', []).append({  # Specific key for cache clusters
-                            'arn': arn,
-                            'name': resource_id_name,
-                            'subclass': service,  # Will be 'elasticache'
-                            'item_type': 'cache_cluster',
-                            'region': region,
-                            'id': cluster_id,
-                            'engine': cluster_node_data.get('Engine', 'Unknown'),
-                            'status': cluster_node_data.get('CacheClusterStatus', 'Unknown'),
-                            'endpoint': full_endpoint,
-                            'creation_date': cluster_node_data.get('CacheClusterCreateTime', 'Unknown').isoformat() if hasattr(cluster_node_data.get('CacheClusterCreateTime', 'Unknown'), 'isoformat') else str(cluster_node_data.get('CacheClusterCreateTime', 'Unknown'))
-                        })
-            except Exception as e_cc:
-                if "OptInRequired" not in str(e_cc):
-                    print(f"Error listing ElastiCache Cache Clusters in {region}: {e_cc}")
-
-            try:  # ElastiCache Replication Groups (Redis clustered or non-clustered with replication)
-                paginator_rg = client.get_paginator('describe_replication_groups')
-                for page_rg in paginator_rg.paginate():
-                    for repl_group in page_rg.get('ReplicationGroups', []):
-                        group_id = repl_group['ReplicationGroupId']
-                        # ElastiCache ARNs are constructed
-                        arn = f"arn:aws:elasticache:{region}:{account_id}:replicationgroup:{group_id}"
-                        service = extract_service_from_arn(arn)
-                        resource_id_name = extract_resource_identifier_from_arn(arn)
-
-                        endpoint_address = "Unknown"
-                        endpoint_port = "Unknown"
-                        # ConfigurationEndpoint is for Redis (cluster mode enabled)
-                        # PrimaryEndpoint is for Redis (cluster mode disabled) within NodeGroups
-                        if repl_group.get('ConfigurationEndpoint'):
-                            endpoint_address = repl_group['ConfigurationEndpoint'].get('Address', 'Unknown')
-                            endpoint_port = repl_group['ConfigurationEndpoint'].get('Port', 'Unknown')
-                        elif repl_group.get('NodeGroups') and repl_group['NodeGroups'][0].get('PrimaryEndpoint'):
-                            primary_ep = repl_group['NodeGroups'][0]['PrimaryEndpoint']
-                            endpoint_address = primary_ep.get('Address', 'Unknown')
-                            endpoint_port = primary_ep.get('Port', 'Unknown')
-                        
-                        full_endpoint = f"{endpoint_address}:{endpoint_port}" if endpoint_address != 'Unknown' and endpoint_port != 'Unknown' else 'Unknown'
-
-                        arns_dict.setdefault('elasticache_replication_group', []).append({
-                            'arn': arn,
-                            'name': resource_id_name,
-                            'subclass': service,  # Will be 'elasticache'
-                            'item_type': 'replication_group',
-                            'region': region,
-                            'id': group_id,
-                            'description': repl_group.get('Description', 'No description'),
-                            'status': repl_group.get('Status', 'Unknown'),
-                            'endpoint': full_endpoint,
-                            'creation_date': 'Unknown'  # Replication Groups don't have a direct creation date via this API
-                        })
-            except Exception as e_rg:
-                if "OptInRequired" not in str(e_rg):
-                    print(f"Error listing ElastiCache Replication Groups in {region}: {e_rg}")
-
-    except botocore.exceptions.ClientError as e:
-        error_code = e.response.get("Error", {}).get("Code")
-        if error_code == "AccessDenied" or "UnauthorizedOperation" in str(e):
-            print(f"Access denied for service {service_name} in region {region}. Skipping.")
-        elif "OptInRequired" in str(e):
-            # Silently ignore opt-in required regions or services not subscribed
-            pass
-        elif "InvalidClientTokenId" in str(e) or "AuthFailure" in str(e):
-            print(f"Authentication error (Invalid credentials or token) for service {service_name} in region {region}. Skipping.")
-        elif "EndpointConnectionError" in str(e):
-            print(f"Cannot connect to endpoint for service {service_name} in region {region}. Skipping.")
-        else:
-            print(f"ClientError for service {service_name} in region {region}: {e}. Skipping.")
-    except Exception as e:
-        print(f"Unexpected error for service {service_name} in region {region}: {e}. Skipping.")
+                cluster_data = future.result().get('cluster', {})
+                arn = cluster_data.get('arn')
+                if not arn:
+                    continue   # Should always have ARN
+                batch.setdefault('eks', []).append({
+                    'arn': arn,
+                    'name': extract_resource_identifier_from_arn(arn),
+                    'subclass': extract_service_from_arn(arn),
+                    'cluster_name': cluster_data.get('name', cluster_name_iter),
+                    'region': region,
+                    'endpoint': cluster_data.get('endpoint', 'Unknown'),
+                    'version': cluster_data.get('version', 'Unknown'),
+                    'creation_date': _isoformat(cluster_data.get('createdAt', 'Unknown'))
+                })
+            except Exception as e_detail:
+                print(f"Error getting details for EKS cluster {cluster_name_iter} in {region}: {e_detail}")
+                # Fallback with basic info if describe_cluster fails
+                arn_fallback = f"arn:aws:eks:{region}:{account_id}:cluster/{cluster_name_iter}"
+                batch.setdefault('eks', []).append({
+                    'arn': arn_fallback,
+                    'name': extract_resource_identifier_from_arn(arn_fallback),
+                    'subclass': extract_service_from_arn(arn_fallback),
+                    'cluster_name': cluster_name_iter,
+                    'region': region,
+                    'creation_date': 'Unknown'
+                })
+
+
+ECS_DESCRIBE_CLUSTERS_BATCH = 100  # API maximum per describe_clusters call
+ECS_DESCRIBE_SERVICES_BATCH = 10   # API maximum per describe_services call
+
+
+def _chunks(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _list_ecs_services(client, cluster_arn):
+    service_arns = []
+    for page in client.get_paginator('list_services').paginate(cluster=cluster_arn):
+        service_arns.extend(page.get('serviceArns', []))
+    return service_arns
+
+
+@collector('ecs', 'ecs', 'ECS clusters and services', keys=('ecs', 'ecs_service'))
+def collect_ecs_clusters(client, region, account_id, batch):
+    """
+    Every cluster, and every service of every cluster with its task definition.
+    Clusters are described 100 per call and services 10 per call (the API limits);
+    the list_services and describe_services calls of all clusters run in parallel on
+    the enrichment pool.
+    """
+    cluster_arns_list = []
+    for page_cluster in client.get_paginator('list_clusters').paginate():
+        cluster_arns_list.extend(page_cluster.get('clusterArns', []))
+    if not cluster_arns_list:
+        return
+
+    clusters = []
+    for chunk in _chunks(cluster_arns_list, ECS_DESCRIBE_CLUSTERS_BATCH):
+        clusters.extend(cluster_data for cluster_data in client.describe_clusters(clusters=chunk).get('clusters', [])
+                        if cluster_data.get('clusterArn'))
+
+    enrichment = get_enrichment_pool()
+    service_chunks = []  # (cluster_data, [up to 10 service ARNs])
+    for cluster_data, future in enrichment.map(
+            'ecs', lambda cluster: _list_ecs_services(client, cluster['clusterArn']), clusters):
+        cluster_arn = cluster_data['clusterArn']
+        try:
+            service_arns = future.result()
+        except Exception as e_list:
+            print(f"Error listing services of ECS cluster {cluster_arn} in {region}: {e_list}")
+            service_arns = None
+        batch.setdefault('ecs', []).append({
+            'arn': cluster_arn,
+            'name': extract_resource_identifier_from_arn(cluster_arn),
+            'subclass': extract_service_from_arn(cluster_arn),
+            'region': region,
+            'cluster_name': cluster_data.get('clusterName', 'Unknown'),
+            'status': cluster_data.get('status', 'Unknown'),
+            'service_count': len(service_arns) if service_arns is not None else 'Unknown',
+            'creation_date': 'Unknown'  # ECS Clusters don't have a direct creation date via this API
+        })
+        service_chunks.extend((cluster_data, chunk) for chunk in _chunks(service_arns or [], ECS_DESCRIBE_SERVICES_BATCH))
+
+    described = enrichment.map(
+        'ecs', lambda chunk: client.describe_services(cluster=chunk[0]['clusterArn'], services=chunk[1]), service_chunks)
+    for (cluster_data, chunk), future in described:
+        try:
+            services = future.result().get('services', [])
+        except Exception as e_detail:
+            print(f"Error describing {len(chunk)} services of ECS cluster {cluster_data['clusterArn']} in {region}: {e_detail}")
+            continue
+        for service_data in services:
+            service_arn = service_data['serviceArn']
+            batch.setdefault('ecs_service', []).append({
+                'arn': service_arn,
+                'name': extract_resource_identifier_from_arn(service_arn),
+                'subclass': extract_service_from_arn(service_arn),
+                'region': region,
+                'cluster_name': cluster_data.get('clusterName', 'Unknown'),
+                'service_name': service_data.get('serviceName', 'Unknown'),
+                'status': service_data.get('status', 'Unknown'),
+                'task_definition': service_data.get('taskDefinition', 'Unknown'),
+                'launch_type': service_data.get('launchType', 'Unknown'),
+                'desired_count': service_data.get('desiredCount'),
+                'running_count': service_data.get('runningCount'),
+                'creation_date': _isoformat(service_data.get('createdAt', 'Unknown'))
+            })
+
+
+def _ecr_image_cache_path(account_id, region):
+    return os.path.join(CACHE_DIR, 'ecr-images', f"{account_id}-{region}.json")
+
+
+def _ecr_fingerprint(client, repo_name):
+    """Hash of the repository's image ids from list_images (ids only, 1000 per page)."""
+    image_ids = []
+    for page in client.get_paginator('list_images').paginate(repositoryName=repo_name,
+                                                              PaginationConfig={'PageSize': 1000}):
+        image_ids.extend(f"{image_id.get('imageDigest')}:{image_id.get('imageTag', '')}"
+                         for image_id in page.get('imageIds', []))
+    return hashlib.sha1('\n'.join(sorted(image_ids)).encode('utf-8')).hexdigest(), len(image_ids)
+
+
+def _ecr_image_summary(client, repo_name, cached):
+    """
+    Image count, total size, latest digest and last push time of one repository.
+    A repository whose image ids match the cached fingerprint is not described again;
+    otherwise describe_images is paginated, 1000 images per page.
+    """
+    fingerprint, image_ids = _ecr_fingerprint(client, repo_name)
+    if cached and cached.get('fingerprint') == fingerprint:
+        return cached
+    summary = {'fingerprint': fingerprint, 'image_count': 0, 'total_size_bytes': 0,
+               'latest_digest': None, 'last_pushed': None}
+    if not image_ids:
+        return summary
+    latest_pushed = None
+    for page in client.get_paginator('describe_images').paginate(repositoryName=repo_name,
+                                                                 PaginationConfig={'PageSize': 1000}):
+        for image in page.get('imageDetails', []):
+            summary['image_count'] += 1
+            summary['total_size_bytes'] += image.get('imageSizeInBytes', 0)
+            pushed = image.get('imagePushedAt')
+            if pushed is not None and (latest_pushed is None or pushed > latest_pushed):
+                latest_pushed = pushed
+                summary['latest_digest'] = image.get('imageDigest')
+    summary['last_pushed'] = _isoformat(latest_pushed) if latest_pushed else None
+    return summary
+
+
+@collector('ecr', 'ecr', 'ECR repositories')
+def collect_ecr_repositories(client, region, account_id, batch):
+    """
+    Repositories with their image count, total size and latest digest. The image
+    summaries run in parallel on the enrichment pool (one paginated describe_images per
+    repository) and are cached per repository; a repository whose images did not change
+    since the last run costs a single list_images call.
+    """
+    repos = []
+    for page in client.get_paginator('describe_repositories').paginate():
+        repos.extend(page.get('repositories', []))
+
+    cache_path = _ecr_image_cache_path(account_id, region)
+    cached_summaries = load_json_cache(cache_path)
+    summaries = {}
+    enriched = get_enrichment_pool().map(
+        'ecr', lambda repo: _ecr_image_summary(client, repo['repositoryName'], cached_summaries.get(repo['repositoryArn'])),
+        repos)
+    for repo, future in enriched:
+        repo_arn = repo['repositoryArn']
+        record = {
+            'arn': repo_arn,
+            'name': extract_resource_identifier_from_arn(repo_arn),
+            'subclass': extract_service_from_arn(repo_arn),
+            'region': region,
+            'repo_name': repo.get('repositoryName', 'Unknown'),
+            'uri': repo.get('repositoryUri', 'Unknown'),
+            'image_count': 'Not_Fetched',
+            'creation_date': _isoformat(repo.get('createdAt', 'Unknown'))
+        }
+        try:
+            summaries[repo_arn] = summary = future.result()
+            record.update({key: summary[key] for key in ('image_count', 'total_size_bytes', 'latest_digest', 'last_pushed')})
+        except Exception as img_e:
+            print(f"Warning: Could not count images for ECR repo {repo['repositoryName']}: {img_e}")
+        batch.setdefault('ecr', []).append(record)
+    if summaries != cached_summaries:
+        save_json_cache(cache_path, summaries, 'ECR image')
+
+
+def _endpoint(address, port):
+    return f"{address}:{port}" if address != 'Unknown' and port != 'Unknown' else 'Unknown'
+
+
+@collector('elasticache:clusters', 'elasticache', 'ElastiCache Cache Clusters', keys=('elasticache_cluster',))
+def collect_cache_clusters(client, region, account_id, batch):
+    # Memcached or single-node Redis
+    paginator_cc = client.get_paginator('describe_cache_clusters')
+    for page_cc in paginator_cc.paginate(ShowCacheNodeInfo=True):  # ShowCacheNodeInfo for endpoint
+        for cluster_node_data in page_cc.get('CacheClusters', []):
+            cluster_id = cluster_node_data['CacheClusterId']
+            arn = f"arn:aws:elasticache:{region}:{account_id}:cluster:{cluster_id}"  # ElastiCache ARNs are constructed
+
+            endpoint_address = "Unknown"
+            endpoint_port = "Unknown"
+            if cluster_node_data.get('CacheNodes'):
+                # For Memcached, node endpoints are listed. For Redis (non-clustered), it's also here.
+                # Taking the first node's endpoint.
+                first_node = cluster_node_data['CacheNodes'][0]
+                endpoint_address = first_node.get('Endpoint', {}).get('Address', 'Unknown')
+                endpoint_port = first_node.get('Endpoint', {}).get('Port', 'Unknown')
+
+            batch.setdefault('elasticache_cluster', []).append({  # Specific key for cache clusters
+                'arn': arn,
+                'name': extract_resource_identifier_from_arn(arn),
+                'subclass': extract_service_from_arn(arn),  # Will be 'elasticache'
+                'item_type': 'cache_cluster',
+                'region': region,
+                'id': cluster_id,
+                'engine': cluster_node_data.get('Engine', 'Unknown'),
+                'status': cluster_node_data.get('CacheClusterStatus', 'Unknown'),
+                'endpoint': _endpoint(endpoint_address, endpoint_port),
+                'creation_date': _isoformat(cluster_node_data.get('CacheClusterCreateTime', 'Unknown'))
+            })
+
+
+@collector('elasticache:replication_groups', 'elasticache', 'ElastiCache Replication Groups',
+           keys=('elasticache_replication_group',))
+def collect_replication_groups(client, region, account_id, batch):
+    # Redis clustered or non-clustered with replication
+    paginator_rg = client.get_paginator('describe_replication_groups')
+    for page_rg in paginator_rg.paginate():
+        for repl_group in page_rg.get('ReplicationGroups', []):
+            group_id = repl_group['ReplicationGroupId']
+            arn = f"arn:aws:elasticache:{region}:{account_id}:replicationgroup:{group_id}"  # ElastiCache ARNs are constructed
+
+            endpoint_address = "Unknown"
+            endpoint_port = "Unknown"
+            # ConfigurationEndpoint is for Redis (cluster mode enabled)
+            # PrimaryEndpoint is for Redis (cluster mode disabled) within NodeGroups
+            if repl_group.get('ConfigurationEndpoint'):
+                endpoint_address = repl_group['ConfigurationEndpoint'].get('Address', 'Unknown')
+                endpoint_port = repl_group['ConfigurationEndpoint'].get('Port', 'Unknown')
+            elif repl_group.get('NodeGroups') and repl_group['NodeGroups'][0].get('PrimaryEndpoint'):
+                primary_ep = repl_group['NodeGroups'][0]['PrimaryEndpoint']
+                endpoint_address = primary_ep.get('Address', 'Unknown')
+                endpoint_port = primary_ep.get('Port', 'Unknown')
+
+            batch.setdefault('elasticache_replication_group', []).append({
+                'arn': arn,
+                'name': extract_resource_identifier_from_arn(arn),
+                'subclass': extract_service_from_arn(arn),  # Will be 'elasticache'
+                'item_type': 'replication_group',
+                'region': region,
+                'id': group_id,
+                'description': repl_group.get('Description', 'No description'),
+                'status': repl_group.get('Status', 'Unknown'),
+                'endpoint': _endpoint(endpoint_address, endpoint_port),
+                'creation_date': 'Unknown'  # Replication Groups don't have a direct creation date via this API
+            })
+
+
+# Error codes that condemn more than the call that got them: 'region' opens the
+# (account, region) circuit, 'service' the (service, region) one and 'collector' the
+# (collector, region) one. Denials stay per collector: the collectors of one service
+# (ec2 instances and VPCs, the IAM item types) need separate permissions.
+ERROR_SCOPES = {
+    'OptInRequired': 'region',  # Region not enabled for the account
+    'InvalidClientTokenId': 'region',
+    'UnrecognizedClientException': 'region',
+    'AuthFailure': 'region',
+    'ExpiredToken': 'region',
+    'ExpiredTokenException': 'region',
+    'SubscriptionRequiredException': 'service',  # Service not subscribed in the region
+    'EndpointConnectionError': 'service',  # Endpoint unreachable (or the service is not offered in the region)
+    'ConnectTimeoutError': 'service',
+    'AccessDenied': 'collector',
+    'AccessDeniedException': 'collector',
+    'UnauthorizedOperation': 'collector',
+    'AuthorizationError': 'collector',
+    'InvalidAction': 'collector',
+    'UnsupportedOperation': 'collector',
+}
+# Services whose endpoints must be unreachable before the whole region is taken as unreachable
+REGION_UNREACHABLE_SERVICES = 3
+UNREACHABLE_ERROR_CODES = ('EndpointConnectionError', 'ConnectTimeoutError')
+
+
+def classify_error(exception):
+    """
+    Return (error_code, scope) for an exception raised by a task: the AWS error code
+    (or the botocore exception name for connection errors) and its ERROR_SCOPES scope,
+    None when the error only concerns that one task.
+    """
+    if isinstance(exception, botocore.exceptions.ClientError):
+        error_code = exception.response.get('Error', {}).get('Code', '')
+    elif isinstance(exception, botocore.exceptions.ConnectionError):
+        error_code = type(exception).__name__
+    else:
+        return type(exception).__name__, None
+    return error_code, ERROR_SCOPES.get(error_code)
 
 
-def main():
-    """ Main function """
-    print("Starting AWS resource ARN scanner across all regions...")
-    print("Using credentials from environment variables or default profile.")
+class CircuitOpenError(Exception):
+    """Raised instead of an API call of a task covered by an open circuit."""
+
+    def __init__(self, circuit, error_code):
+        super().__init__(circuit, error_code)
+        self.circuit = circuit
+        self.error_code = error_code
+
+    def __str__(self):
+        return f"circuit {self.circuit} open ({self.error_code})"
+
+
+class CircuitBreaker:
+    """
+    Open circuits of one run, per (account, region), (service, region) and
+    (collector, region). The first hard failure of a scope (see classify_error) opens
+    its circuit: later tasks of that scope are skipped without calling AWS, and the
+    next call of tasks already running fails with CircuitOpenError (ClientCache checks
+    the breaker before every call). A region also opens once REGION_UNREACHABLE_SERVICES
+    of its services are unreachable. Thread-safe; with ProcessScanEngine every worker
+    process has its own.
+    """
 
+    def __init__(self):
+        self._open = {}  # (scope, account/service/collector, region) -> error_code
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(scope, account_id, service_name, collector_name, region):
+        return (scope, {'region': account_id, 'service': service_name, 'collector': collector_name}[scope], region)
+
+    def check(self, account_id, service_name, collector_name, region):
+        """Return (circuit description, error_code) of the open circuit covering this task, or None."""
+        with self._lock:
+            for scope in ('region', 'service', 'collector'):
+                key = self._key(scope, account_id, service_name, collector_name, region)
+                error_code = self._open.get(key)
+                if error_code:
+                    return f"{key[0]} {key[1]}/{key[2]}", error_code
+        return None
+
+    def trip(self, scope, account_id, service_name, collector_name, region, error_code):
+        """Open the circuit of scope for this task; returns the keys opened now."""
+        keys = [self._key(scope, account_id, service_name, collector_name, region)]
+        with self._lock:
+            if scope == 'service' and error_code in UNREACHABLE_ERROR_CODES:
+                unreachable = {key[1] for key, code in self._open.items()
+                               if key[0] == 'service' and key[2] == region and code in UNREACHABLE_ERROR_CODES}
+                if len(unreachable | {service_name}) >= REGION_UNREACHABLE_SERVICES:
+                    keys.append(self._key('region', account_id, service_name, collector_name, region))
+            opened = [key for key in keys if key not in self._open]
+            for key in opened:
+                self._open[key] = error_code
+        return opened
+
+
+def _breaker_skip(clients, account_id, service_name, collector_name, region):
+    """
+    If an open circuit covers this task, record the skip on its TaskStats and return True.
+    Otherwise the scope is kept on the TaskStats, for the check before every API call.
+    """
+    stats = _CURRENT_TASK.get()
+    if stats is not None:
+        stats.scope = (account_id, service_name, collector_name, region)
+    skip = clients.breaker.check(account_id, service_name, collector_name, region)
+    if skip is None:
+        return False
+    if stats is not None:
+        stats.skipped = skip
+    return True
+
+
+def _handle_task_error(clients, account_id, service_name, collector_name, region, label, exception):
+    """Classify a task error, open its circuit for hard failures and report it."""
+    if isinstance(exception, CircuitOpenError):  # Circuit opened by another task while this one ran
+        stats = _CURRENT_TASK.get()
+        if stats is not None:
+            stats.skipped = (exception.circuit, exception.error_code)
+        return
+    error_code, scope = classify_error(exception)
+    if scope is None:
+        print(f"Error listing {label} in {region}: {exception}")
+        return
+    opened = clients.breaker.trip(scope, account_id, service_name, collector_name, region, error_code)
+    if scope == 'collector':
+        print(f"{error_code} listing {label} in region {region}. Skipping.")
+    for kind, name, key_region in opened:
+        if kind != 'collector':
+            print(f"{error_code} listing {label} in {region}: skipping the remaining tasks of {kind} {name}/{key_region}.")
+
+
+def collect_resource_arns(collector_name, region, account_id, clients=None):
+    """
+    Run one registered collector (see COLLECTORS) in the specified region.
+    Returns this task's own batch of records, keyed like the all-services output
+    ({'alb': [...], 'nlb': [...]}); nothing is shared with other tasks.
+    Tasks covered by an open circuit (see CircuitBreaker) return an empty batch at once.
+    """
+    arns_dict = {}
+    registered = COLLECTORS[collector_name]
+    clients = clients or get_default_clients()
+    if _breaker_skip(clients, account_id, registered.service, collector_name, region):
+        return arns_dict
     try:
-        session = get_session()
-        sts_client = session.client('sts')
-        account_id = sts_client.get_caller_identity()['Account']
-        caller_arn = sts_client.get_caller_identity()['Arn']
-        print(f"Connected to AWS Account: {account_id} using identity: {caller_arn}")
+        registered.collect(clients.get(registered.service, region), region, account_id, arns_dict)
     except Exception as e:
-        print(f"Error authenticating with AWS: {e}")
-        print("Ensure your AWS credentials (e.g., environment variables, shared credentials file, or IAM role) are configured correctly.")
-        sys.exit(1)
+        _handle_task_error(clients, account_id, registered.service, collector_name, region, registered.label, e)
+    return arns_dict
+
+
+# ARN service and resource-type prefix of what each collector records, so that the
+# tagging API sweep can stand in for the collector ("sweep-only" services).
+SWEEP_RESOURCE_TYPES = {
+    'ec2': ('ec2', 'instance/'),
+    'rds': ('rds', 'db:'),
+    'dynamodb': ('dynamodb', 'table/'),
+    'sns': ('sns', ''),
+    'sqs': ('sqs', ''),
+    'lambda': ('lambda', 'function:'),
+    'cloudformation': ('cloudformation', 'stack/'),
+    'apigateway': ('apigateway', '/restapis/'),
+    'eks': ('eks', 'cluster/'),
+    'ecs': ('ecs', 'cluster/'),
+    'ecr': ('ecr', 'repository/'),
+}
+
+
+def collect_tagged_resources(service_name, region, account_id, clients=None):
+    """
+    Sweep the Resource Groups Tagging API of one region (100 resources per page) and
+    return {arn: tags} for every tagged resource. Same signature as
+    collect_resource_arns so both run on the same scheduler.
+    """
+    clients = clients or get_default_clients()
+    tags_by_arn = {}
+    if _breaker_skip(clients, account_id, service_name, service_name, region):
+        return tags_by_arn
+    try:
+        paginator = clients.get(service_name, region).get_paginator('get_resources')
+        for page in paginator.paginate(ResourcesPerPage=100):
+            for mapping in page.get('ResourceTagMappingList', []):
+                tags_by_arn[mapping['ResourceARN']] = {tag['Key']: tag['Value'] for tag in mapping.get('Tags', [])}
+    except Exception as e:
+        _handle_task_error(clients, account_id, service_name, service_name, region, 'tagged resources', e)
+    return tags_by_arn
+
+
+def records_from_tag_sweep(service_name, tags_by_arn, regions):
+    """Build collector-shaped records for a sweep-only service from the tagging API results."""
+    arn_service, resource_prefix = SWEEP_RESOURCE_TYPES[service_name]
+    records = []
+    for arn, tags in tags_by_arn.items():
+        parts = arn.split(':', 5)
+        if len(parts) < 6 or parts[2] != arn_service or parts[3] not in regions:
+            continue
+        if not parts[5].startswith(resource_prefix):
+            continue
+        records.append({
+            'arn': arn,
+            'name': extract_resource_identifier_from_arn(arn),
+            'subclass': arn_service,
+            'region': parts[3],
+            'creation_date': 'Unknown',  # The tagging API does not return creation dates
+            'tags': tags
+        })
+    return records
+
+
+def merge_batch(all_arns_data, batch):
+    """Merge one task's {key: [records]} batch into the service-keyed results."""
+    for key, records in batch.items():
+        all_arns_data.setdefault(key, []).extend(records)
+
+
+# Error codes that will not go away by retrying the task later (region not enabled,
+# missing permission, service not offered). Any other error marks the task as failed.
+PERMANENT_ERROR_CODES = {
+    'OptInRequired', 'AccessDenied', 'AccessDeniedException', 'UnauthorizedOperation',
+    'AuthorizationError', 'SubscriptionRequiredException', 'InvalidAction', 'UnsupportedOperation'
+}
+
+_CURRENT_TASK = contextvars.ContextVar('cmdb_current_task', default=None)
+
+
+class TaskStats:
+    """
+    Outcome and cost of one (collector, region) task, filled in by botocore event
+    hooks while it runs, including the calls it makes on the enrichment pool.
+    """
 
-    regions = get_all_regions()
-    if not regions:
-        print("No AWS regions found or could be fetched. Exiting.")
-        sys.exit(1)
-    print(f"Found {len(regions)} available AWS regions for scanning: {', '.join(regions)}")
+    def __init__(self, service_name, region):
+        self.service_name = service_name
+        self.region = region
+        self.errors = []  # (error_code, message)
+        self.skipped = None  # (open circuit, error_code) when a CircuitBreaker skipped the task
+        self.scope = None  # (account_id, service, collector, region) the CircuitBreaker checks before every call
+        self.wall_time = 0.0
+        self.api_calls = 0
+        self.pages = 0  # Calls of paginated operations
+        self.retries = 0
+        self.throttles = 0
+        self.bytes_received = 0
+        self.operations = Counter()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):  # Sent back from ProcessScanEngine workers
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def failed(self):
+        """True if the task may succeed when run again (a skipped task counts as its circuit's error)."""
+        codes = [code for code, _message in self.errors] + ([self.skipped[1]] if self.skipped else [])
+        return any(code not in PERMANENT_ERROR_CODES for code in codes)
+
+    def record_call(self, operation_name, paginated, retries, bytes_received):
+        with self._lock:
+            self.api_calls += 1
+            self.pages += paginated
+            self.retries += retries
+            self.bytes_received += bytes_received
+            self.operations[operation_name] += 1
+
+    def record_throttle(self):
+        with self._lock:
+            self.throttles += 1
+
+    def as_dict(self):
+        return {
+            'task': self.service_name, 'region': self.region, 'wall_time': round(self.wall_time, 3),
+            'api_calls': self.api_calls, 'pages': self.pages, 'retries': self.retries,
+            'throttles': self.throttles, 'bytes_received': self.bytes_received,
+            'operations': dict(self.operations.most_common()), 'errors': len(self.errors), 'failed': self.failed,
+            'skipped': {'circuit': self.skipped[0], 'error_code': self.skipped[1]} if self.skipped else None
+        }
+
+
+def track_task_stats(client, service_name, region):
+    """
+    ClientCache hook: charge every API call of this client to the task running it
+    (see _CURRENT_TASK): calls, pages, retries, throttles, bytes and failures.
+    """
+    paginated = {}
+
+    def is_paginated(operation_name):
+        if operation_name not in paginated:
+            paginated[operation_name] = client.can_paginate(xform_name(operation_name))
+        return paginated[operation_name]
+
+    def on_after_call(http_response=None, parsed=None, model=None, **kwargs):
+        stats = _CURRENT_TASK.get()
+        if stats is None or http_response is None:
+            return
+        operation_name = model.name if model is not None else 'Unknown'
+        stats.record_call(operation_name, is_paginated(operation_name),
+                          (parsed or {}).get('ResponseMetadata', {}).get('RetryAttempts', 0),
+                          len(http_response.content or b''))
+        if http_response.status_code >= 300:
+            error = (parsed or {}).get('Error', {})
+            stats.errors.append((error.get('Code', str(http_response.status_code)), error.get('Message', '')))
+
+    def on_after_call_error(exception=None, **kwargs):
+        stats = _CURRENT_TASK.get()
+        if stats is not None:
+            stats.errors.append((type(exception).__name__, str(exception)))
+
+    def on_needs_retry(response=None, **kwargs):
+        stats = _CURRENT_TASK.get()
+        if stats is not None and response is not None:
+            if response[1].get('Error', {}).get('Code') in THROTTLE_ERROR_CODES:
+                stats.record_throttle()
+
+    client.meta.events.register('after-call', on_after_call)
+    client.meta.events.register('after-call-error', on_after_call_error)
+    client.meta.events.register('needs-retry', on_needs_retry)
+
+
+def _tracked(task_fn, collected=None):
+    """
+    Wrap a task function so it returns (batch, TaskStats) with the stats bound to the
+    running task. The stats are also appended to collected, even if the task raises.
+    """
 
-    services_to_scan = [
-        's3', 'ec2', 'rds', 'dynamodb', 'sns', 'iam',
-        'apigateway', 'elbv2', 'elb', 'eks', 'ecs', 'ecr'
-    ]
+    def run(service_name, region, *args):
+        stats = TaskStats(service_name, region)
+        token = _CURRENT_TASK.set(stats)
+        start = time.perf_counter()
+        try:
+            return task_fn(service_name, region, *args), stats
+        finally:
+            stats.wall_time = time.perf_counter() - start
+            _CURRENT_TASK.reset(token)
+            if collected is not None:
+                collected.append(stats)
 
-# remover lambda, sqs, cloudformation, elasticache
+    run.task_fn = task_fn  # For ProcessScanEngine, which runs the bare function in its workers
+    run.collected = collected
+    return run
 
-# Originais
-# 's3', 'ec2', 'lambda', 'rds', 'dynamodb', 'sns', 'sqs', 'iam', 'cloudformation', 'apigateway', 'elbv2', 'elb', 'eks', 'ecs', 'ecr', 'elasticache'
 
-    print(f"Scanning {len(services_to_scan)} services: {', '.join(services_to_scan)}")
+def write_task_profile(task_stats, path, top=10):
+    """
+    Save the per-task cost report as JSON, most expensive (wall time) first, with
+    totals per task name and per region, and print the top entries.
+    """
+    tasks = sorted((stats.as_dict() for stats in task_stats), key=lambda entry: entry['wall_time'], reverse=True)
+    totals = {}
+    for scope in ('task', 'region'):
+        grouped = {}
+        for entry in tasks:
+            group = grouped.setdefault(entry[scope], {'tasks': 0, 'skipped': 0, 'wall_time': 0.0, 'api_calls': 0,
+                                                      'pages': 0, 'retries': 0, 'throttles': 0, 'bytes_received': 0})
+            group['tasks'] += 1
+            group['skipped'] += entry['skipped'] is not None
+            for key in ('wall_time', 'api_calls', 'pages', 'retries', 'throttles', 'bytes_received'):
+                group[key] += entry[key]
+            group['wall_time'] = round(group['wall_time'], 3)
+        totals[f"by_{scope}"] = dict(sorted(grouped.items(), key=lambda item: item[1]['wall_time'], reverse=True))
+    with open(path, 'w') as f:
+        json.dump({'tasks': tasks, **totals,
+                   'skipped': [{'task': entry['task'], 'region': entry['region'], **entry['skipped']}
+                               for entry in tasks if entry['skipped']]}, f, indent=2)
+
+    lines = [f"\nMost expensive tasks (full profile in {path}):"]
+    for entry in tasks[:top]:
+        lines.append(f"  {entry['task'] + '@' + entry['region']:45s} {entry['wall_time']:7.2f}s  {entry['api_calls']:5d} calls  "
+                     f"{entry['pages']:4d} pages  {entry['retries']:3d} retries  {entry['throttles']:3d} throttles  "
+                     f"{entry['bytes_received'] / 1024:8.1f} KiB")
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+class Checkpoint:
+    """
+    Append-only JSONL record of the finished tasks of one account, with their batches,
+    under CACHE_DIR/checkpoints. A resumed run replays the tasks recorded as done and
+    only submits the missing or failed ones. The file is removed after a clean run.
+    Only the file offset of every done task is kept in memory; restore() reads the
+    batches back from the file, so checkpointing does not hold the scan in memory.
+    """
 
-    all_arns_data = {}  # Renamed to avoid conflict with 'all_arns' if used as a variable name elsewhere
+    def __init__(self, account_id, resume=False):
+        self.path = os.path.join(CACHE_DIR, 'checkpoints', f"{account_id}.jsonl")
+        self.done = {}  # (service, region) -> offset of its 'done' line
+        self.failed = set()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if resume and os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # Truncated last line of an interrupted run
+                    key = (entry['service'], entry['region'])
+                    if entry['status'] == 'done':
+                        self.done[key] = offset
+                    else:
+                        self.done.pop(key, None)
+                    offset += len(line)
+            with open(self.path, 'ab') as f:
+                f.truncate(offset)  # Appended lines must not follow a truncated one
+        self._file = open(self.path, 'ab' if resume else 'wb')
+
+    def restore(self, tasks):
+        """
+        Yield (task, batch, clean) for every task of tasks recorded as done, reading the
+        batch from the file; clean is false when the task hit a (permanent) error or was
+        skipped by the circuit breaker.
+        """
+        with open(self.path, 'rb') as f:
+            for task in tasks:
+                offset = self.done.get((task[0], task[1]))
+                if offset is not None:
+                    f.seek(offset)
+                    entry = json.loads(f.readline())
+                    yield task, entry['batch'], not (entry.get('errors') or entry.get('skipped'))
+
+    def record(self, task, batch, stats):
+        key = (task[0], task[1])
+        status = 'failed' if stats.failed else 'done'
+        if stats.failed:
+            self.failed.add(key)
+        else:
+            self.failed.discard(key)
+            self.done[key] = self._file.tell()
+        self._file.write(json.dumps({
+            'service': task[0], 'region': task[1], 'status': status,
+            'errors': stats.errors, 'skipped': stats.skipped, 'batch': batch if status == 'done' else None
+        }, separators=(',', ':'), default=str).encode('utf-8') + b'\n')
+        self._file.flush()
+
+    def finish(self):
+        """Close the checkpoint; delete it when no task failed, so the next run starts fresh."""
+        self._file.close()
+        if not self.failed:
+            os.remove(self.path)
+
+
+class ScanCoverage:
+    """
+    The (collector, region) tasks of a scan that finished without any error or circuit
+    skip. scopes() turns them into the (service key, region) groups the scan saw in
+    full, the only ones in which a resource it did not see can be taken as deleted.
+    """
 
-    # Use a ThreadPoolExecutor for concurrent API calls
-    # Adjust max_workers based on your environment and API rate limits
-    # AWS SDKs often handle some level of concurrency and retries internally.
-    # Too many workers might lead to throttling.
-    max_workers = min(20, len(regions) * len(services_to_scan) // 2 + 1)  # Heuristic
-    print(f"Using up to {max_workers} worker threads for scanning.")
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_task = {}
-        for service_item in services_to_scan:
-            if service_item in ['iam', 's3']:  # Global services (S3 list_buckets is global)
-                # For S3, we list buckets globally (us-east-1) but then get individual bucket regions.
-                # For IAM, all operations are against the global endpoint.
-                task_region = 'us-east-1'
-                future = executor.submit(collect_resource_arns, service_item, task_region, all_arns_data)
-                future_to_task[future] = f"{service_item}@{task_region}"
-            else:  # Regional services
-                for region_item in regions:
-                    future = executor.submit(collect_resource_arns, service_item, region_item, all_arns_data)
-                    future_to_task[future] = f"{service_item}@{region_item}"
-
-        total_tasks = len(future_to_task)
-        completed_tasks = 0
-        print(f"Submitted {total_tasks} tasks to thread pool.")
-
-        for future in concurrent.futures.as_completed(future_to_task):
-            task_name = future_to_task[future]
-            completed_tasks += 1
+    def __init__(self):
+        self.clean = set()
+
+    def add(self, task):
+        self.clean.add((task[0], task[1]))
+
+    def scopes(self):
+        """
+        {(service_key, region)} of every group whose collectors all finished cleanly;
+        region is None for a global collector, whose records carry any region.
+        A denied collector, a circuit-skipped region, a service left to the tagging
+        sweep or not scanned at all, and a region not in the scan are all left out.
+        """
+        scopes = set()
+        for name, region in self.clean:
+            registered = COLLECTORS.get(name)
+            if registered is None:
+                continue  # Tagging API sweeps
+            for service_key in registered.keys:
+                writers = [other.name for other in COLLECTORS.values() if service_key in other.keys]
+                if all((writer, region) in self.clean for writer in writers):
+                    scopes.add((service_key, None if registered.global_service else region))
+        return scopes
+
+
+def _run_tasks(runner, tasks, task_fn, on_result, label='tasks', checkpoint=None, task_stats=None, coverage=None):
+    """
+    Run tasks on the scheduler/engine and hand every task's returned batch to
+    on_result(task, batch) on the calling thread, as soon as the task completes.
+    With a checkpoint, tasks already done are replayed from it instead of run, and
+    every finished task is recorded. The TaskStats of every task run are appended to
+    task_stats, and tasks that finished cleanly are added to coverage. Prints errors
+    and progress roughly every 10%.
+    """
+    if checkpoint:
+        restored = 0
+        for task, batch, clean in checkpoint.restore(tasks):
+            on_result(task, batch)
+            if clean and coverage is not None:
+                coverage.add(task)
+            restored += 1
+        if restored:
+            print(f"Restored {restored} {label} from checkpoint {checkpoint.path}.")
+        tasks = [task for task in tasks if (task[0], task[1]) not in checkpoint.done]
+
+    total_tasks = len(tasks)
+    completed_tasks = 0
+    failed_tasks = 0
+    skipped = Counter()
+    print(f"Submitting {total_tasks} {label}.")
+
+    for task, future in runner.run(tasks, _tracked(task_fn, task_stats)):
+        task_name = f"{task[0]}@{task[1]}"
+        completed_tasks += 1
+        try:
+            batch, stats = future.result()  # result() also raises any exception from the task
+            if checkpoint:
+                checkpoint.record(task, batch, stats)
+            failed_tasks += stats.failed
+            if stats.skipped:
+                skipped[stats.skipped] += 1
+            elif not stats.errors and coverage is not None:
+                coverage.add(task)
+            on_result(task, batch)
+        except Exception as exc:
+            print(f"Task {task_name} generated an exception: {exc}")
+            failed_tasks += 1
+            if checkpoint:
+                checkpoint.failed.add((task[0], task[1]))
+
+        if completed_tasks % (total_tasks // 10 if total_tasks > 10 else 1) == 0 or completed_tasks == total_tasks:  # Print progress roughly every 10% or on completion
+            print(f"Progress: {completed_tasks}/{total_tasks} {label} processed.")
+
+    for (circuit, error_code), count in sorted(skipped.items()):
+        print(f"Skipped {count} {label} of {circuit} (circuit opened by {error_code}).")
+    if failed_tasks:
+        print(f"{failed_tasks} {label} hit errors that may be transient"
+              + ("; rerun with --resume to retry only those." if checkpoint else "."))
+
+
+class NdjsonWriter:
+    """
+    Streams scan results to disk: every task batch is appended as one compact JSON
+    line per record ({"account", "region", "service", "record"}) and flushed at once,
+    so memory stays flat and a crashed run keeps everything written so far.
+    """
+
+    def __init__(self, path, account_id):
+        self.path = path
+        self.account_id = account_id
+        self.records = 0
+        self._file = open(path, 'a')
+
+    def write_batch(self, batch, account_id=None):
+        """Append one batch; account_id overrides the writer's account (merged multi-account streams)."""
+        lines = []
+        for service_key, records in batch.items():
+            for record in records:
+                lines.append(json.dumps({
+                    'account': account_id or self.account_id,
+                    'region': record.get('region', 'global_or_unknown'),
+                    'service': service_key,
+                    'record': record
+                }, separators=(',', ':'), default=str) + '\n')
+        self._file.write(''.join(lines))
+        self._file.flush()
+        self.records += len(lines)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_ndjson(path):
+    """Yield the entries of an NDJSON scan stream, skipping a truncated last line."""
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def index_ndjson(path):
+    """Return {(service, region): [byte offsets of its lines]} for an NDJSON scan stream."""
+    index = {}
+    offset = 0
+    with open(path, 'rb') as f:
+        for line in f:
             try:
-                future.result()  # We call result to raise any exceptions from the thread
-                # print(f"Task {task_name} completed successfully. ({completed_tasks}/{total_tasks})")
-            except Exception as exc:
-                print(f"Task {task_name} generated an exception: {exc}")
-            
-            if completed_tasks % (total_tasks // 10 if total_tasks > 10 else 1) == 0 or completed_tasks == total_tasks : # Print progress roughly every 10% or on completion
-                 print(f"Progress: {completed_tasks}/{total_tasks} tasks processed.")
-
-    total_resources_found = sum(len(resources_list) for resources_list in all_arns_data.values())
-    print(f"\nScan complete. Found {total_resources_found} resources across {len(all_arns_data)} service/item categories.")
-
-    # Group resources by region for better display and JSON output
-    resources_by_region_output = {}
-    for service_key, resources_list_data in all_arns_data.items():
-        for resource_item_data in resources_list_data:
-            region_val = resource_item_data.get('region', 'global_or_unknown') # Ensure region key exists
-            # Initialize region if not present
-            resources_by_region_output.setdefault(region_val, {})
-            # Initialize service_key under region if not present
-            resources_by_region_output[region_val].setdefault(service_key, []).append(resource_item_data)
-
-
-    print("\n--- AWS Resource Summary (Console Output) ---")
-    for region_key_print in sorted(resources_by_region_output.keys()):
-        region_resources_data = resources_by_region_output[region_key_print]
-        region_total_count = sum(len(svc_resources) for svc_resources in region_resources_data.values())
-        print(f"\nREGION: {region_key_print} ({region_total_count} resources)")
-        print("-" * 40)
-        for service_print_key, resources_print_list in sorted(region_resources_data.items()):
-            print(f"  Service/Item: {service_print_key.upper()} ({len(resources_print_list)} found)")
-            for resource in sorted(resources_print_list, key=lambda x: x.get('arn', '')):
-                print(f"    ARN: {resource.get('arn', 'N/A')}")
-                print(f"    Name (from ARN): {resource.get('name', 'N/A')}")
-                print(f"    Subclass (Service in ARN): {resource.get('subclass', 'N/A')}")
+                entry = json.loads(line)
+                index.setdefault((entry['service'], entry['region']), []).append(offset)
+            except (ValueError, KeyError):
+                pass
+            offset += len(line)
+    return index
+
+
+def write_ndjson_projection(ndjson_path, index, out_path, by='service'):
+    """
+    Write the by-service ({service: [records]}) or by-region ({region: {service: [records]}})
+    JSON view of an NDJSON stream, reading one record at a time through its offset index.
+    The layout matches json.dump(..., indent=2) of the in-memory views.
+    """
+    groups = {}
+    for (service_key, region_key), offsets in index.items():
+        outer, inner = (service_key, None) if by == 'service' else (region_key, service_key)
+        groups.setdefault(outer, {}).setdefault(inner, []).extend(offsets)
+
+    depth = 2 if by == 'service' else 3
+    with open(ndjson_path, 'rb') as src, open(out_path, 'w') as dst:
+        dst.write('{' if groups else '{}')
+        for outer_position, outer in enumerate(sorted(groups)):
+            dst.write(',' if outer_position else '')
+            dst.write(f'\n  {json.dumps(outer)}: ' + ('[' if by == 'service' else '{'))
+            for inner_position, inner in enumerate(sorted(groups[outer])):
+                if by == 'region':
+                    dst.write(',' if inner_position else '')
+                    dst.write(f'\n    {json.dumps(inner)}: [')
+                for record_position, offset in enumerate(sorted(groups[outer][inner])):
+                    src.seek(offset)
+                    record = json.loads(src.readline())['record']
+                    dst.write(',' if record_position else '')
+                    dst.write('\n' + textwrap.indent(json.dumps(record, indent=2, default=str), '  ' * depth))
+                dst.write('\n' + '  ' * (depth - 1) + ']')
+            if by == 'region':
+                dst.write('\n  }')
+        dst.write('\n}' if groups else '')
+
+
+class ResourceStore:
+    """
+    Single copy of the scanned records with secondary indexes by service key, region,
+    account and ARN. The by-service and by-region output views and the console
+    report are all served from the same record objects; nothing is copied.
+    """
+
+    def __init__(self):
+        self.records = []  # (account_id, service_key, record)
+        self._by_service = {}
+        self._by_region = {}
+        self._by_account = {}
+        self._by_arn = {}
+        self._by_region_service = {}
+        self._sorted_groups = set()  # (region, service) groups already ordered by ARN
+
+    def __len__(self):
+        return len(self.records)
+
+    def add_batch(self, account_id, batch):
+        """Index one task batch ({service_key: [records]}) for account_id."""
+        for service_key, records in batch.items():
+            for record in records:
+                position = len(self.records)
+                region_key = record.get('region', 'global_or_unknown')
+                self.records.append((account_id, service_key, record))
+                self._by_service.setdefault(service_key, []).append(position)
+                self._by_region.setdefault(region_key, []).append(position)
+                self._by_account.setdefault(account_id, []).append(position)
+                self._by_arn.setdefault(record.get('arn'), []).append(position)
+                self._by_region_service.setdefault((region_key, service_key), []).append(position)
+                self._sorted_groups.discard((region_key, service_key))
+
+    def services(self):
+        return list(self._by_service)
+
+    def regions(self):
+        return list(self._by_region)
+
+    def accounts(self):
+        return list(self._by_account)
+
+    def get(self, arn):
+        """Return the records carrying this ARN (one per account/service key it was found under)."""
+        return [self.records[position][2] for position in self._by_arn.get(arn, [])]
+
+    def select(self, service=None, region=None, account=None):
+        """Return the records matching every given criterion, using the smallest index first."""
+        candidates = [index.get(value, []) for index, value in
+                      ((self._by_service, service), (self._by_region, region), (self._by_account, account))
+                      if value is not None]
+        if not candidates:
+            return [record for _account, _service, record in self.records]
+        candidates.sort(key=len)
+        matches = set(candidates[0]).intersection(*candidates[1:]) if len(candidates) > 1 else candidates[0]
+        return [self.records[position][2] for position in sorted(matches)]
+
+    def region_services(self, region):
+        """Return {service_key: count} for one region."""
+        return {service_key: len(positions) for (region_key, service_key), positions in self._by_region_service.items()
+                if region_key == region}
+
+    def region_counts(self):
+        """{region: {service_key: count}} for the whole store."""
+        counts = {}
+        for (region_key, service_key), positions in self._by_region_service.items():
+            counts.setdefault(region_key, {})[service_key] = len(positions)
+        return counts
+
+    def sorted_group(self, region, service):
+        """Records of one (region, service) group ordered by ARN; sorted once, then reused."""
+        positions = self._by_region_service.get((region, service), [])
+        if (region, service) not in self._sorted_groups:
+            positions.sort(key=lambda position: self.records[position][2].get('arn', ''))
+            self._sorted_groups.add((region, service))
+        return [self.records[position][2] for position in positions]
+
+    def _account_filter(self, account):
+        return None if account is None else set(self._by_account.get(account, []))
+
+    def by_service_view(self, account=None):
+        """{service_key: [records]}, the layout of aws_resources_all_services_*.json."""
+        in_account = self._account_filter(account)
+        view = {}
+        for service_key, positions in self._by_service.items():
+            records = [self.records[position][2] for position in positions if in_account is None or position in in_account]
+            if records:
+                view[service_key] = records
+        return view
+
+    def by_region_view(self, account=None):
+        """{region: {service_key: [records]}}, the layout of aws_resources_by_region_*.json."""
+        in_account = self._account_filter(account)
+        view = {}
+        for (region_key, service_key), positions in self._by_region_service.items():
+            records = [self.records[position][2] for position in positions if in_account is None or position in in_account]
+            if records:
+                view.setdefault(region_key, {})[service_key] = records
+        return view
+
+
+REPORT_LEVELS = ['summary', 'region', 'full']
+
+
+def render_counts(region_counts, level):
+    """
+    Console report of {region: {service_key: count}} as one string: 'summary' gives
+    totals per service key, 'region' (and 'full') per region and service key.
+    """
+    lines = ["", "--- AWS Resource Summary (Console Output) ---"]
+    if level == 'summary':
+        service_totals = {}
+        for service_counts in region_counts.values():
+            for service_key, count in service_counts.items():
+                service_totals[service_key] = service_totals.get(service_key, 0) + count
+        for service_key, count in sorted(service_totals.items()):
+            lines.append(f"  Service/Item: {service_key.upper()} ({count} found)")
+        lines.append(f"  {sum(service_totals.values())} resources in {len(region_counts)} regions")
+    else:
+        for region_key in sorted(region_counts):
+            lines.append(f"\nREGION: {region_key} ({sum(region_counts[region_key].values())} resources)")
+            for service_key, count in sorted(region_counts[region_key].items()):
+                lines.append(f"  Service/Item: {service_key.upper()} ({count} found)")
+    return "\n".join(lines) + "\n"
+
+
+def render_resource_details(store, account_id):
+    """Full per-resource listing (the report the scanner used to print line by line) as one string."""
+    lines = ["", "--- AWS Resource Summary (Console Output) ---"]
+    append = lines.append
+    for region_key_print in sorted(store.regions()):
+        region_service_counts = store.region_services(region_key_print)
+        append(f"\nREGION: {region_key_print} ({sum(region_service_counts.values())} resources)")
+        append("-" * 40)
+        for service_print_key, service_count in sorted(region_service_counts.items()):
+            append(f"  Service/Item: {service_print_key.upper()} ({service_count} found)")
+            for resource in store.sorted_group(region_key_print, service_print_key):
+                append(f"    ARN: {resource.get('arn', 'N/A')}")
+                append(f"    Name (from ARN): {resource.get('name', 'N/A')}")
+                append(f"    Subclass (Service in ARN): {resource.get('subclass', 'N/A')}")
                 if 'item_type' in resource:  # For IAM, ElastiCache etc.
-                    print(f"    Item Type: {resource.get('item_type')}")
-                print(f"    Created: {resource.get('creation_date', 'N/A')}")
+                    append(f"    Item Type: {resource.get('item_type')}")
+                append(f"    Created: {resource.get('creation_date', 'N/A')}")
 
-                # Specific fields based on service_print_key (which is the key in all_arns_data)
+                # Specific fields based on service_print_key (the service key in the store)
                 if service_print_key == 'ec2':
-                    print(f"    Private IP: {resource.get('private_ip', 'N/A')}, Public IP: {resource.get('public_ip', 'N/A')}")
+                    append(f"    Private IP: {resource.get('private_ip', 'N/A')}, Public IP: {resource.get('public_ip', 'N/A')}")
                 elif service_print_key == 's3':
-                    print(f"    Endpoint: {resource.get('endpoint', 'N/A')}")
-                    print(f"    Account: {account_id}")
-                # elif service_print_key == 'vpc':
-                #     print(f"    CIDR: {resource.get('cidr', 'N/A')}")
+                    append(f"    Endpoint: {resource.get('endpoint', 'N/A')}")
+                    append(f"    Account: {account_id}")
                 elif service_print_key in ['alb', 'nlb', 'classic_elb']:
-                    print(f"    Endpoint: {resource.get('endpoint', 'N/A')}, Scheme: {resource.get('scheme', 'N/A')}")
+                    append(f"    Endpoint: {resource.get('endpoint', 'N/A')}, Scheme: {resource.get('scheme', 'N/A')}")
                 elif service_print_key == 'eks':
-                    print(f"    Cluster Name: {resource.get('cluster_name', 'N/A')}, Version: {resource.get('version', 'N/A')}, Endpoint: {resource.get('endpoint', 'N/A')}")
+                    append(f"    Cluster Name: {resource.get('cluster_name', 'N/A')}, Version: {resource.get('version', 'N/A')}, Endpoint: {resource.get('endpoint', 'N/A')}")
                 elif service_print_key == 'ecs':
-                    print(f"    Cluster Name: {resource.get('cluster_name', 'N/A')}, Status: {resource.get('status', 'N/A')}")
+                    append(f"    Cluster Name: {resource.get('cluster_name', 'N/A')}, Status: {resource.get('status', 'N/A')}, Services: {resource.get('service_count', 'N/A')}")
+                elif service_print_key == 'ecs_service':
+                    append(f"    Cluster Name: {resource.get('cluster_name', 'N/A')}, Status: {resource.get('status', 'N/A')}, Task Definition: {resource.get('task_definition', 'N/A')}")
                 elif service_print_key == 'ecr':
-                    print(f"    Repo Name: {resource.get('repo_name', 'N/A')}, URI: {resource.get('uri', 'N/A')}")
+                    append(f"    Repo Name: {resource.get('repo_name', 'N/A')}, URI: {resource.get('uri', 'N/A')}")
+                    append(f"    Images: {resource.get('image_count', 'N/A')}, Size: {resource.get('total_size_bytes', 'N/A')} bytes, "
+                           f"Latest Digest: {resource.get('latest_digest', 'N/A')}")
                 elif service_print_key in ['elasticache_cluster', 'elasticache_replication_group']:
-                    print(f"    ID: {resource.get('id', 'N/A')}, Engine: {resource.get('engine', 'N/A') if 'engine' in resource else 'N/A (RG)'}, Status: {resource.get('status', 'N/A')}, Endpoint: {resource.get('endpoint', 'N/A')}")
-                print("    " + "." * 38) # Separator
-            print()  # Extra line after each service's resources
+                    append(f"    ID: {resource.get('id', 'N/A')}, Engine: {resource.get('engine', 'N/A') if 'engine' in resource else 'N/A (RG)'}, Status: {resource.get('status', 'N/A')}, Endpoint: {resource.get('endpoint', 'N/A')}")
+                append("    " + "." * 38)  # Separator
+            append("")  # Extra line after each service's resources
+    return "\n".join(lines) + "\n"
 
-    # Save results to JSON files
-    current_timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+def write_report(region_counts, level, account_id, current_timestamp, detail=None, write_file=True):
+    """
+    Write the console report in a single write. detail() returns the full listing:
+    it goes to the console at level 'full', otherwise (unless write_file is false) to
+    aws_resources_report_<account>_<timestamp>.txt while the console shows counts.
+    """
+    if level == 'full' and detail is not None:
+        sys.stdout.write(detail())
+        return None
+    report = render_counts(region_counts, level)
+    filename_report = None
+    if detail is not None and write_file:
+        filename_report = f"aws_resources_report_{account_id}_{current_timestamp}.txt"
+        with open(filename_report, 'w') as f:
+            f.write(detail())
+        report += f"\nPer-resource detail saved to {filename_report}\n"
+    sys.stdout.write(report)
+    sys.stdout.flush()
+    return filename_report
+
+
+def scan_resources(account_id, regions, clients=None, services=None, engine='threads',
+                   collection_mode='describe', sweep_only=(), sink=None, max_workers=64, checkpoint=None,
+                   task_stats=None, processes=None, coverage=None):
+    """
+    Run every (service, region) collector for one account and return the
+    service-keyed resource dict written to aws_resources_all_services_*.json.
+    engine is 'threads' (AdaptiveScheduler) or 'processes'
+    (ProcessScanEngine with `processes` workers sharing max_workers threads).
+    With collection_mode 'tagging', one Resource Groups Tagging API sweep per region
+    runs first: every record gets its tags, and the services in sweep_only are built
+    from the sweep alone instead of their collectors (untagged resources of those
+    services are then not recorded).
+    If sink is given, sink(batch) receives every task batch as it completes and the
+    returned dict stays empty; by default batches are merged into the returned dict.
+    With a Checkpoint, finished tasks are recorded and tasks already done are replayed.
+    The TaskStats (wall time, API calls, retries...) of every task run are appended
+    to task_stats; see write_task_profile. After a hard failure (see classify_error)
+    the remaining tasks of its region or service/region are skipped, and recorded as
+    such in their TaskStats. The collector tasks that finish cleanly are added to
+    coverage (a ScanCoverage), if given.
+    """
+    clients = clients or get_default_clients()
+    clients.breaker = CircuitBreaker()  # Circuits opened by an earlier scan with these clients start closed again
+    services_to_scan = services or SERVICES_TO_SCAN
+    all_arns_data = {}  # Renamed to avoid conflict with 'all_arns' if used as a variable name elsewhere
+    tags_by_arn = None
+
+    def emit(task, batch):
+        if tags_by_arn is not None:
+            for resources_list in batch.values():
+                for resource in resources_list:
+                    resource.setdefault('tags', tags_by_arn.get(resource.get('arn'), {}))
+        if sink:
+            sink(batch)
+        else:
+            merge_batch(all_arns_data, batch)
+
+    clients.add_hook(track_task_stats)
+
+    # There is deliberately no asyncio engine: botocore's HTTP stack blocks, and paging
+    # asynchronously would mean re-implementing its serializer, signer and parser over
+    # an async HTTP client this repo does not depend on. Threads already overlap the
+    # network waits; 'processes' is the option for CPU-bound response parsing.
+    scheduler = None
+    if engine == 'processes':
+        runner = ProcessScanEngine(processes, session_config=ProcessScanEngine.session_config(clients.session))
+        runner.threads_per_process = max(4, max_workers // runner.processes)
+        print(f"Using {runner.processes} worker processes, sharded by region, "
+              f"with up to {runner.threads_per_process} threads each.")
+    else:
+        # Concurrency is adapted per service and per region: limits grow while calls
+        # succeed and are halved when AWS throttles, on top of botocore adaptive retries.
+        runner = scheduler = AdaptiveScheduler(max_workers=max_workers)
+        clients.add_hook(scheduler.attach)
+        print(f"Using adaptive scheduler with up to {scheduler.max_workers} worker threads "
+              f"(per-service limit {scheduler.service_limit[0]}-{scheduler.service_limit[1]}, "
+              f"per-region limit {scheduler.region_limit[0]}-{scheduler.region_limit[1]}).")
+
+    try:
+        if collection_mode == 'tagging':
+            tags_by_arn = {}
+            sweep_tasks = [('resourcegroupstaggingapi', region_item, account_id, clients) for region_item in regions]
+            _run_tasks(runner, sweep_tasks, collect_tagged_resources,
+                       lambda task, batch: tags_by_arn.update(batch), label='tagging API sweeps', checkpoint=checkpoint,
+                       task_stats=task_stats)
+            print(f"Tagging API sweep found {len(tags_by_arn)} tagged resources.")
+            for service_item in sweep_only:
+                swept_records = records_from_tag_sweep(service_item, tags_by_arn, regions)
+                if swept_records:
+                    emit(None, {service_item: swept_records})
+            services_to_scan = [service_item for service_item in services_to_scan if service_item not in sweep_only]
+
+        tasks = [(service_item, region_item, account_id, clients)
+                 for service_item, region_item in build_task_list(services_to_scan, regions)]
+        # Workers only fill their own batches; merging/streaming happens here on the main thread
+        _run_tasks(runner, tasks, collect_resource_arns, emit, checkpoint=checkpoint, task_stats=task_stats,
+                   coverage=coverage)
+    finally:
+        if engine == 'processes':
+            runner.shutdown()
+
+    if scheduler:
+        throttled = {key: value for key, value in scheduler.summary().items() if value[1]}
+        for (scope, name), (final_limit, throttles) in throttled.items():
+            print(f"Throttled {throttles} time(s) on {scope} {name}; concurrency limit ended at {final_limit}.")
+
+    return all_arns_data
+
+
+def write_json_outputs(store, account_id, current_timestamp):
+    """Save one account's by-service and by-region views; returns the two file names."""
     filename_all_services = f"aws_resources_all_services_{account_id}_{current_timestamp}.json"
     with open(filename_all_services, 'w') as f:
-        json.dump(all_arns_data, f, indent=2, default=str)  # Use all_arns_data which is service-keyed
+        json.dump(store.by_service_view(account_id), f, indent=2, default=str)  # Service-keyed view of the store
 
     filename_by_region = f"aws_resources_by_region_{account_id}_{current_timestamp}.json"
     with open(filename_by_region, 'w') as f:
-        json.dump(resources_by_region_output, f, indent=2, default=str)  # Use resources_by_region_output
+        json.dump(store.by_region_view(account_id), f, indent=2, default=str)  # Region-keyed view of the same records
+    return filename_all_services, filename_by_region
+
+
+def write_streamed_outputs(args, account_id, regions, clients, services_to_scan, current_timestamp, checkpoint=None,
+                           task_stats=None):
+    """NDJSON output mode: stream records while scanning, then project the JSON views from the stream."""
+    filename_stream = f"aws_resources_{account_id}_{current_timestamp}.ndjson"
+    print(f"Streaming records to {filename_stream}")
+    with NdjsonWriter(filename_stream, account_id) as writer:
+        scan_resources(account_id, regions, clients, services_to_scan, engine=args.engine, processes=args.processes,
+                       collection_mode=args.collection_mode, sweep_only=args.sweep_only, sink=writer.write_batch,
+                       checkpoint=checkpoint, task_stats=task_stats)
+
+    index = index_ndjson(filename_stream)
+    print(f"\nScan complete. Found {writer.records} resources across "
+          f"{len({service_key for service_key, _region in index})} service/item categories.")
+
+    region_counts = {}
+    for (service_key, region_key), offsets in index.items():
+        region_counts.setdefault(region_key, {})[service_key] = len(offsets)
+    # The records are on disk, not in memory: the console gets counts only, even at level 'full'
+    sys.stdout.write(render_counts(region_counts, args.report))
+
+    filename_all_services = f"aws_resources_all_services_{account_id}_{current_timestamp}.json"
+    write_ndjson_projection(filename_stream, index, filename_all_services, by='service')
+    filename_by_region = f"aws_resources_by_region_{account_id}_{current_timestamp}.json"
+    write_ndjson_projection(filename_stream, index, filename_by_region, by='region')
+
+    print("\nResults saved to:")
+    print(f"- {filename_stream} (one record per line, streamed during the scan)")
+    print(f"- {filename_all_services} (organized by service first)")
+    print(f"- {filename_by_region} (organized by region first)")
+    print("\nScript finished.")
+
+
+def write_sqlite_output(args, account_id, regions, clients, services_to_scan, checkpoint=None, task_stats=None):
+    """SQLite output mode: upsert every batch into the CMDB database as it arrives."""
+    scan_started = cmdb_db.utc_now()
+    coverage = ScanCoverage()
+    with cmdb_db.CmdbDatabase(args.db) as db:
+        print(f"Upserting records into {args.db}")
+        scan_resources(account_id, regions, clients, services_to_scan, engine=args.engine, processes=args.processes,
+                       collection_mode=args.collection_mode, sweep_only=args.sweep_only,
+                       sink=lambda batch: db.upsert_batch(account_id, batch, scan_started), checkpoint=checkpoint,
+                       task_stats=task_stats, coverage=coverage)
+        # Resources of a failed, denied or skipped task were not seen, but they were not deleted either
+        db.mark_missing(account_id, scan_started, scopes=coverage.scopes())
+        stats = db.stats
+    print(f"\nScan complete. New: {stats['created']}, changed: {stats['updated']}, reappeared: {stats['restored']}, "
+          f"unchanged: {stats['unchanged']}, gone: {stats['deleted']}.")
+    print(f"\nResults saved to {args.db} (query it with ./cmdb_db.py --db {args.db})")
+    print("\nScript finished.")
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--engine', choices=['threads', 'processes'], default='threads',
+                        help="'threads' runs tasks on the adaptive thread scheduler (default), 'processes' shards "
+                             "them by region over worker processes to parse responses on several cores")
+    parser.add_argument('--processes', type=int, default=None,
+                        help='worker processes of --engine processes (default: one per CPU)')
+    parser.add_argument('--refresh-regions', action='store_true',
+                        help=f"ignore the region cache in {CACHE_DIR} and call describe_regions")
+    parser.add_argument('--region-cache-ttl', type=int, default=REGION_CACHE_TTL,
+                        help='seconds a cached region list stays valid (default: %(default)s)')
+    parser.add_argument('--collection-mode', choices=['describe', 'tagging'], default='describe',
+                        help="'tagging' sweeps the Resource Groups Tagging API of each region first "
+                             "and records the tags of every resource")
+    parser.add_argument('--sweep-only', default='',
+                        help="comma-separated services built from the tagging sweep alone, skipping their "
+                             f"collectors; untagged resources are missed (choices: {', '.join(sorted(SWEEP_RESOURCE_TYPES))})")
+    parser.add_argument('--output-format', choices=['json', 'ndjson', 'sqlite', 'compact'], default='json',
+                        help="'ndjson' streams one record per line to aws_resources_<account>_<timestamp>.ndjson "
+                             "while the scan runs and derives the two JSON views from it; 'sqlite' upserts "
+                             "the records into the --db CMDB instead of writing timestamped files; 'compact' "
+                             "writes one columnar aws_resources_<account>_<timestamp>.cmdb (see cmdb_snapshot.py)")
+    parser.add_argument('--report', choices=REPORT_LEVELS, default='region',
+                        help="console report: 'summary' (counts per service), 'region' (counts per region and "
+                             "service, default) or 'full' (every resource, the old behaviour)")
+    parser.add_argument('--no-report-file', action='store_true',
+                        help="do not save the per-resource detail to aws_resources_report_<account>_<timestamp>.txt")
+    parser.add_argument('--db', default=cmdb_db.DEFAULT_DB_PATH,
+                        help='SQLite CMDB used by --output-format sqlite (default: %(default)s)')
+    parser.add_argument('--resume', action='store_true',
+                        help=f"reuse the tasks finished by an interrupted run (checkpoints in {CACHE_DIR}/checkpoints) "
+                             "and only run the missing or failed ones")
+    cassette_group = parser.add_mutually_exclusive_group()
+    cassette_group.add_argument('--record-cassette', metavar='FILE',
+                                help='save every API call and response of the scan, sanitized and gzipped, to FILE '
+                                     '(see cmdb_cassette.py)')
+    cassette_group.add_argument('--replay-cassette', metavar='FILE',
+                                help='answer every API call from a recorded cassette instead of AWS')
+    parser.add_argument('--replay-latency-scale', type=float, default=1.0,
+                        help='with --replay-cassette, wait the recorded latency times this factor before each '
+                             'response (default: %(default)s; 0 replays as fast as possible)')
+    args = parser.parse_args(argv)
+    if args.engine == 'processes' and (args.record_cassette or args.replay_cassette):
+        parser.error("cassettes are recorded and replayed in-process; use --engine threads")
+    args.sweep_only = [service_item for service_item in args.sweep_only.split(',') if service_item]
+    unknown = set(args.sweep_only) - set(SWEEP_RESOURCE_TYPES)
+    if unknown:
+        parser.error(f"--sweep-only does not support: {', '.join(sorted(unknown))}")
+    if args.sweep_only and args.collection_mode != 'tagging':
+        parser.error("--sweep-only requires --collection-mode tagging")
+    return args
+
+
+def attach_cassette(args, clients):
+    """Hook the --record-cassette recorder or --replay-cassette player on every client; returns it, or None."""
+    if args.record_cassette:
+        cassette = cmdb_cassette.CassetteRecorder(args.record_cassette)
+        print(f"Recording API calls to {args.record_cassette}")
+    elif args.replay_cassette:
+        cassette = cmdb_cassette.CassettePlayer(args.replay_cassette, args.replay_latency_scale)
+        print(f"Replaying API calls from {args.replay_cassette} (latency x{args.replay_latency_scale:g})")
+    else:
+        return None
+    clients.add_hook(cassette.attach)
+    return cassette
+
+
+def main(argv=None):
+    """ Main function """
+    args = parse_args(argv)
+    print("Starting AWS resource ARN scanner across all regions...")
+    print("Using credentials from environment variables or default profile.")
+
+    cassette = None
+    try:
+        clients = get_default_clients()
+        cassette = attach_cassette(args, clients)
+        account_id, caller_arn = get_account_id(clients)
+        print(f"Connected to AWS Account: {account_id} using identity: {caller_arn}")
+    except Exception as e:
+        print(f"Error authenticating with AWS: {e}")
+        print("Ensure your AWS credentials (e.g., environment variables, shared credentials file, or IAM role) are configured correctly.")
+        if cassette is not None:
+            cassette.close()
+        sys.exit(1)
+
+    try:
+        scan_and_write(args, clients, account_id)
+    finally:
+        if cassette is not None:
+            cassette.close()
+            print(cassette.summary())
+
+
+def scan_and_write(args, clients, account_id):
+    """Scan every region of the account and write the outputs of args.output_format."""
+    regions = get_all_regions(clients, account_id, ttl=args.region_cache_ttl, refresh=args.refresh_regions)
+    if not regions:
+        print("No AWS regions found or could be fetched. Exiting.")
+        sys.exit(1)
+    print(f"Found {len(regions)} available AWS regions for scanning: {', '.join(regions)}")
+
+    services_to_scan = SERVICES_TO_SCAN
+
+    print(f"Scanning {len(services_to_scan)} services: {', '.join(services_to_scan)}")
+
+    current_timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    checkpoint = Checkpoint(account_id, resume=args.resume)
+    task_stats = []
+    filename_profile = f"aws_resources_task_profile_{account_id}_{current_timestamp}.json"
+    if args.output_format == 'ndjson':
+        write_streamed_outputs(args, account_id, regions, clients, services_to_scan, current_timestamp, checkpoint,
+                               task_stats)
+        checkpoint.finish()
+        write_task_profile(task_stats, filename_profile)
+        return
+    if args.output_format == 'sqlite':
+        write_sqlite_output(args, account_id, regions, clients, services_to_scan, checkpoint, task_stats)
+        checkpoint.finish()
+        write_task_profile(task_stats, filename_profile)
+        return
+
+    store = ResourceStore()
+    scan_resources(account_id, regions, clients, services_to_scan, engine=args.engine, processes=args.processes,
+                   collection_mode=args.collection_mode, sweep_only=args.sweep_only,
+                   sink=lambda batch: store.add_batch(account_id, batch), checkpoint=checkpoint,
+                   task_stats=task_stats)
+
+    print(f"\nScan complete. Found {len(store)} resources across {len(store.services())} service/item categories.")
+
+    write_report(store.region_counts(), args.report, account_id, current_timestamp,
+                 detail=lambda: render_resource_details(store, account_id), write_file=not args.no_report_file)
+
+    if args.output_format == 'compact':
+        filename_snapshot = f"aws_resources_{account_id}_{current_timestamp}.cmdb"
+        cmdb_snapshot.write_snapshot(filename_snapshot, store.records)
+        checkpoint.finish()
+        print(f"\nResults saved to {filename_snapshot} (read it with ./cmdb_snapshot.py show)")
+        write_task_profile(task_stats, filename_profile)
+        print("\nScript finished.")
+        return
+
+    filename_all_services, filename_by_region = write_json_outputs(store, account_id, current_timestamp)
+    checkpoint.finish()
 
     print("\nResults saved to:")
     print(f"- {filename_all_services} (organized by service first)")
     print(f"- {filename_by_region} (organized by region first)")
+    write_task_profile(task_stats, filename_profile)
     print("\nScript finished.")
 
 
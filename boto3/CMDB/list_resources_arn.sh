@@ -27,22 +27,7 @@
 
 export AWS_REGION=us-east-1
 
-for i in Audit-347198027193 \
-         Automation-creation-linked-891377085911 \
-         Log-archive-392101129325 \
-         MSP-Embratel-786154173690 \
-         MSP-Backup-242816904968 \
-         MSP-DirectConnect-875199729706 \
-         MSP-ESD-Communication-Customer-381785467984 \
-         MSP-Management-601156111743 \
-         MSP-Management-02-348920800148 \
-         MSP-Management-03-809830003573 \
-         EBT-Gestao-322963330866 \
-         EBT-Gov-281949160503 \
-         Resold-CSP-882591113908 \
-         Resold-NO-CSP-605212350047
-do
-    echo "=== Execução do script para conta: ${i} ==="
-    AWS_PROFILE=${i} ./list_resources_arn.py
-    sleep 120
-done
+# As contas são varridas em paralelo, sob um orçamento global de chamadas de API,
+# em vez de uma por vez com "sleep 120" entre elas. A lista de profiles fica em
+# DEFAULT_PROFILES no list_resources_arn_multi.py (ver --help para as opções).
+exec ./list_resources_arn_multi.py "$@"
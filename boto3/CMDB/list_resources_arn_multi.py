@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+
+"""
+Scan several AWS accounts concurrently with list_resources_arn.py.
+Each profile gets its own session and client cache; all accounts share one global
+API budget (calls per second) so the organization scan does not trip throttling.
+Writes the usual per-account JSON files plus one merged NDJSON dataset, or, with
+--db, upserts every account into the SQLite CMDB of cmdb_db.py instead.
+
+Usage:
+    ./list_resources_arn_multi.py                       # the profiles in DEFAULT_PROFILES
+    ./list_resources_arn_multi.py --profiles Audit-347198027193,Log-archive-392101129325
+    ./list_resources_arn_multi.py --api-rate 30 --max-accounts 4
+    ./list_resources_arn_multi.py --db cmdb.sqlite3
+"""
+
+from datetime import datetime
+import argparse
+import concurrent.futures
+import threading
+import time
+import sys
+
+import boto3
+
+import cmdb_db
+import list_resources_arn as scanner
+
+
+# Não gerenciamos recursos nas contas:
+# * dns-aws 648500770435
+# * AWS-Backup-PMC 845241617835
+# * MSP-Security-Monitor 956947876752
+DEFAULT_PROFILES = [
+    'Audit-347198027193',
+    'Automation-creation-linked-891377085911',
+    'Log-archive-392101129325',
+    'MSP-Embratel-786154173690',
+    'MSP-Backup-242816904968',
+    'MSP-DirectConnect-875199729706',
+    'MSP-ESD-Communication-Customer-381785467984',
+    'MSP-Management-601156111743',
+    'MSP-Management-02-348920800148',
+    'MSP-Management-03-809830003573',
+    'EBT-Gestao-322963330866',
+    'EBT-Gov-281949160503',
+    'Resold-CSP-882591113908',
+    'Resold-NO-CSP-605212350047',
+]
+
+
+class ApiBudget:
+    """
+    Token bucket shared by every client of every account: each API call (including
+    botocore retries) takes one token; tokens refill at `rate` per second up to `burst`.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def attach(self, client, service_name, region):
+        """ClientCache hook: every request of this client waits for a token."""
+        client.meta.events.register('before-send', lambda **kwargs: self.acquire())
+
+
+def scan_profile(profile, args, budget, store, store_lock, current_timestamp, db=None):
+    """Scan one account; returns (account_id, resource count, seconds)."""
+    start = time.perf_counter()
+    clients = scanner.ClientCache(boto3.Session(profile_name=profile))
+    clients.add_hook(budget.attach)
+    account_id, caller_arn = scanner.get_account_id(clients)
+    print(f"[{profile}] Connected to AWS Account: {account_id} using identity: {caller_arn}")
+
+    regions = scanner.get_all_regions(clients, account_id, ttl=args.region_cache_ttl, refresh=args.refresh_regions)
+    print(f"[{profile}] Scanning {len(regions)} regions.")
+
+    scan_started = cmdb_db.utc_now()
+
+    def add_batch(batch):
+        if db is not None:
+            db.upsert_batch(account_id, batch, scan_started)
+        with store_lock:
+            store.add_batch(account_id, batch)
+
+    checkpoint = scanner.Checkpoint(account_id, resume=args.resume)
+    task_stats = []
+    coverage = scanner.ScanCoverage()
+    scanner.scan_resources(account_id, regions, clients, scanner.SERVICES_TO_SCAN,
+                           collection_mode=args.collection_mode, sweep_only=args.sweep_only,
+                           sink=add_batch, max_workers=args.workers_per_account, checkpoint=checkpoint,
+                           task_stats=task_stats, coverage=coverage)
+    scanner.write_task_profile(task_stats, f"aws_resources_task_profile_{account_id}_{current_timestamp}.json", top=3)
+
+    if db is not None:
+        # Only groups whose tasks all finished cleanly; see ScanCoverage
+        db.mark_missing(account_id, scan_started, scopes=coverage.scopes())
+        checkpoint.finish()
+        with store_lock:
+            found = len(store.select(account=account_id))
+        return account_id, found, time.perf_counter() - start
+
+    with store_lock:
+        filenames = scanner.write_json_outputs(store, account_id, current_timestamp)
+        found = len(store.select(account=account_id))
+    checkpoint.finish()
+    print(f"[{profile}] Saved {', '.join(filenames)}")
+    return account_id, found, time.perf_counter() - start
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default=','.join(DEFAULT_PROFILES),
+                        help='comma-separated AWS profiles to scan (default: the 14 managed accounts)')
+    parser.add_argument('--max-accounts', type=int, default=0,
+                        help='accounts scanned at the same time (default: all)')
+    parser.add_argument('--api-rate', type=float, default=40.0,
+                        help='global budget of API calls per second across all accounts (default: %(default)s)')
+    parser.add_argument('--workers-per-account', type=int, default=16,
+                        help='scheduler threads per account (default: %(default)s)')
+    parser.add_argument('--collection-mode', choices=['describe', 'tagging'], default='describe')
+    parser.add_argument('--sweep-only', default='')
+    parser.add_argument('--refresh-regions', action='store_true')
+    parser.add_argument('--region-cache-ttl', type=int, default=scanner.REGION_CACHE_TTL)
+    parser.add_argument('--resume', action='store_true',
+                        help='per account, rerun only the tasks an interrupted run did not finish')
+    parser.add_argument('--db', help='upsert every account into this SQLite CMDB instead of writing JSON files')
+    args = parser.parse_args(argv)
+    args.profiles = [profile for profile in args.profiles.split(',') if profile]
+    args.sweep_only = [service_item for service_item in args.sweep_only.split(',') if service_item]
+    unknown = set(args.sweep_only) - set(scanner.SWEEP_RESOURCE_TYPES)
+    if unknown:
+        parser.error(f"--sweep-only does not support: {', '.join(sorted(unknown))}")
+    if args.sweep_only and args.collection_mode != 'tagging':
+        parser.error("--sweep-only requires --collection-mode tagging")
+    return args
+
+
+def main(argv=None):
+    """ Main function """
+    args = parse_args(argv)
+    current_timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    budget = ApiBudget(args.api_rate)
+    store = scanner.ResourceStore()
+    store_lock = threading.Lock()
+    db = cmdb_db.CmdbDatabase(args.db) if args.db else None
+    max_accounts = args.max_accounts or len(args.profiles)
+    print(f"Scanning {len(args.profiles)} accounts, {max_accounts} at a time, "
+          f"with a global budget of {args.api_rate:g} API calls/s.")
+
+    start = time.perf_counter()
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_accounts) as executor:
+        future_to_profile = {
+            executor.submit(scan_profile, profile, args, budget, store, store_lock, current_timestamp, db): profile
+            for profile in args.profiles
+        }
+        for future in concurrent.futures.as_completed(future_to_profile):
+            profile = future_to_profile[future]
+            try:
+                account_id, found, elapsed = future.result()
+                print(f"[{profile}] Account {account_id} done: {found} resources in {elapsed:.0f}s.")
+            except Exception as exc:
+                failed.append(profile)
+                print(f"[{profile}] Scan failed: {exc}")
+
+    print(f"\nScanned {len(args.profiles) - len(failed)}/{len(args.profiles)} accounts in "
+          f"{time.perf_counter() - start:.0f}s; {len(store)} resources in total.")
+    if db is not None:
+        db.close()
+        print(f"New: {db.stats['created']}, changed: {db.stats['updated']}, reappeared: {db.stats['restored']}, "
+              f"gone: {db.stats['deleted']}. Saved to {args.db}")
+    else:
+        filename_merged = f"aws_resources_merged_{current_timestamp}.ndjson"
+        with scanner.NdjsonWriter(filename_merged, None) as writer:
+            for account_id in store.accounts():
+                writer.write_batch(store.by_service_view(account_id), account_id)
+        print(f"Merged dataset saved to {filename_merged}")
+    if failed:
+        print(f"Failed profiles: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
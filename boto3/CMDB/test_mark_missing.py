@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+"""
+Checks that a scan only flags unseen resources as deleted in the (service key, region)
+groups it covered in full, against the local fake_aws.py server, and that imported
+snapshots keep the account of every record.
+
+Usage:
+    python -m unittest test_mark_missing     # from this directory
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import boto3
+
+import cmdb_db
+import cmdb_snapshot
+import fake_aws
+import list_resources_arn as scanner
+
+
+STALE_SEEN_AT = '2025-01-01T00:00:00+00:00'
+
+
+def stale_record(service_key, region, resource_id):
+    """A record of a resource the fake estate does not have, as left by an older scan."""
+    arn = f"arn:aws:{service_key}:{region}:{fake_aws.FAKE_ACCOUNT_ID}:{resource_id}"
+    return {'arn': arn, 'name': resource_id, 'subclass': service_key, 'region': region, 'creation_date': 'Unknown'}
+
+
+class MarkMissingTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.TemporaryDirectory()
+        scanner.CACHE_DIR = cls.cache_dir.name
+        cls.fake = fake_aws.FakeAWS(regions=['us-east-1', 'eu-west-1'], resources_per_service=2).start()
+        cls.fake.install_env()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fake.stop()
+        cls.cache_dir.cleanup()
+
+    def setUp(self):
+        self.fake.errors.clear()
+        self.db = cmdb_db.CmdbDatabase(os.path.join(self.cache_dir.name, f"{self.id()}.sqlite3"))
+        self.stale = {
+            ('ec2', 'us-east-1'): stale_record('ec2', 'us-east-1', 'instance/i-gone'),
+            ('sns', 'us-east-1'): stale_record('sns', 'us-east-1', 'gone-topic'),
+            ('ec2', 'eu-west-1'): stale_record('ec2', 'eu-west-1', 'instance/i-gone'),
+        }
+        for (service_key, _region), record in self.stale.items():
+            self.db.upsert_batch(fake_aws.FAKE_ACCOUNT_ID, {service_key: [record]}, STALE_SEEN_AT)
+
+    def tearDown(self):
+        self.db.close()
+
+    def scan(self, regions):
+        """Scan ec2 and sns into the database; return the ARNs flagged as deleted."""
+        account_id = fake_aws.FAKE_ACCOUNT_ID
+        scan_started = cmdb_db.utc_now()
+        coverage = scanner.ScanCoverage()
+        with contextlib.redirect_stdout(io.StringIO()):
+            scanner.scan_resources(account_id, regions, scanner.ClientCache(boto3.Session()), ['ec2', 'sns'],
+                                   sink=lambda batch: self.db.upsert_batch(account_id, batch, scan_started),
+                                   coverage=coverage)
+        return set(self.db.mark_missing(account_id, scan_started, scopes=coverage.scopes()))
+
+    def test_clean_scan_flags_unseen_resources(self):
+        self.assertEqual(self.scan(['us-east-1', 'eu-west-1']), {record['arn'] for record in self.stale.values()})
+
+    def test_denied_collector_keeps_its_resources(self):
+        self.fake.errors[('ec2', 'us-east-1', 'DescribeInstances')] = 'UnauthorizedOperation'
+        deleted = self.scan(['us-east-1', 'eu-west-1'])
+        self.assertNotIn(self.stale[('ec2', 'us-east-1')]['arn'], deleted)
+        self.assertEqual(deleted, {self.stale[('sns', 'us-east-1')]['arn'], self.stale[('ec2', 'eu-west-1')]['arn']})
+        self.assertEqual(len(self.db.select(service='ec2', region='us-east-1')), 1)
+
+    def test_skipped_region_keeps_its_resources(self):
+        self.fake.errors[('*', 'eu-west-1', '*')] = 'AuthFailure'
+        deleted = self.scan(['us-east-1', 'eu-west-1'])
+        self.assertEqual(deleted, {self.stale[('ec2', 'us-east-1')]['arn'], self.stale[('sns', 'us-east-1')]['arn']})
+
+    def test_unscanned_region_keeps_its_resources(self):
+        deleted = self.scan(['us-east-1'])
+        self.assertNotIn(self.stale[('ec2', 'eu-west-1')]['arn'], deleted)
+
+
+class ImportSnapshotsTest(unittest.TestCase):
+
+    def test_import_keeps_accounts_and_flags_missing(self):
+        account_id = '111111111111'
+        rest_api = {'arn': 'arn:aws:apigateway:us-east-1::/restapis/abc', 'name': '/restapis/abc', 'region': 'us-east-1'}
+        instances = [stale_record('ec2', 'us-east-1', f"instance/{instance_id}") for instance_id in ('i-kept', 'i-gone')]
+        with tempfile.TemporaryDirectory() as directory, cmdb_db.CmdbDatabase(':memory:') as db:
+            older = os.path.join(directory, f"aws_resources_{account_id}_20250101-000000.ndjson")
+            with open(older, 'w') as f:
+                for service_key, record in [('apigateway', rest_api)] + [('ec2', record) for record in instances]:
+                    f.write(json.dumps({'account': account_id, 'region': 'us-east-1', 'service': service_key,
+                                        'record': record}) + '\n')
+            newer = os.path.join(directory, f"aws_resources_{account_id}_20250102-000000.cmdb")
+            cmdb_snapshot.write_snapshot(newer, [(account_id, 'apigateway', rest_api), (account_id, 'ec2', instances[0])])
+            with contextlib.redirect_stdout(io.StringIO()):
+                cmdb_db.import_snapshots(db, [older, newer])
+
+            rows = {row['arn']: row for row in db.select(include_deleted=True)}
+            self.assertEqual({row['account'] for row in rows.values()}, {account_id})
+            self.assertEqual([arn for arn, row in rows.items() if row['deleted_at']], [instances[1]['arn']])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,19 @@
 #!/usr/bin/env python
 
-import boto3
+""" arquiva os findings ativos de um analyzer do IAM Access Analyzer """
 
-def archive_external_findings(analyzer_name):
-    client = boto3.client('accessanalyzer')
+import argparse
+
+import aws_session
+
+ANALYZER_ARN = "arn:aws:access-analyzer:sa-east-1:786154173690:analyzer/ConsoleAnalyzer-13102a08-d04d-4eb0-9969-a300e3bd55db"
+
+def archive_external_findings(analyzer_arn):
+    client = aws_session.client('accessanalyzer')
     
     # List all active findings
     response = client.list_findings_v2(
-        analyzerArn="arn:aws:access-analyzer:sa-east-1:786154173690:analyzer/ConsoleAnalyzer-13102a08-d04d-4eb0-9969-a300e3bd55db",
+        analyzerArn=analyzer_arn,
         filter={
             # 'isExterna': {'eq': ['true']},  # Filters for external access
             'status': {'eq': ['ACTIVE']}   # Only active findings
@@ -19,12 +25,18 @@ def archive_external_findings(analyzer_name):
     # Archive findings
     for finding_id in finding_ids:
         client.update_findings(
-            analyzerArn="arn:aws:access-analyzer:sa-east-1:786154173690:analyzer/ConsoleAnalyzer-13102a08-d04d-4eb0-9969-a300e3bd55db",
+            analyzerArn=analyzer_arn,
             findingIds=[finding_id],
             status='ARCHIVED'
         )
         print(f"Archived finding: {finding_id}")
 
+def main(argv=None):
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--analyzer-arn', default=ANALYZER_ARN, help='Access Analyzer ARN')
+    args = parser.parse_args(argv)
+    archive_external_findings(args.analyzer_arn)
+
 if __name__ == "__main__":
-    analyzer_name = "ConsoleAnalyzer-13102a08-d04d-4eb0-9969-a300e3bd55db"  # Change this to your Access Analyzer name
-    archive_external_findings(analyzer_name)
+    main()
@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 
-import boto3
+""" executa uma consulta no Athena e imprime o resultado """
+
+import argparse
 import time
 
-# Initialize the Athena client
-client = boto3.client('athena')
+import aws_session
+
 
 # Function to execute a query
 def execute_athena_query(query, database, output_location):
+    client = aws_session.client('athena')
     response = client.start_query_execution(
         QueryString=query,
         QueryExecutionContext={
@@ -21,6 +24,7 @@ def execute_athena_query(query, database, output_location):
 
 # Function to check the query status
 def check_query_status(query_execution_id):
+    client = aws_session.client('athena')
     while True:
         response = client.get_query_execution(QueryExecutionId=query_execution_id)
         status = response['QueryExecution']['Status']['State']
@@ -32,16 +36,19 @@ def check_query_status(query_execution_id):
 
 # Function to get query results
 def get_query_results(query_execution_id):
+    client = aws_session.client('athena')
     response = client.get_query_results(QueryExecutionId=query_execution_id)
     return response
 
 # Main function
-def main():
-    query = "select * from vpc_flow_logs_seller_prod limit 100;"
-    database = "flow_logs"
-    output_location = "s3://637423629877-flow-logs/athena_output/"
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--query', default="select * from vpc_flow_logs_seller_prod limit 100;")
+    parser.add_argument('--database', default="flow_logs")
+    parser.add_argument('--output-location', default="s3://637423629877-flow-logs/athena_output/")
+    args = parser.parse_args(argv)
 
-    query_execution_id = execute_athena_query(query, database, output_location)
+    query_execution_id = execute_athena_query(args.query, args.database, args.output_location)
     print(f"Query Execution ID: {query_execution_id}")
 
     status = check_query_status(query_execution_id)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+"""
+Shared boto3 session and client factory for the scripts in this directory.
+
+boto3 is only imported when the first client is requested (the import alone costs
+about 0.25s and 20 MB), and clients are cached per (service, region), so a script
+that needs the same client in several functions builds it once. awsops.py calls
+configure() with its --profile/--region options before running a subcommand.
+
+Usage:
+    import aws_session
+    ec2 = aws_session.client('ec2')
+    acm = aws_session.client('acm', 'us-east-1')
+"""
+
+import threading
+
+
+_PROFILE = None
+_REGION = None
+_SESSION = None
+_CLIENTS = {}
+_LOCK = threading.Lock()
+
+
+def configure(profile=None, region=None):
+    """Set the profile and default region of the shared session, dropping any client already built."""
+    global _PROFILE, _REGION, _SESSION
+    with _LOCK:
+        _PROFILE, _REGION, _SESSION = profile, region, None
+        _CLIENTS.clear()
+
+
+def get_session():
+    """The shared boto3 session, created (and boto3 imported) on first use."""
+    global _SESSION
+    if _SESSION is None:
+        with _LOCK:
+            if _SESSION is None:
+                import boto3
+                _SESSION = boto3.Session(profile_name=_PROFILE, region_name=_REGION)
+    return _SESSION
+
+
+def client(service_name, region=None):
+    """Return the cached client for service_name in region (default: the session region)."""
+    key = (service_name, region)
+    cached = _CLIENTS.get(key)
+    if cached is None:
+        session = get_session()
+        with _LOCK:
+            cached = _CLIENTS.get(key)
+            if cached is None:
+                # boto3.Session.client is not thread-safe, so creation stays under the lock
+                cached = _CLIENTS[key] = session.client(service_name, region_name=region)
+    return cached
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+"""
+Single entry point for the ops scripts of this directory and of CMDB/.
+
+Subcommands are looked up in a static table and their module is only imported
+when the subcommand runs, so listing commands or printing help never loads boto3
+or any other script. The scripts get their clients from the shared session of
+aws_session.py, configured here with --profile/--region (exported as AWS_PROFILE
+and AWS_DEFAULT_REGION as well, for the CMDB tools, which keep their own session).
+
+--timing prints the wall time and peak RSS of the invocation to stderr;
+startup-bench measures both for every subcommand's --help in fresh interpreters.
+
+Usage:
+    ./awsops.py                                   # list the subcommands
+    ./awsops.py --profile prod find-kms 0b71f056-9b23-4295-8b1a-5011da693d47
+    ./awsops.py --region us-east-1 list-ec2 --output ec2_instances.csv
+    ./awsops.py --timing route53-albs --hosted-zone-id Z22PGG9II0I7L0
+    ./awsops.py cmdb-scan --output-format ndjson
+    ./awsops.py startup-bench --repeat 5
+"""
+
+import argparse
+import importlib
+import os
+import resource
+import sys
+import time
+
+
+START = time.perf_counter()
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# subcommand: (directory relative to this file, module, help)
+COMMANDS = {
+    'access-analyzer-archive': ('', 'archive-access-analyzer', 'archive the active IAM Access Analyzer findings'),
+    'acm-email-domains': ('', 'list_domain_email', 'ACM certificate domains validated by e-mail'),
+    'athena-query': ('', 'athena_query', 'run an Athena query and print the rows'),
+    'ecr-scan-failures': ('', 'find_ecr_scan_failures', 'HIGH/CRITICAL scan findings of the latest ECR images'),
+    'ecs-execute-command': ('', 'find_ecs_execute_command', 'IAM entities allowed ecs:ExecuteCommand'),
+    'ecs-services-no-billing-tag': ('', 'ecs_no_tag', 'ECS services without a Billing tag'),
+    'ecs-tasks-no-billing-tag': ('', 'ecs_tasks_notag_billing', 'ECS tasks without a Billing tag'),
+    'export-tgw-routes': ('', 'export_routes', 'export the routes of a transit gateway route table'),
+    'find-kms': ('', 'find_kms', 'S3/EBS/RDS/Lambda resources using a KMS key'),
+    'import-tgw-routes': ('', 'import_routes', 'import routes into a transit gateway route table'),
+    'list-ec2': ('', 'list_ec2', 'EC2 instances and their total volume size, as CSV'),
+    'list-ecs-tasks': ('', 'list_ecs_tasks', 'ECS task ARNs without a Billing tag'),
+    'route53-albs': ('', 'route53_records_albs', 'Route 53 records pointing at each ALB'),
+    'cmdb-scan': ('CMDB', 'list_resources_arn', 'scan the resources of one account (CMDB)'),
+    'cmdb-multi': ('CMDB', 'list_resources_arn_multi', 'scan several accounts/profiles (CMDB)'),
+    'cmdb-diff': ('CMDB', 'cmdb_diff', 'compare two CMDB snapshots'),
+    'cmdb-snapshot': ('CMDB', 'cmdb_snapshot', 'convert/show compact .cmdb snapshots'),
+    'cmdb-db': ('CMDB', 'cmdb_db', 'query the CMDB SQLite history'),
+    'cmdb-cassette': ('CMDB', 'cmdb_cassette', 'inspect scan cassettes'),
+}
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size in MB (ru_maxrss is in KiB on Linux)."""
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def load_command(name):
+    """Import the module of a subcommand and return its main function."""
+    directory, module_name, _help = COMMANDS[name]
+    path = os.path.join(HERE, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module(module_name).main
+
+
+def startup_bench(argv):
+    """Median wall time and peak RSS of `awsops.py <command> --help`, each in a fresh interpreter."""
+    import statistics
+    import subprocess
+
+    parser = argparse.ArgumentParser(prog='awsops.py startup-bench', description=startup_bench.__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('commands', nargs='*', default=[None] + sorted(COMMANDS))
+    args = parser.parse_args(argv)
+
+    print(f"  {'command':30s} {'wall ms':>8s} {'peak RSS MB':>12s} {'boto3':>6s}")
+    for name in args.commands:
+        command = [sys.executable, os.path.abspath(__file__), '--timing'] + ([name, '--help'] if name else [])
+        times, rss, boto3_loaded = [], 0.0, False
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            stderr = process.stderr.read()
+            # wait4 instead of wait: the peak RSS of this one child, not of all children so far
+            _pid, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+            process.stderr.close()
+            times.append(time.perf_counter() - start)
+            rss = max(rss, usage.ru_maxrss / 1024)
+            boto3_loaded = 'boto3 loaded' in stderr
+        print(f"  {name or '(list commands)':30s} {statistics.median(times) * 1000:8.0f} {rss:12.1f} "
+              f"{'yes' if boto3_loaded else 'no':>6s}")
+
+
+def report_timing(name):
+    loaded = 'boto3 loaded' if 'boto3' in sys.modules else 'boto3 not loaded'
+    print(f"awsops: {name or '-'} {time.perf_counter() - START:.3f}s, peak RSS {peak_rss_mb():.1f} MB, {loaded}",
+          file=sys.stderr)
+
+
+def main(argv=None):
+    """ Main function """
+    width = max(len(name) for name in COMMANDS)
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='subcommands:\n' + '\n'.join(f"  {name:{width}s}  {help_text}"
+                                            for name, (_directory, _module, help_text) in COMMANDS.items()) +
+               f"\n  {'startup-bench':{width}s}  startup time and peak RSS of every subcommand")
+    parser.add_argument('--profile', help='AWS profile of the shared session')
+    parser.add_argument('--region', help='default region of the shared session')
+    parser.add_argument('--timing', action='store_true', help='print wall time and peak RSS to stderr on exit')
+    parser.add_argument('command', nargs='?', choices=sorted(COMMANDS) + ['startup-bench'], metavar='command')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='arguments of the subcommand (see <command> --help)')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command is None:
+            parser.print_help()
+        elif args.command == 'startup-bench':
+            startup_bench(args.args)
+        else:
+            if args.profile:
+                os.environ['AWS_PROFILE'] = args.profile
+            if args.region:
+                os.environ['AWS_DEFAULT_REGION'] = args.region
+            command_main = load_command(args.command)
+            import aws_session
+            aws_session.configure(args.profile, args.region)
+            sys.argv[0] = f"awsops.py {args.command}"
+            command_main(args.args)
+    finally:
+        if args.timing:
+            report_timing(args.command)
+
+
+if __name__ == "__main__":
+    main()
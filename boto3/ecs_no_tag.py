@@ -2,11 +2,13 @@
 
 """ lista elementos ECS sem tag Billing """
 
-import boto3
+import argparse
+
+import aws_session
 
 
 def get_ecs_services_without_billing_tag():
-    ecs_client = boto3.client('ecs')
+    ecs_client = aws_session.client('ecs')
 
     # List all ECS clusters
     clusters = ecs_client.list_clusters()['clusterArns']
@@ -34,5 +36,11 @@ def get_ecs_services_without_billing_tag():
                 print(f"Cluster: {cluster}, Service: {service_details['serviceName']}")
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    """ Main function """
+    argparse.ArgumentParser(description=__doc__).parse_args(argv)
     get_ecs_services_without_billing_tag()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,12 @@
 
 """ lista elementos ECS sem tag Billing """
 
-import boto3
+import argparse
+
+import aws_session
 
 def get_ecs_tasks_without_billing_tag():
-    ecs_client = boto3.client('ecs')
+    ecs_client = aws_session.client('ecs')
 
     # List all ECS clusters
     clusters = ecs_client.list_clusters()['clusterArns']
@@ -33,5 +35,11 @@ def get_ecs_tasks_without_billing_tag():
                 print(f"Cluster: {cluster}, Task ARN: {task_details['taskArn']}")
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    """ Main function """
+    argparse.ArgumentParser(description=__doc__).parse_args(argv)
     get_ecs_tasks_without_billing_tag()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,13 @@
 
 """ exporta rotas de uma tabela de roteamento de um transit gateway """
 
-import boto3
+import argparse
 import json
 
+import aws_session
+
 def exporta_rotas_tgw(route_table_id, static_output_file, propagated_output_file):
-    ec2 = boto3.client('ec2')
+    ec2 = aws_session.client('ec2')
     try:
         # Busca rotas na tabela de rotas do Transit Gateway
         response = ec2.search_transit_gateway_routes(
@@ -37,10 +39,21 @@ def exporta_rotas_tgw(route_table_id, static_output_file, propagated_output_file
         print(f"Erro ao exportar rotas: {e}")
 
 
-if __name__ == "__main__":
-    route_table_id = input("Entre com o ID da tabela de roteamento do Transit Gateway: ")
-    static_output_file = input("Entre com o nome do arquivo de output das rotas estáticas (e.g., rotas_estaticas.json): ")
-    propagated_output_file = input("Entre com o nome do arquivo de output das rotas propagadas (e.g., rotas_propagadas.json): ")
+def main(argv=None):
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('route_table_id', nargs='?', help='ID da tabela de roteamento do Transit Gateway')
+    parser.add_argument('--static-output', help='arquivo de output das rotas estáticas')
+    parser.add_argument('--propagated-output', help='arquivo de output das rotas propagadas')
+    args = parser.parse_args(argv)
+
+    route_table_id = args.route_table_id or input("Entre com o ID da tabela de roteamento do Transit Gateway: ")
+    static_output_file = args.static_output or input("Entre com o nome do arquivo de output das rotas estáticas (e.g., rotas_estaticas.json): ")
+    propagated_output_file = args.propagated_output or input("Entre com o nome do arquivo de output das rotas propagadas (e.g., rotas_propagadas.json): ")
     exporta_rotas_tgw(route_table_id, static_output_file, propagated_output_file)
 
+
+if __name__ == "__main__":
+    main()
+
 # tgw-rtb-0bb2ebd73bf274fdc
@@ -2,7 +2,9 @@
 
 """ lista repositórios ECR com falhas no scan de imagens """
 
-import boto3
+import argparse
+
+import aws_session
 
 def get_latest_image_digest(repository_name, region_name='us-east-1'):
     """
@@ -15,7 +17,7 @@ def get_latest_image_digest(repository_name, region_name='us-east-1'):
     Returns:
     - Image digest of the latest image in the repository.
     """
-    ecr_client = boto3.client('ecr', region_name=region_name)
+    ecr_client = aws_session.client('ecr', region_name)
 
     response = ecr_client.describe_images(repositoryName=repository_name)
     images = response['imageDetails']
@@ -36,7 +38,7 @@ def get_failed_scan_findings_all_repositories(region_name='us-east-1'):
     Returns:
     - Dictionary where keys are repository names and values are lists of failed image scan findings.
     """
-    ecr_client = boto3.client('ecr', region_name=region_name)
+    ecr_client = aws_session.client('ecr', region_name)
 
     response = ecr_client.describe_repositories()
     repositories = response['repositories']
@@ -66,15 +68,23 @@ def get_failed_scan_findings_all_repositories(region_name='us-east-1'):
 
     return failed_findings_all_repositories
 
-# Example usage:
-region_name = 'us-east-1'
-failed_findings_all_repositories = get_failed_scan_findings_all_repositories(region_name)
+def main(argv=None):
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--region', default='us-east-1', help="AWS region (default: us-east-1)")
+    args = parser.parse_args(argv)
 
-for repository_name, failed_findings in failed_findings_all_repositories.items():
-    if failed_findings:
-        print(f"Repository: {repository_name}")
-        print("Failed Image Scan Findings:")
-        for finding in failed_findings:
-            print(f"Severity: {finding['severity']}, Description: {finding['description']}")
-    else:
-        print(f"No failed image scan findings found for repository: {repository_name}")
+    failed_findings_all_repositories = get_failed_scan_findings_all_repositories(args.region)
+
+    for repository_name, failed_findings in failed_findings_all_repositories.items():
+        if failed_findings:
+            print(f"Repository: {repository_name}")
+            print("Failed Image Scan Findings:")
+            for finding in failed_findings:
+                print(f"Severity: {finding['severity']}, Description: {finding['description']}")
+        else:
+            print(f"No failed image scan findings found for repository: {repository_name}")
+
+
+if __name__ == "__main__":
+    main()
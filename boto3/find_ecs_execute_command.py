@@ -13,13 +13,14 @@ Requirements:
 - AWS credentials configured
 
 Usage:
-python iam_ecs_execute_command_scanner.py
+python find_ecs_execute_command.py [--output ecs_execute_command_scan_results.json]
 """
 
+import argparse
 import json
 import re
-from botocore.exceptions import ClientError
-import boto3
+
+import aws_session
 
 
 def check_policy_for_ecs_execute_command(policy_doc):
@@ -82,7 +83,8 @@ def scan_iam_for_ecs_execute_command():
     Also scan customer managed policies for ecs:ExecuteCommand
     Excludes AWS Managed policies
     """
-    iam_client = boto3.client('iam')
+    iam_client = aws_session.client('iam')
+    ClientError = iam_client.exceptions.ClientError
 
     results = {
         'roles': [],
@@ -298,8 +300,12 @@ def print_summary(results):
     print("\n" + "="*80)
 
 
-def main():
+def main(argv=None):
     """ Main Function """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default='ecs_execute_command_scan_results.json', help='JSON results file')
+    args = parser.parse_args(argv)
+
     print("AWS IAM Scanner for ecs:ExecuteCommand Permission")
     print("="*80)
     print("Scanning your AWS environment for IAM entities with ecs:ExecuteCommand permission...")
@@ -310,9 +316,9 @@ def main():
         print_summary(results)
 
         # Save results to a JSON file
-        with open("ecs_execute_command_scan_results.json", "w") as f:
+        with open(args.output, "w") as f:
             json.dump(results, f, indent=2)
-        print("\nResults saved to: ecs_execute_command_scan_results.json")
+        print(f"\nResults saved to: {args.output}")
 
     except Exception as e:
         print(f"An error occurred: {str(e)}")
@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
 
-import boto3
+""" lista buckets S3, volumes EBS, instâncias RDS e funções Lambda que usam uma chave KMS """
+
+import argparse
+
+import aws_session
 
 def find_kms_key_usage(kms_key_id):
     # Initialize AWS clients
-    s3_client = boto3.client('s3')
-    ec2_client = boto3.client('ec2')
-    rds_client = boto3.client('rds')
-    lambda_client = boto3.client('lambda')
+    s3_client = aws_session.client('s3')
+    ec2_client = aws_session.client('ec2')
+    rds_client = aws_session.client('rds')
+    lambda_client = aws_session.client('lambda')
     
     # Find S3 buckets using the KMS key
     def check_s3_buckets():
@@ -67,7 +71,13 @@ def find_kms_key_usage(kms_key_id):
     for function in lambda_functions:
         print(f" - {function}")
 
-# Example usage:
-kms_key_id = '0b71f056-9b23-4295-8b1a-5011da693d47'
-find_kms_key_usage(kms_key_id)
+def main(argv=None):
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('kms_key_id', nargs='?', default='0b71f056-9b23-4295-8b1a-5011da693d47', help='KMS key ID')
+    args = parser.parse_args(argv)
+    find_kms_key_usage(args.kms_key_id)
+
+if __name__ == "__main__":
+    main()
 
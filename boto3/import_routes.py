@@ -2,11 +2,13 @@
 
 """ importa rotas para uma tabela de roteamento de um transit gateway """
 
-import boto3
+import argparse
 import json
 
+import aws_session
+
 def importa_rotas_tgw(route_table_id, input_file):
-    ec2 = boto3.client('ec2')
+    ec2 = aws_session.client('ec2')
     try:
         with open(input_file, 'r') as file:
             routes = json.load(file)
@@ -40,9 +42,18 @@ def importa_rotas_tgw(route_table_id, input_file):
     except Exception as e:
         print(f"Erro importando rotas: {e}")
 
-if __name__ == "__main__":
-    route_table_id = input("Entre com o ID da tabela de roteamento do Transit Gateway: ")
-    input_file = input("Entre com o nome do arquivo de rotas: ")
+def main(argv=None):
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('route_table_id', nargs='?', help='ID da tabela de roteamento do Transit Gateway')
+    parser.add_argument('input_file', nargs='?', help='arquivo de rotas (e.g., rotas_estaticas.json)')
+    args = parser.parse_args(argv)
+
+    route_table_id = args.route_table_id or input("Entre com o ID da tabela de roteamento do Transit Gateway: ")
+    input_file = args.input_file or input("Entre com o nome do arquivo de rotas: ")
     importa_rotas_tgw(route_table_id, input_file)
 
+if __name__ == "__main__":
+    main()
+
 # tgw-rtb-0b6487e790db977ae
\ No newline at end of file
@@ -1,13 +1,15 @@
 #!/usr/bin/env python
 
-""" lista elementos ECS sem tag Billing """
+""" lista domínios de certificados ACM validados por e-mail """
 
-import boto3
+import argparse
+
+import aws_session
 
 
 def list_acm_domains_with_email_validation():
     # Create a boto3 ACM client
-    acm_client = boto3.client('acm', region_name='us-east-1')
+    acm_client = aws_session.client('acm', 'us-east-1')
 
     # List all certificates
     response = acm_client.list_certificates()
@@ -24,7 +26,9 @@ def list_acm_domains_with_email_validation():
     return domains_with_email_validation
 
 
-def main():
+def main(argv=None):
+    argparse.ArgumentParser(description=__doc__).parse_args(argv)
+
     # List ACM domains with email validation
     domains_with_email_validation = list_acm_domains_with_email_validation()
 
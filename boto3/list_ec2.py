@@ -1,42 +1,59 @@
 #!/usr/bin/env python3
 
-import boto3
+""" lista as instâncias EC2 com o tamanho total dos volumes em um CSV """
+
+import argparse
 import csv
 
-# Initialize a session using Amazon EC2
-session = boto3.Session()
-ec2_client = session.client('ec2')
+import aws_session
 
-# Retrieve a list of EC2 instances
-response = ec2_client.describe_instances()
 
 # Function to calculate total volume size for an instance
-def get_total_volume_size(instance_id):
+def get_total_volume_size(ec2_client, instance_id):
     total_size = 0
     volumes = ec2_client.describe_volumes(Filters=[{'Name': 'attachment.instance-id', 'Values': [instance_id]}])
     for volume in volumes['Volumes']:
         total_size += volume['Size']
     return total_size
 
-# Open a CSV file to write the output
-with open('ec2_instances.csv', mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(['Name', 'Instance ID', 'Instance State', 'Total Volume Size (GB)'])
-
-    # Loop through each instance and extract the required information
-    for reservation in response['Reservations']:
-        for instance in reservation['Instances']:
-            instance_id = instance['InstanceId']
-            instance_state = instance['State']['Name']
-            total_volume_size = get_total_volume_size(instance_id)
-            name = None
-            # Extract the Name tag if it exists
-            if 'Tags' in instance:
-                for tag in instance['Tags']:
-                    if tag['Key'] == 'Name':
-                        name = tag['Value']
-                        break
-
-            writer.writerow([name, instance_id, instance_state, total_volume_size])
-
-print("EC2 instances have been written to ec2_instances.csv")
+
+def write_instances_csv(output_file):
+    ec2_client = aws_session.client('ec2')
+
+    # Retrieve a list of EC2 instances
+    response = ec2_client.describe_instances()
+
+    # Open a CSV file to write the output
+    with open(output_file, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Name', 'Instance ID', 'Instance State', 'Total Volume Size (GB)'])
+
+        # Loop through each instance and extract the required information
+        for reservation in response['Reservations']:
+            for instance in reservation['Instances']:
+                instance_id = instance['InstanceId']
+                instance_state = instance['State']['Name']
+                total_volume_size = get_total_volume_size(ec2_client, instance_id)
+                name = None
+                # Extract the Name tag if it exists
+                if 'Tags' in instance:
+                    for tag in instance['Tags']:
+                        if tag['Key'] == 'Name':
+                            name = tag['Value']
+                            break
+
+                writer.writerow([name, instance_id, instance_state, total_volume_size])
+
+
+def main(argv=None):
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output', default='ec2_instances.csv', help='CSV file (default: ec2_instances.csv)')
+    args = parser.parse_args(argv)
+
+    write_instances_csv(args.output)
+    print(f"EC2 instances have been written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
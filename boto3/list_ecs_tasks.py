@@ -1,11 +1,14 @@
-import boto3
+#!/usr/bin/env python
+
+""" lista tasks ECS sem tag Billing """
+
+import argparse
+
+import aws_session
 
 def list_ecs_tasks():
-    # Create a session using your AWS credentials
-    session = boto3.Session(aws_access_key_id='YOUR_ACCESS_KEY', aws_secret_access_key='YOUR_SECRET_KEY')
-    
-    # Initialize the ECS client with the above session
-    ecs = session.client('ecs')
+    # Initialize the ECS client from the shared session (profile/credentials from the environment)
+    ecs = aws_session.client('ecs')
 
     # Get a list of all clusters in your AWS account
     response = ecs.list_clusters()
@@ -28,5 +31,11 @@ def list_ecs_tasks():
             print("Task ARN: {}".format(description['tasks'][0]['taskArn']))
 
 
-if __name__ == "" == "main" :
+def main(argv=None):
+    """ Main function """
+    argparse.ArgumentParser(description=__doc__).parse_args(argv)
     list_ecs_tasks()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,15 @@
 
 """ verifica se os ALBs criados na AWS têm entradas no Route53 de uma hosted zone"""
 
-import boto3
+import argparse
+
+import aws_session
 
 
 def list_alb_dns_names():
     """ list_alb_dns_names """
 
-    elbv2_client = boto3.client('elbv2')
+    elbv2_client = aws_session.client('elbv2')
 
     response = elbv2_client.describe_load_balancers()
 
@@ -25,7 +27,7 @@ def processa_entradas(response, alb_dns_name):
 
 def check_alb_in_route53(hosted_zone_id, alb_dns_name):
     """ check_alb_in_route53 """
-    client = boto3.client('route53')
+    client = aws_session.client('route53')
 
     response = client.list_resource_record_sets(HostedZoneId=hosted_zone_id)
 
@@ -41,9 +43,18 @@ def check_alb_in_route53(hosted_zone_id, alb_dns_name):
         processa_entradas(response, alb_dns_name)
 
 
-if __name__ == "__main__":
+HOSTED_ZONE_ID = "Z22PGG9II0I7L0"
+
 
-    HOSTED_ZONE_ID = "Z22PGG9II0I7L0"
+def main(argv=None):
+    """ Main function """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--hosted-zone-id', default=HOSTED_ZONE_ID, help=f"hosted zone (default: {HOSTED_ZONE_ID})")
+    args = parser.parse_args(argv)
 
     for alb_dns_names in list_alb_dns_names():
-        check_alb_in_route53(HOSTED_ZONE_ID, alb_dns_names)
+        check_alb_in_route53(args.hosted_zone_id, alb_dns_names)
+
+
+if __name__ == "__main__":
+    main()